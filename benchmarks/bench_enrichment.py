@@ -0,0 +1,105 @@
+"""
+Enrichment Throughput Benchmark
+
+Measures end-to-end throughput of Layer 3 summarization and Layer 4 meta
+commentary against the local LLM stand-in (memory_system.llm_standin), so it
+runs on an offline machine. Memories are generated deterministically, so a
+cassette recorded once with --mode record replays exactly afterwards.
+
+Usage:
+    python benchmarks/bench_enrichment.py --memories 200 --latency lognormal:400:0.5
+    python benchmarks/bench_enrichment.py --mode record --cassette memory_data/cassettes/bench.jsonl
+    python benchmarks/bench_enrichment.py --mode replay --cassette memory_data/cassettes/bench.jsonl --latency recorded
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+# Make the memory_system package importable when run from the repository root
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from memory_system.layer3 import SummaryGenerator
+from memory_system.layer4 import MetaCommentaryGenerator
+from memory_system.llm_standin import LLMStandIn
+
+TOPICS = ["housing", "healthcare", "food", "transport", "education", "employment", "legal aid", "childcare"]
+PLACES = ["Bakersfield", "Delano", "Arvin", "Shafter", "Tehachapi", "Wasco"]
+
+def make_memories(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Generate deterministic resource-like memories."""
+    rng = random.Random(seed)
+    memories = []
+    for i in range(count):
+        topic, place = rng.choice(TOPICS), rng.choice(PLACES)
+        sentences = [
+            f"This {topic} resource serves residents of {place} and nearby communities.",
+            f"Services are offered {rng.choice(['weekdays', 'weekends', 'by appointment'])} at no cost to eligible families.",
+            f"The program has operated for {rng.randint(2, 30)} years and partners with {rng.randint(1, 12)} local agencies.",
+            f"Contact the {place} office for eligibility requirements and current wait times.",
+        ]
+        memories.append({
+            "memory_id": f"bench_memory_{i}",
+            "content": " ".join(sentences * rng.randint(1, 4)),
+            "content_type": "text",
+            "source": "benchmark",
+        })
+    return memories
+
+def run_layer3(generator: SummaryGenerator, memories: List[Dict[str, Any]], workers: int) -> Dict[str, float]:
+    """Summarize all memories and return throughput figures."""
+    start = time.perf_counter()
+    summaries = list(generator.summarize_many(memories, ["general"], max_workers=workers))
+    elapsed = time.perf_counter() - start
+    return {"summaries": len(summaries), "seconds": elapsed, "per_second": len(summaries) / elapsed}
+
+def run_layer4(generator: MetaCommentaryGenerator, memories: List[Dict[str, Any]], group_size: int) -> Dict[str, float]:
+    """Generate connection commentaries for consecutive groups and return throughput figures."""
+    groups = [memories[i:i + group_size] for i in range(0, len(memories) - 1, group_size)]
+    groups = [group for group in groups if len(group) > 1]
+
+    start = time.perf_counter()
+    commentaries = [generator.generate_meta_commentary(group, "connections") for group in groups]
+    elapsed = time.perf_counter() - start
+    produced = len([c for c in commentaries if c])
+    return {"commentaries": produced, "seconds": elapsed, "per_second": produced / elapsed if elapsed else 0.0}
+
+def main():
+    """Run the benchmark and print throughput for both layers."""
+    parser = argparse.ArgumentParser(description="Benchmark Layer 3/4 enrichment throughput against the LLM stand-in")
+    parser.add_argument("--memories", type=int, default=100, help="Number of memories to enrich")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent Layer 3 requests")
+    parser.add_argument("--group-size", type=int, default=5, help="Memories per Layer 4 group")
+    parser.add_argument("--mode", choices=["record", "replay", "synthetic"], default="synthetic")
+    parser.add_argument("--cassette", default=None, help="Cassette file (JSON Lines)")
+    parser.add_argument("--latency", default="lognormal:400:0.5", help="Stand-in latency distribution")
+    parser.add_argument("--seed", type=int, default=7, help="Seed for memories and latency")
+    args = parser.parse_args()
+
+    memories = make_memories(args.memories, args.seed)
+
+    # Record mode needs real keys; the stand-in ignores them otherwise
+    openai_key = os.getenv("OPENAI_API_KEY", "bench") if args.mode == "record" else "bench"
+    anthropic_key = os.getenv("ANTHROPIC_API_KEY", "bench") if args.mode == "record" else "bench"
+
+    with LLMStandIn(args.cassette, args.mode, args.latency, args.seed) as standin:
+        summary_generator = SummaryGenerator(api_key=openai_key, base_url=standin.openai_base_url)
+        summary_generator.cache = None
+        summary_generator.engine = "llm"
+        meta_generator = MetaCommentaryGenerator(api_key=anthropic_key, base_url=standin.anthropic_base_url)
+
+        layer3 = run_layer3(summary_generator, memories, args.workers)
+        layer4 = run_layer4(meta_generator, memories, args.group_size)
+
+    print(f"Layer 3: {layer3['summaries']} summaries in {layer3['seconds']:.2f}s ({layer3['per_second']:.1f}/s, {args.workers} workers)")
+    print(f"Layer 4: {layer4['commentaries']} commentaries in {layer4['seconds']:.2f}s ({layer4['per_second']:.1f}/s)")
+    print(f"Stand-in: {json.dumps(standin.stats)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+OpenAI Client Benchmark
+
+Measures per-call latency of chat completions made with a fresh
+openai.OpenAI client per call (the old Layer 3 behaviour) versus the shared
+pooled client from memory_system.llm_clients. Calls go to the local LLM
+stand-in (memory_system.llm_standin) in synthetic mode, so no API key or
+network access is needed.
+
+Usage:
+    python benchmarks/bench_openai_client.py --calls 200 --latency-ms 5
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+# Make the memory_system package importable when run from the repository root
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+import openai
+
+from memory_system.llm_clients import get_openai_client
+from memory_system.llm_standin import LLMStandIn
+
+def run_calls(make_client: Callable[[], openai.OpenAI], calls: int) -> List[float]:
+    """Make the given number of chat completion calls and return per-call latencies in ms."""
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        client = make_client()
+        client.chat.completions.create(
+            model="stand-in",
+            messages=[{"role": "user", "content": "Summarize this."}],
+            max_tokens=16
+        )
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return latencies
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Compute latency statistics in ms."""
+    ordered = sorted(latencies)
+    return {
+        "mean": statistics.mean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[int(len(ordered) * 0.95) - 1],
+        "max": ordered[-1],
+    }
+
+def main():
+    """Run the benchmark and print a latency comparison."""
+    parser = argparse.ArgumentParser(description="Benchmark shared vs per-call OpenAI clients")
+    parser.add_argument("--calls", type=int, default=200, help="Calls per client mode")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated server latency")
+    args = parser.parse_args()
+
+    with LLMStandIn(mode="synthetic", latency=f"fixed:{args.latency_ms}") as standin:
+        base_url = standin.openai_base_url
+        fresh = run_calls(lambda: openai.OpenAI(api_key="bench", base_url=base_url), args.calls)
+        shared = run_calls(lambda: get_openai_client("bench", base_url), args.calls)
+
+    print(f"{'mode':<8} {'mean':>8} {'p50':>8} {'p95':>8} {'max':>8}  (ms/call, {args.calls} calls)")
+    for name, latencies in (("fresh", fresh), ("shared", shared)):
+        stats = summarize(latencies)
+        print(f"{name:<8} {stats['mean']:>8.2f} {stats['p50']:>8.2f} {stats['p95']:>8.2f} {stats['max']:>8.2f}")
+
+if __name__ == "__main__":
+    main()
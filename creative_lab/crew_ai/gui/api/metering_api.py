@@ -0,0 +1,96 @@
+"""
+Metering API
+
+This module provides API endpoints for the token usage and estimated cost
+of the memory system's LLM calls.
+"""
+
+import time
+import logging
+from flask import Blueprint, request, jsonify
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Import the memory system meter
+try:
+    from memory_system.metering import meter
+    METERING_AVAILABLE = True
+except ImportError:
+    logger.error("Memory system metering not found.")
+    METERING_AVAILABLE = False
+
+# Create the blueprint
+metering_api = Blueprint('metering_api', __name__)
+
+@metering_api.route('/api/metering/report', methods=['GET'])
+def get_report():
+    """
+    Get LLM usage and cost totals.
+
+    Query parameters:
+        since_hours: Only include the last N hours (optional)
+        group_by: Comma-separated grouping columns (default: layer,method,model)
+
+    Returns:
+        A JSON response with the report rows and totals
+    """
+    if not METERING_AVAILABLE:
+        return jsonify({
+            'success': False,
+            'error': 'Metering not available'
+        }), 500
+
+    try:
+        since_hours = request.args.get('since_hours', type=float)
+        group_by = request.args.get('group_by', 'layer,method,model')
+
+        since = time.time() - since_hours * 3600 if since_hours else None
+        columns = [column.strip() for column in group_by.split(',') if column.strip()]
+        report = meter.report(since, columns)
+
+        return jsonify({
+            'success': True,
+            'rows': report['rows'],
+            'totals': report['totals']
+        })
+    except Exception as e:
+        logger.error(f"Error building metering report: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@metering_api.route('/api/metering/recent', methods=['GET'])
+def get_recent():
+    """
+    Get the most recent metered calls, newest first.
+
+    Query parameters:
+        limit: Maximum number of calls (default: 100)
+
+    Returns:
+        A JSON response with the calls
+    """
+    if not METERING_AVAILABLE:
+        return jsonify({
+            'success': False,
+            'error': 'Metering not available'
+        }), 500
+
+    limit = request.args.get('limit', 100, type=int)
+    return jsonify({
+        'success': True,
+        'calls': meter.recent(limit)
+    })
+
+def register_metering_api(app):
+    """
+    Register the metering API with the Flask app.
+
+    Args:
+        app: The Flask app
+    """
+    app.register_blueprint(metering_api)
+    logger.info("Metering API registered")
@@ -138,6 +138,14 @@ class CrewAIGUI:
         except ImportError as e:
             logger.warning(f"Excel Analysis API not available: {e}")
 
+        # Register the LLM usage and cost metering API
+        try:
+            from creative_lab.crew_ai.gui.api.metering_api import register_metering_api
+            register_metering_api(self.app)
+            logger.info("Metering API registered")
+        except ImportError as e:
+            logger.warning(f"Metering API not available: {e}")
+
         # Set up routes
         self._setup_routes()
 
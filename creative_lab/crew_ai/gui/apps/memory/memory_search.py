@@ -24,6 +24,68 @@ except ImportError:
     logger.warning("Memory System not available. Will use local storage.")
     MEMORY_SYSTEM_AVAILABLE = False
 
+# Tag dictionary and co-occurrence matrix for tag matching and facets
+try:
+    from memory_system.tag_cooccurrence import tag_cooccurrence
+    from memory_system.tag_dictionary import tag_dictionary
+    TAG_DICTIONARY_AVAILABLE = True
+except ImportError:
+    tag_cooccurrence = None
+    tag_dictionary = None
+    TAG_DICTIONARY_AVAILABLE = False
+
+def _tag_keys(tags: List[Dict[str, Any]]) -> frozenset:
+    """
+    Convert a list of tag dictionaries to a set of comparable tag keys.
+
+    Tags are mapped to their integer IDs (looked up, not interned) when the
+    tag dictionary is available, otherwise (type, value) tuples are used.
+
+    Args:
+        tags: List of tag dictionaries with 'type' and 'value'
+
+    Returns:
+        Frozen set of tag keys
+    """
+    if TAG_DICTIONARY_AVAILABLE:
+        return frozenset(tag_dictionary.keys(tags))
+    return frozenset((tag.get("type"), tag.get("value")) for tag in tags)
+
+def _facet_counts(results: List[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+    """
+    Count tag values across search results without querying storage.
+
+    Args:
+        results: Search results with optional 'tags'
+
+    Returns:
+        Dictionary of tag type to {tag value: number of results}
+    """
+    if TAG_DICTIONARY_AVAILABLE:
+        return tag_cooccurrence.facet_counts(results)
+
+    facets = {}
+    for result in results:
+        for tag_type, tag_value in _tag_keys(result.get("tags", [])):
+            values = facets.setdefault(tag_type, {})
+            values[tag_value] = values.get(tag_value, 0) + 1
+    return facets
+
+def _related_tags(tags: Optional[List[Dict[str, Any]]], k: int = 10) -> List[Dict[str, Any]]:
+    """
+    Get refinement suggestions for a set of search tags.
+
+    Args:
+        tags: Tags the search was filtered by
+        k: Maximum number of suggestions
+
+    Returns:
+        List of related tag dictionaries with 'type', 'value', 'count' and 'score'
+    """
+    if not tags or not TAG_DICTIONARY_AVAILABLE:
+        return []
+    return tag_cooccurrence.related(tags, k=k)
+
 class MemorySearch:
     """
     Provides search functionality for the memory system.
@@ -34,7 +96,9 @@ class MemorySearch:
         memory_dir: str = "memory_data",
         config_path: Optional[str] = None,
         openai_api_key: Optional[str] = None,
-        anthropic_api_key: Optional[str] = None
+        anthropic_api_key: Optional[str] = None,
+        summary_storage: Optional[Any] = None,
+        connection_graph: Optional[Any] = None
     ):
         """
         Initialize the Memory Search.
@@ -44,8 +108,12 @@ class MemorySearch:
             config_path: Path to memory system config
             openai_api_key: OpenAI API key
             anthropic_api_key: Anthropic API key
+            summary_storage: SummaryStorage used to attach stored Layer 3 summaries to results (optional)
+            connection_graph: ConnectionGraph used to find meta-analyses and related memories (optional)
         """
         self.memory_dir = Path(memory_dir)
+        self.summary_storage = summary_storage
+        self.connection_graph = connection_graph
 
         # Initialize memory system if available
         if MEMORY_SYSTEM_AVAILABLE:
@@ -59,6 +127,65 @@ class MemorySearch:
             self.memory_system = None
             logger.warning("Using local storage instead of Memory System")
 
+    def _attach_summaries(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Attach stored general summaries to a page of results in one lookup.
+
+        Args:
+            results: Search results with 'memory_id'
+
+        Returns:
+            The same results, with 'summary' set where one is stored
+        """
+        if not self.summary_storage or not results:
+            return results
+
+        try:
+            summaries = self.summary_storage.get_summary_texts([r["memory_id"] for r in results if r.get("memory_id")])
+            for result in results:
+                if result.get("memory_id") in summaries:
+                    result["summary"] = summaries[result["memory_id"]]
+        except Exception as e:
+            logger.error(f"Error attaching summaries: {e}")
+
+        return results
+
+    def index_meta_analyses(self, force: bool = False) -> int:
+        """
+        Record the local Layer 4 meta-analysis files in the connection graph.
+
+        Each file is linked to the memories it covers under its file stem,
+        so get_memory can open just the files of a memory. This scans the
+        whole layer once; a marker file keeps later calls from scanning
+        again unless forced. Files written afterwards should be recorded
+        with connection_graph.add_commentary(file stem, memory IDs).
+
+        Args:
+            force: Scan again even if the layer was already indexed
+
+        Returns:
+            Number of meta-analysis files recorded
+        """
+        layer4_dir = self.memory_dir / "layer4"
+        marker_path = layer4_dir / ".graph_indexed"
+        if self.connection_graph is None or not layer4_dir.exists() or (marker_path.exists() and not force):
+            return 0
+
+        indexed = 0
+        for file_path in layer4_dir.glob("*.json"):
+            try:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    memory_ids = json.load(f).get("memory_ids", [])
+                if memory_ids:
+                    self.connection_graph.add_commentary(file_path.stem, memory_ids)
+                    indexed += 1
+            except Exception as e:
+                logger.error(f"Error indexing meta-analysis file {file_path}: {e}")
+
+        marker_path.touch()
+        logger.info(f"Recorded {indexed} meta-analysis files in the connection graph")
+        return indexed
+
     def search(
         self,
         query: str,
@@ -166,10 +293,11 @@ class MemorySearch:
                     "success": True,
                     "search_type": "vector",
                     "query": query,
-                    "results": results,
+                    "results": self._attach_summaries(results),
                     "total": len(results),
                     "limit": limit,
-                    "offset": offset
+                    "offset": offset,
+                    "facets": _facet_counts(results)
                 }
             else:
                 # Use local storage for search
@@ -221,10 +349,11 @@ class MemorySearch:
                     "success": True,
                     "search_type": "vector",
                     "query": query,
-                    "results": paginated_results,
+                    "results": self._attach_summaries(paginated_results),
                     "total": len(results),
                     "limit": limit,
-                    "offset": offset
+                    "offset": offset,
+                    "facets": _facet_counts(results)
                 }
         except Exception as e:
             logger.error(f"Error performing vector search: {e}")
@@ -266,7 +395,9 @@ class MemorySearch:
                     "results": results,
                     "total": len(results),
                     "limit": limit,
-                    "offset": offset
+                    "offset": offset,
+                    "facets": _facet_counts(results),
+                    "related_tags": _related_tags(tags)
                 }
             else:
                 # Use local storage for search
@@ -275,6 +406,8 @@ class MemorySearch:
                 # Search in Layer 2 (metadata and tags)
                 layer2_dir = self.memory_dir / "layer2"
                 if layer2_dir.exists():
+                    search_keys = _tag_keys(tags)
+
                     for file_path in layer2_dir.glob("*.json"):
                         try:
                             with open(file_path, "r", encoding="utf-8") as f:
@@ -282,24 +415,7 @@ class MemorySearch:
                                 file_tags = data.get("tags", [])
 
                                 # Check if all search tags are present
-                                matches_all_tags = True
-                                for search_tag in tags:
-                                    tag_type = search_tag.get("type")
-                                    tag_value = search_tag.get("value")
-
-                                    # Check if this tag is in the file's tags
-                                    tag_found = False
-                                    for file_tag in file_tags:
-                                        if (file_tag.get("type") == tag_type and
-                                            file_tag.get("value") == tag_value):
-                                            tag_found = True
-                                            break
-
-                                    if not tag_found:
-                                        matches_all_tags = False
-                                        break
-
-                                if matches_all_tags:
+                                if search_keys <= _tag_keys(file_tags):
                                     memory_id = file_path.stem
 
                                     # Get content from Layer 1
@@ -343,10 +459,12 @@ class MemorySearch:
                     "search_type": "tag",
                     "tags": tags,
                     "query": query,
-                    "results": paginated_results,
+                    "results": self._attach_summaries(paginated_results),
                     "total": len(results),
                     "limit": limit,
-                    "offset": offset
+                    "offset": offset,
+                    "facets": _facet_counts(results),
+                    "related_tags": _related_tags(tags)
                 }
         except Exception as e:
             logger.error(f"Error performing tag search: {e}")
@@ -449,6 +567,8 @@ class MemorySearch:
                 "total": len(combined_results),
                 "limit": limit,
                 "offset": offset,
+                "facets": _facet_counts(combined_results),
+                "related_tags": _related_tags(tags),
                 "vector_weight": vector_weight,
                 "tag_weight": tag_weight
             }
@@ -516,6 +636,8 @@ class MemorySearch:
                 memory = self.memory_system.get_memory(memory_id)
 
                 if memory:
+                    if self.connection_graph is not None:
+                        memory["related_memories"] = self.connection_graph.related_memories(memory_id)
                     return {
                         "success": True,
                         "memory": memory
@@ -560,7 +682,17 @@ class MemorySearch:
                 meta_analyses = []
                 layer4_dir = self.memory_dir / "layer4"
                 if layer4_dir.exists():
-                    for file_path in layer4_dir.glob("*.json"):
+                    # The connection graph knows which meta-analyses cover the memory,
+                    # so only those files are opened instead of every file in the layer
+                    if self.connection_graph is not None:
+                        self.index_meta_analyses()
+                        result["related_memories"] = self.connection_graph.related_memories(memory_id)
+                        file_paths = [layer4_dir / f"{meta_id}.json" for meta_id in self.connection_graph.commentaries_for(memory_id)]
+                        file_paths = [file_path for file_path in file_paths if file_path.exists()]
+                    else:
+                        file_paths = layer4_dir.glob("*.json")
+
+                    for file_path in file_paths:
                         try:
                             with open(file_path, "r", encoding="utf-8") as f:
                                 data = json.load(f)
@@ -0,0 +1,399 @@
+"""
+Memory Clustering
+
+This module groups memories into coherent clusters for Layer 4 meta
+commentary. Vectors are streamed from Layer 1 in batches and clustered with
+spherical mini-batch k-means in NumPy. Assignments are kept incrementally as
+new memories arrive, and only new or materially changed clusters are
+emitted to Layer 4, so commentary cost follows the rate of change rather
+than the corpus size.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from memory_system.config import config
+
+logger = logging.getLogger("MemorySystem.Clustering")
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize the rows of a matrix."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+class MemoryClusterer:
+    """
+    Incremental spherical mini-batch k-means over memory vectors.
+
+    Centroids are updated with per-centroid learning rates (1 / points seen),
+    so each batch costs O(batch x clusters) regardless of corpus size. Each
+    cluster remembers the members it had when it was last emitted; a
+    cluster is emitted again once enough of its membership has changed.
+    """
+
+    def __init__(
+        self,
+        exact_storage: Any,
+        n_clusters: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        path: Optional[str] = None,
+        min_cluster_size: Optional[int] = None,
+        change_threshold: Optional[float] = None,
+        max_group_size: Optional[int] = None,
+        seed: int = 0
+    ):
+        """
+        Initialize the Memory Clusterer.
+
+        Args:
+            exact_storage: ExactStorage instance the vectors are read from
+            n_clusters: Number of clusters (optional, read from config)
+            batch_size: Vectors per streaming batch (optional, read from config)
+            path: Path prefix of the persisted state, without extension (optional, read from config)
+            min_cluster_size: Smallest cluster worth a meta commentary (optional, read from config)
+            change_threshold: Fraction of changed members that makes a cluster worth re-emitting (optional, read from config)
+            max_group_size: Maximum memories per emitted group, closest to the centroid first (optional, read from config)
+            seed: Random seed for centroid initialization
+        """
+        self.exact_storage = exact_storage
+        self.n_clusters = n_clusters or config.get("clustering.n_clusters", 50)
+        self.batch_size = batch_size or config.get("clustering.batch_size", 1000)
+        self.path = path or config.get("clustering.path", "memory_data/clusters")
+        self.min_cluster_size = min_cluster_size or config.get("clustering.min_cluster_size", 3)
+        self.change_threshold = change_threshold if change_threshold is not None else config.get("clustering.change_threshold", 0.25)
+        self.max_group_size = max_group_size or config.get("clustering.max_group_size", 10)
+        self._rng = np.random.default_rng(seed)
+
+        self.centroids: Optional[np.ndarray] = None
+        self.counts: Optional[np.ndarray] = None
+        self.assignments: Dict[str, int] = {}
+        self.similarities: Dict[str, float] = {}
+        self.emitted: Dict[int, List[str]] = {}
+        self._members: Dict[int, Set[str]] = {}
+        self._lock = threading.RLock()
+
+        self._load()
+
+    def _load(self) -> None:
+        """Load persisted centroids and assignments, if any."""
+        arrays_path, state_path = f"{self.path}.npz", f"{self.path}.json"
+        if not (os.path.exists(arrays_path) and os.path.exists(state_path)):
+            return
+
+        try:
+            arrays = np.load(arrays_path)
+            self.centroids, self.counts = arrays["centroids"], arrays["counts"]
+            with open(state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+
+            self.assignments = state.get("assignments", {})
+            self.similarities = state.get("similarities", {})
+            self.emitted = {int(k): v for k, v in state.get("emitted", {}).items()}
+            for memory_id, cluster in self.assignments.items():
+                self._members.setdefault(cluster, set()).add(memory_id)
+
+            logger.info(f"Loaded {len(self.centroids)} clusters with {len(self.assignments)} memories from {self.path}")
+        except Exception as e:
+            logger.error(f"Error loading clusters: {str(e)}")
+            raise
+
+    def save(self) -> None:
+        """Persist centroids and assignments to disk."""
+        with self._lock:
+            if self.centroids is None:
+                return
+
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+
+                # np.savez appends .npz to names without it
+                tmp_arrays = f"{self.path}.tmp.npz"
+                np.savez(tmp_arrays, centroids=self.centroids, counts=self.counts)
+                os.replace(tmp_arrays, f"{self.path}.npz")
+
+                tmp_state = f"{self.path}.json.tmp"
+                with open(tmp_state, "w", encoding="utf-8") as f:
+                    json.dump({
+                        "assignments": self.assignments,
+                        "similarities": self.similarities,
+                        "emitted": {str(k): v for k, v in self.emitted.items()},
+                    }, f)
+                os.replace(tmp_state, f"{self.path}.json")
+
+                logger.info(f"Saved {len(self.centroids)} clusters to {self.path}")
+            except Exception as e:
+                logger.error(f"Error saving clusters: {str(e)}")
+
+    def _init_centroids(self, vectors: np.ndarray) -> None:
+        """Seed centroids from a batch with k-means++. Caller must hold the lock."""
+        k = min(self.n_clusters, len(vectors))
+        chosen = [int(self._rng.integers(len(vectors)))]
+        distances = 1.0 - vectors @ vectors[chosen[0]]
+
+        for _ in range(1, k):
+            weights = np.maximum(distances, 0.0) ** 2
+            total = weights.sum()
+            index = int(self._rng.choice(len(vectors), p=weights / total)) if total > 0 else int(self._rng.integers(len(vectors)))
+            chosen.append(index)
+            distances = np.minimum(distances, 1.0 - vectors @ vectors[index])
+
+        self.centroids = vectors[chosen].copy()
+        self.counts = np.zeros(k, dtype=np.int64)
+
+    def _grow_centroids(self, vectors: np.ndarray) -> None:
+        """
+        Add centroids at the worst-covered vectors of a batch until n_clusters exist.
+
+        Used when the first batch was smaller than n_clusters. Caller must hold the lock.
+        """
+        _, similarities = self._assign(vectors)
+        missing = self.n_clusters - len(self.centroids)
+        farthest = np.argsort(similarities)[:missing]
+
+        self.centroids = np.vstack([self.centroids, vectors[farthest]])
+        self.counts = np.concatenate([self.counts, np.zeros(len(farthest), dtype=np.int64)])
+
+    def _assign(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the nearest centroid and its cosine similarity for each vector."""
+        similarity = vectors @ self.centroids.T
+        labels = np.argmax(similarity, axis=1)
+        return labels, similarity[np.arange(len(vectors)), labels]
+
+    def _update(self, vectors: np.ndarray, labels: np.ndarray) -> None:
+        """Apply one mini-batch centroid update. Caller must hold the lock."""
+        k = len(self.centroids)
+        batch_counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(self.centroids)
+        np.add.at(sums, labels, vectors)
+
+        touched = batch_counts > 0
+        self.counts[touched] += batch_counts[touched]
+        # Per-centroid learning rate 1/count: the centroid is the running mean of its points
+        rates = batch_counts[touched] / self.counts[touched]
+        means = sums[touched] / batch_counts[touched][:, None]
+        self.centroids[touched] = (1.0 - rates)[:, None] * self.centroids[touched] + rates[:, None] * means
+        self.centroids = _normalize(self.centroids)
+
+    def _set_assignments(self, memory_ids: List[str], labels: np.ndarray, similarities: np.ndarray) -> None:
+        """Record cluster memberships. Caller must hold the lock."""
+        for memory_id, label, similarity in zip(memory_ids, labels.tolist(), similarities.tolist()):
+            previous = self.assignments.get(memory_id)
+            if previous is not None and previous != label:
+                self._members.get(previous, set()).discard(memory_id)
+            self.assignments[memory_id] = label
+            self.similarities[memory_id] = similarity
+            self._members.setdefault(label, set()).add(memory_id)
+
+    def partial_fit(self, memory_ids: List[str], vectors: np.ndarray) -> None:
+        """
+        Add a batch of memories: assign them and update the centroids.
+
+        Args:
+            memory_ids: The memories in the batch
+            vectors: Their vectors, one row per memory
+        """
+        if len(memory_ids) == 0:
+            return
+
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+
+        with self._lock:
+            if self.centroids is None:
+                self._init_centroids(vectors)
+            elif len(self.centroids) < self.n_clusters:
+                self._grow_centroids(vectors)
+
+            labels, similarities = self._assign(vectors)
+            self._update(vectors, labels)
+            self._set_assignments(memory_ids, labels, similarities)
+
+    def fit(self, epochs: int = 1) -> int:
+        """
+        Cluster every stored memory, streaming vectors from Layer 1.
+
+        Training passes update the centroids batch by batch; a final pass
+        assigns every memory to its nearest centroid. Cluster IDs from the
+        previous fit no longer name the same clusters, so every cluster is
+        emitted again afterwards.
+
+        Args:
+            epochs: Number of training passes over the stored vectors
+
+        Returns:
+            Number of memories assigned
+        """
+        with self._lock:
+            self.centroids, self.counts = None, None
+            self.emitted = {}
+
+        for _ in range(epochs):
+            for memory_ids, vectors in self.exact_storage.iter_vectors(self.batch_size):
+                self.partial_fit(memory_ids, vectors)
+
+        assigned = self.reassign()
+        logger.info(f"Clustered {assigned} memories into {len(self.centroids) if self.centroids is not None else 0} clusters")
+        return assigned
+
+    def reassign(self) -> int:
+        """
+        Reassign every stored memory to its nearest current centroid, without updating centroids.
+
+        Returns:
+            Number of memories assigned
+        """
+        if self.centroids is None:
+            return 0
+
+        assigned = 0
+        seen: Set[str] = set()
+        for memory_ids, vectors in self.exact_storage.iter_vectors(self.batch_size):
+            vectors = _normalize(vectors)
+            with self._lock:
+                labels, similarities = self._assign(vectors)
+                self._set_assignments(memory_ids, labels, similarities)
+            seen.update(memory_ids)
+            assigned += len(memory_ids)
+
+        # Forget memories that were deleted from storage
+        with self._lock:
+            for memory_id in set(self.assignments) - seen:
+                self.remove(memory_id)
+
+        return assigned
+
+    def update(self, memory_ids: Iterable[str]) -> int:
+        """
+        Incrementally add newly stored memories, reading only their vectors.
+
+        Args:
+            memory_ids: IDs of the new memories
+
+        Returns:
+            Number of memories added
+        """
+        memory_ids = [memory_id for memory_id in memory_ids if memory_id not in self.assignments]
+        added = 0
+        for start in range(0, len(memory_ids), self.batch_size):
+            chunk = memory_ids[start:start + self.batch_size]
+            for ids, vectors in self.exact_storage.iter_vectors(self.batch_size, memory_ids=chunk):
+                self.partial_fit(ids, vectors)
+                added += len(ids)
+        return added
+
+    def remove(self, memory_id: str) -> None:
+        """
+        Forget a deleted memory.
+
+        Args:
+            memory_id: The memory to remove
+        """
+        with self._lock:
+            cluster = self.assignments.pop(memory_id, None)
+            self.similarities.pop(memory_id, None)
+            if cluster is not None:
+                self._members.get(cluster, set()).discard(memory_id)
+
+    def members(self, cluster_id: int) -> List[str]:
+        """
+        Get the members of a cluster, closest to the centroid first.
+
+        Args:
+            cluster_id: The cluster
+
+        Returns:
+            List of memory IDs
+        """
+        with self._lock:
+            members = self._members.get(cluster_id, set())
+            return sorted(members, key=lambda memory_id: (-self.similarities.get(memory_id, 0.0), memory_id))
+
+    def changed_clusters(self) -> List[int]:
+        """
+        Get the clusters that are new or changed enough since they were last emitted.
+
+        A cluster has changed once the members added or removed since its
+        last emission reach change_threshold of its size.
+
+        Returns:
+            List of cluster IDs
+        """
+        changed = []
+        with self._lock:
+            for cluster_id, members in self._members.items():
+                if len(members) < self.min_cluster_size:
+                    continue
+                previous = set(self.emitted.get(cluster_id, ()))
+                if not previous:
+                    changed.append(cluster_id)
+                    continue
+                delta = len(members ^ previous)
+                if delta / max(len(members), len(previous)) >= self.change_threshold:
+                    changed.append(cluster_id)
+        return sorted(changed)
+
+    def emit_changed(
+        self,
+        handler: Optional[Callable[[str, List[str]], Any]] = None,
+        enrichment_queue: Optional[Any] = None,
+        commentary_type: str = "connections"
+    ) -> List[Dict[str, Any]]:
+        """
+        Send new or changed clusters to Layer 4.
+
+        Each changed cluster becomes a group of at most max_group_size
+        memories (closest to the centroid first), sent to a handler and/or
+        queued as a meta commentary job. Clusters are marked as emitted only
+        once handed off; a cluster the queue rejects is retried next time.
+
+        Args:
+            handler: Called with (group ID, memory IDs) for each group (optional)
+            enrichment_queue: EnrichmentQueue the groups are queued on (optional)
+            commentary_type: Commentary type for queued jobs
+
+        Returns:
+            List of emitted groups with 'group_id', 'cluster_id', 'memory_ids' and 'size'
+        """
+        groups = []
+        for cluster_id in self.changed_clusters():
+            members = self.members(cluster_id)
+            group = {
+                "group_id": f"cluster_{cluster_id}",
+                "cluster_id": cluster_id,
+                "memory_ids": members[:self.max_group_size],
+                "size": len(members),
+            }
+
+            try:
+                if handler:
+                    handler(group["group_id"], group["memory_ids"])
+                if enrichment_queue is not None:
+                    queued = enrichment_queue.enqueue_meta_commentary(
+                        group["group_id"],
+                        group["memory_ids"],
+                        commentary_type,
+                        priority=float(np.log1p(len(members)))
+                    )
+                    if not queued:
+                        # Queue is full; leave the cluster changed so the next run retries it
+                        continue
+            except Exception as e:
+                logger.error(f"Error emitting cluster {cluster_id}: {str(e)}")
+                continue
+
+            with self._lock:
+                self.emitted[cluster_id] = members
+            groups.append(group)
+
+        if groups:
+            self.save()
+
+        logger.info(f"Emitted {len(groups)} new or changed clusters")
+        return groups
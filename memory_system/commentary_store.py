@@ -0,0 +1,194 @@
+"""
+Commentary Store
+
+This module keeps versioned Layer 4 meta commentaries per memory group in
+SQLite. Each version records the memory IDs and content hashes it was built
+from, so a later update can tell exactly which memories were added, removed
+or changed since, and how far the group has drifted from its last full
+regeneration.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from memory_system.config import config
+
+logger = logging.getLogger("MemorySystem.CommentaryStore")
+
+class CommentaryStore:
+    """
+    Versioned store of meta commentaries, keyed by (group_id, commentary_type).
+
+    Versions are append-only; the latest version is the current commentary
+    and older versions are kept up to max_versions per key.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_versions: Optional[int] = None):
+        """
+        Initialize the Commentary Store.
+
+        Args:
+            path: Path of the SQLite database (optional, read from config)
+            max_versions: Versions kept per group and commentary type (optional, read from config)
+        """
+        self.path = path or config.get("layer4.store.path", "memory_data/layer4_commentaries.sqlite")
+        self.max_versions = max_versions or config.get("layer4.store.max_versions", 20)
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS commentaries (
+                group_id TEXT NOT NULL,
+                commentary_type TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                members TEXT NOT NULL,
+                commentary TEXT NOT NULL,
+                update_mode TEXT NOT NULL,
+                drift REAL NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (group_id, commentary_type, version)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _row_to_entry(self, row: tuple) -> Dict[str, Any]:
+        """Convert a database row into an entry dictionary."""
+        return {
+            "group_id": row[0],
+            "commentary_type": row[1],
+            "version": row[2],
+            "members": json.loads(row[3]),
+            "commentary": json.loads(row[4]),
+            "update_mode": row[5],
+            "drift": row[6],
+            "created_at": row[7],
+        }
+
+    def latest(self, group_id: str, commentary_type: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the current version of a group's commentary.
+
+        Args:
+            group_id: ID of the memory group
+            commentary_type: Type of commentary
+
+        Returns:
+            Entry with 'version', 'members' ({memory_id: {'hash', 'excerpt'}}),
+            'commentary', 'update_mode' and 'drift', or None if there is none
+        """
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT group_id, commentary_type, version, members, commentary, update_mode, drift, created_at "
+                    "FROM commentaries WHERE group_id = ? AND commentary_type = ? ORDER BY version DESC LIMIT 1",
+                    (group_id, commentary_type)
+                ).fetchone()
+            return self._row_to_entry(row) if row else None
+        except Exception as e:
+            logger.error(f"Error reading commentary for group {group_id}: {str(e)}")
+            return None
+
+    def history(self, group_id: str, commentary_type: str) -> List[Dict[str, Any]]:
+        """
+        Get all kept versions of a group's commentary, oldest first.
+
+        Args:
+            group_id: ID of the memory group
+            commentary_type: Type of commentary
+
+        Returns:
+            List of entries
+        """
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT group_id, commentary_type, version, members, commentary, update_mode, drift, created_at "
+                    "FROM commentaries WHERE group_id = ? AND commentary_type = ? ORDER BY version",
+                    (group_id, commentary_type)
+                ).fetchall()
+            return [self._row_to_entry(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Error reading commentary history for group {group_id}: {str(e)}")
+            return []
+
+    def save(
+        self,
+        group_id: str,
+        commentary: Dict[str, Any],
+        members: Dict[str, Dict[str, str]],
+        update_mode: str,
+        drift: float
+    ) -> int:
+        """
+        Store a new version of a group's commentary.
+
+        Args:
+            group_id: ID of the memory group
+            commentary: Meta commentary data
+            members: Mapping of memory ID to {'hash', 'excerpt'} the commentary was built from
+            update_mode: "full" or "incremental"
+            drift: Fraction of membership changed since the last full regeneration
+
+        Returns:
+            The new version number
+        """
+        commentary_type = commentary.get("commentary_type", "connections")
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(version) FROM commentaries WHERE group_id = ? AND commentary_type = ?",
+                (group_id, commentary_type)
+            ).fetchone()
+            version = (row[0] or 0) + 1
+
+            self._conn.execute(
+                "INSERT INTO commentaries "
+                "(group_id, commentary_type, version, members, commentary, update_mode, drift, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (group_id, commentary_type, version, json.dumps(members), json.dumps(commentary),
+                 update_mode, drift, time.time())
+            )
+            self._conn.execute(
+                "DELETE FROM commentaries WHERE group_id = ? AND commentary_type = ? AND version <= ?",
+                (group_id, commentary_type, version - self.max_versions)
+            )
+            self._conn.commit()
+
+        logger.info(f"Stored {update_mode} {commentary_type} commentary v{version} for group {group_id}")
+        return version
+
+    def delete(self, group_id: str) -> bool:
+        """
+        Delete every version of a group's commentaries.
+
+        Args:
+            group_id: ID of the memory group
+
+        Returns:
+            True if the commentaries were deleted, False otherwise
+        """
+        try:
+            with self._lock:
+                self._conn.execute("DELETE FROM commentaries WHERE group_id = ?", (group_id,))
+                self._conn.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting commentaries for group {group_id}: {str(e)}")
+            return False
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,481 @@
+"""
+Connection Graph
+
+This module keeps the connections Layer 4 discovers between memories, so
+they can be traversed later instead of being rediscovered. Edges are typed
+and scored: memory-to-memory connections from suggest_new_connections, and
+memory-to-commentary membership edges from meta commentaries.
+
+The graph is stored as compressed sparse row (CSR) arrays that are
+memory-mapped from disk, with rows sorted by score. New edges go to an
+append-only log and an in-memory overlay, which is merged into the arrays
+once it grows past a threshold, so updates never rewrite the whole graph.
+Each merge writes a new version directory and then swaps a manifest that
+names the current version, so readers never see a mix of old and new files.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from memory_system.config import config
+
+logger = logging.getLogger("MemorySystem.ConnectionGraph")
+
+CONNECTION = "connection"
+COMMENTARY = "commentary"
+
+# Commentary nodes share the node table with memories
+COMMENTARY_PREFIX = "commentary:"
+
+ARRAYS = ("indptr", "indices", "scores", "types")
+
+MANIFEST = "manifest.json"
+
+class ConnectionGraph:
+    """
+    Persistent, memory-mapped graph of typed, scored edges between memories.
+
+    Edges are undirected and stored in both directions. Each (node, neighbor,
+    type) triple has one score; adding it again replaces the score.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        compact_threshold: Optional[int] = None,
+        commentary_weight: Optional[float] = None
+    ):
+        """
+        Initialize the Connection Graph.
+
+        Args:
+            path: Directory of the persisted graph (optional, read from config)
+            compact_threshold: Overlay edges that trigger a merge into the arrays (optional, read from config)
+            commentary_weight: Score of memory-to-commentary edges (optional, read from config)
+        """
+        self.path = path or config.get("connection_graph.path", "memory_data/graph")
+        self.compact_threshold = compact_threshold or config.get("connection_graph.compact_threshold", 10000)
+        self.commentary_weight = commentary_weight if commentary_weight is not None else config.get("connection_graph.commentary_weight", 0.5)
+
+        self.nodes: List[str] = []
+        self.node_index: Dict[str, int] = {}
+        self.edge_types: List[str] = [CONNECTION, COMMENTARY]
+
+        # CSR arrays; rows are sorted by descending score
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.scores = np.zeros(0, dtype=np.float32)
+        self.types = np.zeros(0, dtype=np.uint8)
+
+        # Edges added or deleted since the last merge: {src: {(dst, type): score or None}}
+        self._overlay: Dict[int, Dict[Tuple[int, int], Optional[float]]] = {}
+        self._overlay_size = 0
+        self._lock = threading.RLock()
+
+        # Version of the merged arrays; 0 means nothing merged yet
+        self.version = 0
+
+        os.makedirs(self.path, exist_ok=True)
+        self._log_path = os.path.join(self.path, "edges.log")
+        self._load()
+
+    def _version_dir(self, version: int) -> str:
+        """Get the directory of a version of the merged arrays."""
+        # Version 0 is the flat layout written before manifests were used
+        return os.path.join(self.path, f"v{version:06d}") if version else self.path
+
+    def _load_arrays(self, directory: str) -> None:
+        """Memory-map the node table and CSR arrays of a version."""
+        with open(os.path.join(directory, "nodes.json"), "r", encoding="utf-8") as f:
+            state = json.load(f)
+        self.nodes = state.get("nodes", [])
+        self.edge_types = state.get("edge_types", self.edge_types)
+        self.node_index = {node: i for i, node in enumerate(self.nodes)}
+
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r"))
+
+    def _load(self) -> None:
+        """Memory-map the current version of the arrays and replay the edge log."""
+        manifest_path = os.path.join(self.path, MANIFEST)
+
+        try:
+            if os.path.exists(manifest_path):
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    self.version = json.load(f)["version"]
+            if os.path.exists(os.path.join(self._version_dir(self.version), "nodes.json")):
+                self._load_arrays(self._version_dir(self.version))
+
+            replayed = 0
+            if os.path.exists(self._log_path):
+                with open(self._log_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        entry = json.loads(line)
+                        self._set_edge(entry["src"], entry["dst"], entry["type"], entry.get("score"))
+                        replayed += 1
+
+            logger.info(f"Loaded connection graph with {len(self.nodes)} nodes and {len(self.indices)} edges "
+                        f"({replayed} logged changes) from {self.path}")
+        except Exception as e:
+            logger.error(f"Error loading connection graph: {str(e)}")
+            raise
+
+    def _node(self, node_id: str) -> int:
+        """Get the index of a node, adding it if needed."""
+        index = self.node_index.get(node_id)
+        if index is None:
+            index = len(self.nodes)
+            self.nodes.append(node_id)
+            self.node_index[node_id] = index
+        return index
+
+    def _type(self, edge_type: str) -> int:
+        """Get the code of an edge type, adding it if needed."""
+        if edge_type not in self.edge_types:
+            if len(self.edge_types) >= 256:
+                raise ValueError("Too many edge types")
+            self.edge_types.append(edge_type)
+        return self.edge_types.index(edge_type)
+
+    def _set_edge(self, src: str, dst: str, edge_type: str, score: Optional[float]) -> None:
+        """Set (or delete, with score None) an edge in both directions in the overlay."""
+        a, b, code = self._node(src), self._node(dst), self._type(edge_type)
+        for x, y in ((a, b), (b, a)):
+            row = self._overlay.setdefault(x, {})
+            if (y, code) not in row:
+                self._overlay_size += 1
+            row[(y, code)] = score
+
+    def _row(self, index: int) -> Dict[Tuple[int, int], float]:
+        """Get the merged edges of a node as {(neighbor, type): score}."""
+        edges: Dict[Tuple[int, int], float] = {}
+
+        if index < len(self.indptr) - 1:
+            start, end = int(self.indptr[index]), int(self.indptr[index + 1])
+            edges = dict(zip(
+                zip(self.indices[start:end].tolist(), self.types[start:end].tolist()),
+                self.scores[start:end].tolist()
+            ))
+
+        for key, score in self._overlay.get(index, {}).items():
+            if score is None:
+                edges.pop(key, None)
+            else:
+                edges[key] = score
+
+        return edges
+
+    def _append_log(self, entries: List[Dict[str, Any]]) -> None:
+        """Append edge changes to the log."""
+        with open(self._log_path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+
+    def add_edges(self, edges: Iterable[Tuple[str, str, str, float]]) -> int:
+        """
+        Add or update edges.
+
+        Args:
+            edges: (node ID, node ID, edge type, score) tuples
+
+        Returns:
+            Number of edges added
+        """
+        entries = [
+            {"src": src, "dst": dst, "type": edge_type, "score": float(score)}
+            for src, dst, edge_type, score in edges
+            if src and dst and src != dst
+        ]
+        if not entries:
+            return 0
+
+        with self._lock:
+            self._append_log(entries)
+            for entry in entries:
+                self._set_edge(entry["src"], entry["dst"], entry["type"], entry["score"])
+
+            if self._overlay_size >= self.compact_threshold:
+                self.compact()
+
+        return len(entries)
+
+    def add_connections(self, memory_id: str, connections: List[Dict[str, Any]]) -> int:
+        """
+        Add connections suggested for a memory.
+
+        Args:
+            memory_id: The memory the connections were suggested for
+            connections: Connections with 'memory_id' and 'score', as returned by suggest_new_connections
+
+        Returns:
+            Number of edges added
+        """
+        return self.add_edges(
+            (memory_id, c.get("memory_id"), CONNECTION, c.get("score", 1.0))
+            for c in connections
+        )
+
+    def add_commentary(self, commentary_id: str, memory_ids: List[str]) -> int:
+        """
+        Link a meta commentary to the memories it covers, replacing earlier membership.
+
+        Args:
+            commentary_id: ID of the meta commentary
+            memory_ids: The memories the commentary covers
+
+        Returns:
+            Number of edges added
+        """
+        node_id = COMMENTARY_PREFIX + commentary_id
+        with self._lock:
+            self.remove_node(node_id)
+            return self.add_edges(
+                (node_id, memory_id, COMMENTARY, self.commentary_weight)
+                for memory_id in memory_ids
+            )
+
+    def remove_node(self, node_id: str) -> bool:
+        """
+        Delete every edge of a node.
+
+        Args:
+            node_id: Memory ID, or commentary ID with the commentary prefix
+
+        Returns:
+            True if the node had edges, False otherwise
+        """
+        with self._lock:
+            index = self.node_index.get(node_id)
+            if index is None:
+                return False
+
+            entries = [
+                {"src": node_id, "dst": self.nodes[neighbor], "type": self.edge_types[code], "score": None}
+                for neighbor, code in self._row(index)
+            ]
+            if not entries:
+                return False
+
+            self._append_log(entries)
+            for entry in entries:
+                self._set_edge(entry["src"], entry["dst"], entry["type"], None)
+
+            return True
+
+    def neighbors(
+        self,
+        node_id: str,
+        edge_types: Optional[List[str]] = None,
+        min_score: float = 0.0,
+        limit: Optional[int] = None
+    ) -> List[Tuple[str, str, float]]:
+        """
+        Get the direct neighbors of a node.
+
+        Args:
+            node_id: Memory ID, or commentary ID with the commentary prefix
+            edge_types: Only follow these edge types (optional)
+            min_score: Minimum edge score
+            limit: Maximum number of neighbors (optional)
+
+        Returns:
+            List of (neighbor ID, edge type, score) tuples, highest score first
+        """
+        index = self.node_index.get(node_id)
+        if index is None:
+            return []
+
+        codes = {self.edge_types.index(t) for t in edge_types if t in self.edge_types} if edge_types else None
+
+        with self._lock:
+            edges = self._row(index)
+
+        results = [
+            (self.nodes[neighbor], self.edge_types[code], score)
+            for (neighbor, code), score in edges.items()
+            if score >= min_score and (codes is None or code in codes)
+        ]
+        results.sort(key=lambda r: -r[2])
+        return results[:limit] if limit else results
+
+    def k_hop(
+        self,
+        node_id: str,
+        k: int = 2,
+        edge_types: Optional[List[str]] = None,
+        min_score: float = 0.0
+    ) -> Dict[str, Tuple[int, float]]:
+        """
+        Get every node within k hops of a node.
+
+        The score of a path is the product of its edge scores (capped at 1),
+        and each node keeps its best path along with that path's length.
+
+        Args:
+            node_id: Memory ID, or commentary ID with the commentary prefix
+            k: Maximum number of hops
+            edge_types: Only follow these edge types (optional)
+            min_score: Minimum edge score
+
+        Returns:
+            Mapping of node ID to (hops, best path score), excluding the start node
+        """
+        best: Dict[str, Tuple[int, float]] = {node_id: (0, 1.0)}
+        frontier = {node_id: 1.0}
+
+        for hop in range(1, k + 1):
+            next_frontier: Dict[str, float] = {}
+            for current, path_score in frontier.items():
+                for neighbor, _, score in self.neighbors(current, edge_types, min_score):
+                    candidate = path_score * min(score, 1.0)
+                    if neighbor not in best or candidate > best[neighbor][1]:
+                        best[neighbor] = (hop, candidate)
+                        next_frontier[neighbor] = candidate
+            frontier = next_frontier
+            if not frontier:
+                break
+
+        best.pop(node_id)
+        return best
+
+    def related_memories(
+        self,
+        memory_id: str,
+        limit: int = 10,
+        k: int = 2,
+        edge_types: Optional[List[str]] = None,
+        min_score: float = 0.0
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the memories most closely related to a memory through the graph.
+
+        Paths may pass through commentary nodes, so memories covered by the
+        same meta commentary are related at two hops.
+
+        Args:
+            memory_id: The unique identifier of the memory
+            limit: Maximum number of memories
+            k: Maximum number of hops
+            edge_types: Only follow these edge types (optional)
+            min_score: Minimum edge score
+
+        Returns:
+            List of {'memory_id', 'score', 'hops'}, highest score first
+        """
+        reachable = self.k_hop(memory_id, k, edge_types, min_score)
+        related = [
+            {"memory_id": node, "score": round(score, 4), "hops": hops}
+            for node, (hops, score) in reachable.items()
+            if not node.startswith(COMMENTARY_PREFIX)
+        ]
+        related.sort(key=lambda r: (-r["score"], r["hops"]))
+        return related[:limit]
+
+    def commentaries_for(self, memory_id: str) -> List[str]:
+        """
+        Get the IDs of the meta commentaries covering a memory.
+
+        Args:
+            memory_id: The unique identifier of the memory
+
+        Returns:
+            List of commentary IDs
+        """
+        return [
+            node[len(COMMENTARY_PREFIX):]
+            for node, _, _ in self.neighbors(memory_id, [COMMENTARY])
+        ]
+
+    def compact(self) -> None:
+        """
+        Merge the overlay into the CSR arrays and persist them.
+
+        The merged arrays are written to a new version directory, and the
+        manifest is then replaced atomically to point at it. A crash leaves
+        either the old or the new version current, and replaying the edge
+        log over either one gives the same graph.
+        """
+        with self._lock:
+            n = len(self.nodes)
+            base_src = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int64), np.diff(self.indptr))
+            base_keys = (base_src * n + np.asarray(self.indices, dtype=np.int64)) * 256 + np.asarray(self.types, dtype=np.int64)
+
+            overlay_keys, overlay_scores = [], []
+            for src, row in self._overlay.items():
+                for (dst, code), score in row.items():
+                    overlay_keys.append((src * n + dst) * 256 + code)
+                    overlay_scores.append(np.nan if score is None else score)
+            overlay_keys = np.asarray(overlay_keys, dtype=np.int64)
+            overlay_scores = np.asarray(overlay_scores, dtype=np.float32)
+
+            # Overlay entries replace base entries; deletions are NaN and dropped
+            keep = ~np.isin(base_keys, overlay_keys)
+            added = ~np.isnan(overlay_scores)
+            keys = np.concatenate([base_keys[keep], overlay_keys[added]])
+            scores = np.concatenate([np.asarray(self.scores)[keep], overlay_scores[added]])
+
+            src = keys // 256 // n if n else keys
+            order = np.lexsort((-scores, src))
+            keys, scores, src = keys[order], scores[order], src[order]
+
+            arrays = {
+                "indptr": np.concatenate([[0], np.cumsum(np.bincount(src, minlength=n))]).astype(np.int64),
+                "indices": ((keys // 256) % n if n else keys).astype(np.int32),
+                "scores": scores.astype(np.float32),
+                "types": (keys % 256).astype(np.uint8),
+            }
+
+            previous, version = self.version, self.version + 1
+            directory = self._version_dir(version)
+
+            try:
+                shutil.rmtree(directory, ignore_errors=True)
+                os.makedirs(directory)
+                for name, array in arrays.items():
+                    np.save(os.path.join(directory, f"{name}.npy"), array)
+                with open(os.path.join(directory, "nodes.json"), "w", encoding="utf-8") as f:
+                    json.dump({"nodes": self.nodes, "edge_types": self.edge_types}, f)
+
+                # Switch readers to the new version in one atomic rename
+                tmp_path = os.path.join(self.path, f"{MANIFEST}.tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"version": version}, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, os.path.join(self.path, MANIFEST))
+
+                # The arrays now hold every logged change
+                open(self._log_path, "w").close()
+            except Exception as e:
+                logger.error(f"Error saving connection graph: {str(e)}")
+                raise
+
+            self.version = version
+            self._load_arrays(directory)
+            self._overlay = {}
+            self._overlay_size = 0
+
+            if previous:
+                shutil.rmtree(self._version_dir(previous), ignore_errors=True)
+            else:
+                for name in [f"{name}.npy" for name in ARRAYS] + ["nodes.json"]:
+                    if os.path.exists(os.path.join(self.path, name)):
+                        os.remove(os.path.join(self.path, name))
+
+            logger.info(f"Compacted connection graph to {n} nodes and {len(self.indices)} edges")
+
+    def stats(self) -> Dict[str, int]:
+        """Get node and edge counts."""
+        return {
+            "nodes": len(self.nodes),
+            "stored_edges": len(self.indices),
+            "pending_edges": self._overlay_size,
+        }
@@ -0,0 +1,99 @@
+"""
+Embeddings
+
+This module provides the text embedding model shared by the memory system
+components that need to embed short texts locally (tag values, queries).
+"""
+
+import logging
+import threading
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from memory_system.config import config
+
+logger = logging.getLogger("MemorySystem.Embeddings")
+
+class Embedder:
+    """
+    Batched text embedder backed by sentence-transformers.
+
+    The model is loaded lazily on first use so that importing this module
+    stays cheap. A custom embedding function can be supplied instead.
+    """
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None
+    ):
+        """
+        Initialize the Embedder.
+
+        Args:
+            model_name: sentence-transformers model name (optional, read from config)
+            batch_size: Number of texts embedded per model call (optional, read from config)
+            embed_fn: Custom function mapping a list of texts to a list of vectors (optional)
+        """
+        self.model_name = model_name or config.get("embeddings.model", "all-MiniLM-L6-v2")
+        self.batch_size = batch_size or config.get("embeddings.batch_size", 64)
+        self._embed_fn = embed_fn
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        """Load the sentence-transformers model on first use."""
+        with self._lock:
+            if self._model is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                except ImportError:
+                    raise ImportError(
+                        "sentence-transformers not installed. Please install it with: "
+                        "pip install sentence-transformers"
+                    )
+
+                logger.info(f"Loading embedding model: {self.model_name}")
+                self._model = SentenceTransformer(self.model_name)
+            return self._model
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed a list of texts in batches.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Array of shape (len(texts), dim) with L2-normalized embeddings
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        batches = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            if self._embed_fn:
+                vectors = self._embed_fn(batch)
+            else:
+                vectors = self._get_model().encode(batch, show_progress_bar=False)
+            batches.append(np.asarray(vectors, dtype=np.float32))
+
+        matrix = np.vstack(batches)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def embed_one(self, text: str) -> np.ndarray:
+        """
+        Embed a single text.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            L2-normalized embedding vector
+        """
+        return self.embed([text])[0]
@@ -0,0 +1,507 @@
+"""
+Enrichment Queue
+
+This module implements a durable, SQLite-backed job queue for the LLM
+enrichment layers. Layer 1/2 ingest enqueues "summarize memory X" and
+"meta-comment group Y" jobs and returns at storage speed; worker threads
+drain the queue in priority order, bounded by per-provider concurrency.
+"""
+
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from memory_system.config import config
+from memory_system.rate_limiter import backoff_delay
+
+logger = logging.getLogger("MemorySystem.EnrichmentQueue")
+
+# Job types and the provider whose concurrency limit they count against
+SUMMARIZE = "summarize"
+META_COMMENT = "meta_comment"
+DEFAULT_PROVIDERS = {SUMMARIZE: "openai", META_COMMENT: "anthropic"}
+
+def job_priority(
+    timestamp: Optional[str] = None,
+    access_count: int = 0,
+    half_life_hours: Optional[float] = None
+) -> float:
+    """
+    Compute a job priority from the recency and access frequency of a memory.
+
+    Recency decays exponentially with the configured half-life; frequency
+    grows logarithmically so that a few hot memories cannot starve the rest.
+
+    Args:
+        timestamp: ISO timestamp of the memory (optional, treated as now)
+        access_count: Number of times the memory was accessed
+        half_life_hours: Recency half-life in hours (optional, read from config)
+
+    Returns:
+        Priority, higher runs first
+    """
+    half_life_hours = half_life_hours or config.get("enrichment.recency_half_life_hours", 24.0)
+    frequency_weight = config.get("enrichment.frequency_weight", 0.5)
+
+    age_hours = 0.0
+    if timestamp:
+        try:
+            age_hours = max((datetime.now() - datetime.fromisoformat(timestamp)).total_seconds() / 3600.0, 0.0)
+        except ValueError:
+            pass
+
+    recency = 0.5 ** (age_hours / half_life_hours)
+    return recency + frequency_weight * math.log1p(max(access_count, 0))
+
+class EnrichmentQueue:
+    """
+    Durable priority queue of enrichment jobs.
+
+    A job is identified by (job_type, target). Enqueuing a job that is
+    already pending updates it in place (keeping the higher priority)
+    instead of adding a duplicate. Jobs left running by a crashed process
+    are returned to the queue on startup.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_depth: Optional[int] = None,
+        max_attempts: Optional[int] = None
+    ):
+        """
+        Initialize the Enrichment Queue.
+
+        Args:
+            path: Path of the SQLite database (optional, read from config)
+            max_depth: Maximum number of pending jobs before enqueues are rejected (optional, read from config)
+            max_attempts: Attempts per job before it is marked failed (optional, read from config)
+        """
+        self.path = path or config.get("enrichment.path", "memory_data/enrichment_queue.sqlite")
+        self.max_depth = max_depth or config.get("enrichment.max_depth", 100000)
+        self.max_attempts = max_attempts or config.get("enrichment.max_attempts", 3)
+        self.poll_interval = config.get("enrichment.poll_interval", 0.5)
+
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+        self._providers: Dict[str, str] = dict(DEFAULT_PROVIDERS)
+        self._slots: Dict[str, int] = {}
+        self._running: Dict[str, int] = {}
+        self._workers: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Condition()
+        self._lock = threading.Lock()
+
+        self.completed = 0
+        self.failed = 0
+        self._lag_total = 0.0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_type TEXT NOT NULL,
+                target TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                priority REAL NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                enqueued_at REAL NOT NULL,
+                available_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                last_error TEXT
+            )
+            """
+        )
+        # At most one pending job per (job_type, target)
+        self._conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_pending ON jobs (job_type, target) WHERE status = 'pending'"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, provider, priority)")
+
+        recovered = self._conn.execute(
+            "UPDATE jobs SET status = 'pending', started_at = NULL WHERE status = 'running' "
+            "AND NOT EXISTS (SELECT 1 FROM jobs AS p WHERE p.status = 'pending' "
+            "AND p.job_type = jobs.job_type AND p.target = jobs.target)"
+        ).rowcount
+        self._conn.execute("DELETE FROM jobs WHERE status = 'running'")
+        self._conn.commit()
+
+        if recovered:
+            logger.info(f"Recovered {recovered} interrupted enrichment jobs")
+
+    def register_handler(
+        self,
+        job_type: str,
+        handler: Callable[[Dict[str, Any]], Any],
+        provider: Optional[str] = None
+    ) -> None:
+        """
+        Register the function that processes a job type.
+
+        Args:
+            job_type: Job type (e.g. "summarize", "meta_comment")
+            handler: Function called with the job payload
+            provider: Provider whose concurrency limit the job counts against (optional)
+        """
+        self._handlers[job_type] = handler
+        if provider:
+            self._providers[job_type] = provider
+
+    def _provider_slots(self, provider: str) -> int:
+        """Get the maximum number of concurrent jobs for a provider."""
+        if provider not in self._slots:
+            self._slots[provider] = config.get(f"enrichment.concurrency.{provider}", 4)
+        return self._slots[provider]
+
+    def enqueue(
+        self,
+        job_type: str,
+        target: str,
+        payload: Optional[Dict[str, Any]] = None,
+        priority: float = 0.0
+    ) -> bool:
+        """
+        Add a job, or update the pending job for the same target.
+
+        Args:
+            job_type: Job type (e.g. "summarize", "meta_comment")
+            target: What the job is about (memory ID, group ID); jobs are deduplicated per target
+            payload: JSON-serializable job data passed to the handler (optional)
+            priority: Job priority, higher runs first (see job_priority)
+
+        Returns:
+            True if the job is queued, False if the queue is full
+        """
+        provider = self._providers.get(job_type, job_type)
+        now = time.time()
+
+        with self._lock:
+            depth = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'pending'").fetchone()[0]
+            if depth >= self.max_depth:
+                exists = self._conn.execute(
+                    "SELECT 1 FROM jobs WHERE status = 'pending' AND job_type = ? AND target = ?",
+                    (job_type, target)
+                ).fetchone()
+                if not exists:
+                    logger.warning(f"Enrichment queue full ({depth} pending), rejecting {job_type} job for {target}")
+                    return False
+
+            self._conn.execute(
+                "INSERT INTO jobs (job_type, target, provider, payload, priority, status, enqueued_at, available_at) "
+                "VALUES (?, ?, ?, ?, ?, 'pending', ?, ?) "
+                "ON CONFLICT (job_type, target) WHERE status = 'pending' DO UPDATE SET "
+                "payload = excluded.payload, priority = MAX(priority, excluded.priority)",
+                (job_type, target, provider, json.dumps(payload or {}), priority, now, now)
+            )
+            self._conn.commit()
+
+        with self._wakeup:
+            self._wakeup.notify()
+
+        return True
+
+    def enqueue_summary(
+        self,
+        memory: Dict[str, Any],
+        summary_types: Optional[List[str]] = None,
+        access_count: int = 0
+    ) -> bool:
+        """
+        Queue summarization of a memory.
+
+        Args:
+            memory: The memory data (only memory_id and timestamp are used)
+            summary_types: Types of summary to generate (optional)
+            access_count: Number of times the memory was accessed
+
+        Returns:
+            True if the job is queued, False if the queue is full
+        """
+        payload = {"memory_id": memory["memory_id"]}
+        if summary_types:
+            payload["summary_types"] = summary_types
+        return self.enqueue(SUMMARIZE, memory["memory_id"], payload, job_priority(memory.get("timestamp"), access_count))
+
+    def enqueue_meta_commentary(
+        self,
+        group_id: str,
+        memory_ids: List[str],
+        commentary_type: str = "connections",
+        priority: float = 0.0
+    ) -> bool:
+        """
+        Queue meta commentary for a group of memories.
+
+        Args:
+            group_id: Identifier of the group (jobs are deduplicated per group and type)
+            memory_ids: Memories in the group
+            commentary_type: Type of commentary to generate
+            priority: Job priority, higher runs first
+
+        Returns:
+            True if the job is queued, False if the queue is full
+        """
+        payload = {"group_id": group_id, "memory_ids": memory_ids, "commentary_type": commentary_type}
+        return self.enqueue(META_COMMENT, f"{group_id}/{commentary_type}", payload, priority)
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Take the highest-priority runnable job whose provider has a free slot.
+
+        Returns:
+            The claimed job or None if nothing can run now
+        """
+        with self._lock:
+            free = [
+                provider for provider in set(self._providers.values()) | set(self._running)
+                if self._running.get(provider, 0) < self._provider_slots(provider)
+            ]
+            job_types = [job_type for job_type in self._handlers if self._providers.get(job_type, job_type) in free]
+            if not job_types:
+                return None
+
+            placeholders = ",".join("?" * len(job_types))
+            row = self._conn.execute(
+                "SELECT id, job_type, target, provider, payload, attempts, enqueued_at FROM jobs "
+                f"WHERE status = 'pending' AND available_at <= ? AND job_type IN ({placeholders}) "
+                "ORDER BY priority DESC, id LIMIT 1",
+                [time.time()] + job_types
+            ).fetchone()
+            if row is None:
+                return None
+
+            now = time.time()
+            self._conn.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (now, row[0]))
+            self._conn.commit()
+            self._running[row[3]] = self._running.get(row[3], 0) + 1
+            self._lag_total += now - row[6]
+
+        return {
+            "id": row[0],
+            "job_type": row[1],
+            "target": row[2],
+            "provider": row[3],
+            "payload": json.loads(row[4]),
+            "attempts": row[5],
+        }
+
+    def _finish(self, job: Dict[str, Any], error: Optional[str] = None) -> None:
+        """Record the outcome of a job and release its provider slot."""
+        now = time.time()
+
+        with self._lock:
+            self._running[job["provider"]] -= 1
+
+            if error is None:
+                self._conn.execute("DELETE FROM jobs WHERE id = ?", (job["id"],))
+                self.completed += 1
+            else:
+                attempts = job["attempts"] + 1
+                # A newer pending job for the same target supersedes this retry
+                superseded = self._conn.execute(
+                    "SELECT 1 FROM jobs WHERE status = 'pending' AND job_type = ? AND target = ?",
+                    (job["job_type"], job["target"])
+                ).fetchone()
+
+                if superseded:
+                    self._conn.execute("DELETE FROM jobs WHERE id = ?", (job["id"],))
+                elif attempts >= self.max_attempts:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'failed', attempts = ?, finished_at = ?, last_error = ? WHERE id = ?",
+                        (attempts, now, error, job["id"])
+                    )
+                    self.failed += 1
+                else:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'pending', attempts = ?, available_at = ?, last_error = ? WHERE id = ?",
+                        (attempts, now + backoff_delay(attempts, 2.0, 300.0), error, job["id"])
+                    )
+            self._conn.commit()
+
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def run_once(self) -> bool:
+        """
+        Claim and process a single job in the calling thread.
+
+        Returns:
+            True if a job was processed, False if none could run
+        """
+        job = self._claim()
+        if job is None:
+            return False
+
+        try:
+            self._handlers[job["job_type"]](job["payload"])
+            self._finish(job)
+        except Exception as e:
+            logger.error(f"Enrichment job {job['job_type']} for {job['target']} failed: {str(e)}")
+            self._finish(job, str(e))
+        return True
+
+    def _worker(self) -> None:
+        """Worker loop: process jobs until stopped, sleeping while nothing can run."""
+        while not self._stop.is_set():
+            if not self.run_once():
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+
+    def start(self, workers: Optional[int] = None) -> None:
+        """
+        Start the worker threads.
+
+        Args:
+            workers: Number of worker threads (optional, defaults to the total provider concurrency)
+        """
+        if self._workers:
+            return
+
+        if workers is None:
+            providers = {self._providers.get(job_type, job_type) for job_type in self._handlers}
+            workers = sum(self._provider_slots(provider) for provider in providers) or 1
+
+        self._stop.clear()
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"enrichment-{i}", daemon=True)
+            thread.start()
+            self._workers.append(thread)
+
+        logger.info(f"Started {workers} enrichment workers")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the worker threads after their current job.
+
+        Args:
+            timeout: Seconds to wait for each worker (optional)
+        """
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._workers:
+            thread.join(timeout)
+        self._workers = []
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Get queue depth and lag metrics.
+
+        Returns:
+            Dictionary with pending/running/failed counts (total and per provider),
+            the age of the oldest pending job (lag_seconds), the mean time jobs
+            waited before starting, and completed/failed totals
+        """
+        now = time.time()
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT provider, status, COUNT(*), MIN(enqueued_at) FROM jobs GROUP BY provider, status"
+            ).fetchall()
+            started = self.completed + self.failed + sum(self._running.values())
+            mean_wait = self._lag_total / started if started else 0.0
+
+        metrics: Dict[str, Any] = {
+            "pending": 0,
+            "running": 0,
+            "failed": 0,
+            "providers": {},
+            "lag_seconds": 0.0,
+            "mean_wait_seconds": mean_wait,
+            "completed_total": self.completed,
+            "failed_total": self.failed,
+        }
+
+        for provider, status, count, oldest in rows:
+            if status not in ("pending", "running", "failed"):
+                continue
+            metrics[status] += count
+            metrics["providers"].setdefault(provider, {})[status] = count
+            if status == "pending":
+                metrics["lag_seconds"] = max(metrics["lag_seconds"], now - oldest)
+
+        return metrics
+
+    def close(self) -> None:
+        """Stop the workers and close the database connection."""
+        self.stop()
+        with self._lock:
+            self._conn.close()
+
+def summarize_handler(
+    summary_generator: Any,
+    exact_storage: Any
+) -> Callable[[Dict[str, Any]], Any]:
+    """
+    Build the handler for "summarize" jobs.
+
+    The memory is loaded from Layer 1 when the job runs, so the queue only
+    holds its ID. Summaries are persisted through the generator's summary
+    storage, if it has one.
+
+    Args:
+        summary_generator: SummaryGenerator instance
+        exact_storage: ExactStorage instance
+
+    Returns:
+        Handler function
+    """
+    def handle(payload: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        memory = exact_storage.get_memory(payload["memory_id"])
+        if memory is None:
+            logger.warning(f"Skipping summarization of missing memory {payload['memory_id']}")
+            return {}
+        return summary_generator.generate_multiple_summaries(memory, payload.get("summary_types"))
+
+    return handle
+
+def meta_commentary_handler(
+    meta_generator: Any,
+    exact_storage: Any,
+    on_commentary: Optional[Callable[[str, Dict[str, Any]], None]] = None
+) -> Callable[[Dict[str, Any]], Any]:
+    """
+    Build the handler for "meta_comment" jobs.
+
+    The group's stored commentary is updated incrementally when only part
+    of its membership changed.
+
+    Args:
+        meta_generator: MetaCommentaryGenerator instance
+        exact_storage: ExactStorage instance
+        on_commentary: Called with (group_id, commentary) for each result (optional)
+
+    Returns:
+        Handler function
+    """
+    def handle(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        memories = [exact_storage.get_memory(memory_id) for memory_id in payload["memory_ids"]]
+        memories = [memory for memory in memories if memory]
+        if len(memories) < 2:
+            logger.warning(f"Skipping meta commentary for group {payload['group_id']}: fewer than 2 memories")
+            return None
+
+        commentary = meta_generator.update_meta_commentary(
+            payload["group_id"], memories, payload.get("commentary_type", "connections")
+        )
+        if commentary is None:
+            raise RuntimeError(f"No meta commentary generated for group {payload['group_id']}")
+        if on_commentary:
+            on_commentary(payload["group_id"], commentary)
+        return commentary
+
+    return handle
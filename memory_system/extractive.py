@@ -0,0 +1,171 @@
+"""
+Extractive Summarizer
+
+This module implements a local, zero-cost Layer 3 engine that builds
+summaries by selecting the most representative sentences of a text
+(TextRank over TF-IDF sentence vectors, vectorized with NumPy).
+"""
+
+import logging
+import re
+import zlib
+from collections import Counter
+from typing import List, Optional
+
+import numpy as np
+
+from memory_system.config import config
+
+logger = logging.getLogger("MemorySystem.Extractive")
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+|\n+")
+WORD_PATTERN = re.compile(r"[a-z0-9][a-z0-9_\-\.]*[a-z0-9]|[a-z0-9]")
+TECHNICAL_PATTERN = re.compile(r"\d|[_/=<>(){}\[\]]|\b[A-Z]{2,}\b|[a-z][A-Z]")
+
+STOP_WORDS = frozenset(
+    "a an and are as at be been but by for from has have he her his i if in into is it its of on or "
+    "our she so that the their them there these they this to was we were which will with you your".split()
+)
+
+class ExtractiveSummarizer:
+    """
+    Extractive summarizer based on sentence ranking.
+
+    general: TextRank (PageRank over the sentence similarity graph).
+    conceptual: similarity to the document centroid.
+    technical: TextRank boosted for sentences with numbers, identifiers and code.
+    """
+
+    def __init__(
+        self,
+        max_sentences: Optional[int] = None,
+        max_candidates: Optional[int] = None,
+        features: int = 2048,
+        damping: float = 0.85,
+        iterations: int = 30
+    ):
+        """
+        Initialize the Extractive Summarizer.
+
+        Args:
+            max_sentences: Number of sentences per summary (optional, read from config)
+            max_candidates: Sentences kept for the quadratic TextRank step (optional, read from config)
+            features: Size of the hashed TF-IDF feature space
+            damping: TextRank damping factor
+            iterations: TextRank power iterations
+        """
+        self.max_sentences = max_sentences or config.get("layer3.extractive.max_sentences", 5)
+        self.max_candidates = max_candidates or config.get("layer3.extractive.max_candidates", 400)
+        self.features = features
+        self.damping = damping
+        self.iterations = iterations
+
+    def _split_sentences(self, text: str) -> List[str]:
+        """Split text into non-trivial sentences."""
+        sentences = [sentence.strip() for sentence in SENTENCE_PATTERN.split(text)]
+        return [sentence for sentence in sentences if len(sentence) > 20 or (sentence and len(sentence.split()) > 3)]
+
+    def _tfidf(self, sentences: List[str]) -> np.ndarray:
+        """Build L2-normalized hashed TF-IDF vectors for the sentences (one row per sentence)."""
+        # Hashing keeps the matrix width fixed however large the vocabulary gets;
+        # crc32 (unlike hash()) is stable across processes, so summaries are reproducible
+        matrix = np.zeros((len(sentences), self.features), dtype=np.float32)
+        for row, sentence in enumerate(sentences):
+            words = [word for word in WORD_PATTERN.findall(sentence.lower()) if word not in STOP_WORDS]
+            for word, count in Counter(words).items():
+                matrix[row, zlib.crc32(word.encode()) % self.features] += count
+
+        document_frequency = np.count_nonzero(matrix, axis=0)
+        idf = np.log((1 + len(sentences)) / (1 + document_frequency)) + 1.0
+        matrix = np.log1p(matrix) * idf
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _textrank(self, vectors: np.ndarray) -> np.ndarray:
+        """Score sentences with PageRank over their cosine similarity graph."""
+        similarity = vectors @ vectors.T
+        np.fill_diagonal(similarity, 0.0)
+
+        row_sums = similarity.sum(axis=1, keepdims=True)
+        row_sums[row_sums == 0] = 1.0
+        transition = similarity / row_sums
+
+        n = len(vectors)
+        scores = np.full(n, 1.0 / n, dtype=np.float32)
+        for _ in range(self.iterations):
+            scores = (1 - self.damping) / n + self.damping * (transition.T @ scores)
+        return scores
+
+    def rank_sentences(self, text: str, summary_type: str = "general") -> List[str]:
+        """
+        Rank the sentences of a text by importance.
+
+        Args:
+            text: The text to rank
+            summary_type: Ranking strategy (general, technical, conceptual)
+
+        Returns:
+            Sentences, most important first
+        """
+        sentences = self._split_sentences(text)
+        if len(sentences) <= 1:
+            return sentences
+
+        vectors = self._tfidf(sentences)
+        centroid_scores = vectors @ vectors.mean(axis=0)
+
+        if summary_type == "conceptual":
+            order = np.argsort(-centroid_scores, kind="stable")
+            return [sentences[i] for i in order]
+
+        # TextRank is quadratic in sentences, so very long texts are first
+        # narrowed to the sentences closest to the document centroid
+        candidates = np.arange(len(sentences))
+        if len(sentences) > self.max_candidates:
+            candidates = np.sort(np.argsort(-centroid_scores, kind="stable")[:self.max_candidates])
+
+        scores = self._textrank(vectors[candidates])
+        if summary_type == "technical":
+            density = np.array([
+                len(TECHNICAL_PATTERN.findall(sentences[i])) / max(len(sentences[i].split()), 1)
+                for i in candidates
+            ])
+            scores = scores * (1.0 + np.minimum(density, 1.0))
+
+        order = np.argsort(-scores, kind="stable")
+        return [sentences[candidates[i]] for i in order]
+
+    def summarize(self, text: str, summary_type: str = "general", max_sentences: Optional[int] = None) -> str:
+        """
+        Summarize a text by extracting its most representative sentences.
+
+        Args:
+            text: The text to summarize
+            summary_type: Ranking strategy (general, technical, conceptual)
+            max_sentences: Number of sentences to keep (optional)
+
+        Returns:
+            The selected sentences, in their original order
+        """
+        max_sentences = max_sentences or self.max_sentences
+        sentences = self._split_sentences(text)
+        if len(sentences) <= max_sentences:
+            return " ".join(sentences) if sentences else text.strip()
+
+        selected = set(self.rank_sentences(text, summary_type)[:max_sentences])
+        return " ".join(sentence for sentence in sentences if sentence in selected)
+
+    def summarize_many(self, texts: List[str], summary_type: str = "general") -> List[str]:
+        """
+        Summarize many texts.
+
+        Args:
+            texts: The texts to summarize
+            summary_type: Ranking strategy (general, technical, conceptual)
+
+        Returns:
+            List of summaries, in the same order
+        """
+        return [self.summarize(text, summary_type) for text in texts]
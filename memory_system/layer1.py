@@ -10,7 +10,7 @@ import uuid
 import json
 import hashlib
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Union, Tuple
+from typing import Dict, List, Any, Iterator, Optional, Union, Tuple
 import logging
 import numpy as np
 
@@ -319,6 +319,56 @@ class ExactStorage:
             logger.error(f"Error searching similar memories: {str(e)}")
             raise
 
+    def search_similar_batch(
+        self,
+        embeddings: List[List[float]],
+        limit: int = 10,
+        with_payload: Union[bool, List[str]] = True
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for similar memories for many query vectors in one request.
+
+        Args:
+            embeddings: Vector embeddings to search for
+            limit: Maximum number of results per query
+            with_payload: Payload fields to fetch
+
+        Returns:
+            List of result lists, one per query vector, in the same order
+        """
+        if not embeddings:
+            return []
+
+        try:
+            requests = [
+                models.SearchRequest(
+                    vector=list(map(float, embedding)),
+                    limit=limit,
+                    with_payload=with_payload
+                )
+                for embedding in embeddings
+            ]
+
+            batch_result = self.client.search_batch(
+                collection_name=self.collection_name,
+                requests=requests
+            )
+
+            results = []
+            for points in batch_result:
+                memories = []
+                for point in points:
+                    memory = dict(point.payload or {})
+                    memory["score"] = point.score
+                    memories.append(memory)
+                results.append(memories)
+
+            logger.info(f"Searched similar memories for {len(embeddings)} queries")
+            return results
+        except Exception as e:
+            logger.error(f"Error searching similar memories in batch: {str(e)}")
+            raise
+
     def delete_memory(self, memory_id: str) -> bool:
         """
         Delete a memory by its ID.
@@ -434,6 +484,67 @@ class ExactStorage:
             logger.error(f"Error retrieving all memories: {str(e)}")
             raise
 
+    def iter_vectors(
+        self,
+        batch_size: int = 1000,
+        memory_ids: Optional[List[str]] = None
+    ) -> Iterator[Tuple[List[str], np.ndarray]]:
+        """
+        Stream stored memory vectors in batches, one scroll page at a time.
+
+        Args:
+            batch_size: Number of memories per batch
+            memory_ids: Only stream these memories (optional)
+
+        Yields:
+            Tuples of (memory IDs, array of shape (len(memory IDs), vector_size))
+        """
+        scroll_filter = None
+        if memory_ids is not None:
+            scroll_filter = models.Filter(
+                must=[
+                    models.FieldCondition(
+                        key="memory_id",
+                        match=models.MatchAny(any=memory_ids)
+                    )
+                ]
+            )
+
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=scroll_filter,
+                limit=batch_size,
+                offset=offset,
+                with_payload=["memory_id"],
+                with_vectors=True
+            )
+
+            points = [point for point in points if point.vector is not None]
+            if points:
+                ids = [point.payload["memory_id"] for point in points]
+                vectors = np.asarray([point.vector for point in points], dtype=np.float32)
+                yield ids, vectors
+
+            if offset is None:
+                break
+
+    def get_vectors(self, memory_ids: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Get the stored vectors of memories without re-embedding them.
+
+        Args:
+            memory_ids: The unique identifiers of the memories (string IDs)
+
+        Returns:
+            Mapping of memory ID to its stored vector
+        """
+        vectors = {}
+        for ids, batch in self.iter_vectors(max(len(memory_ids), 1), memory_ids=memory_ids):
+            vectors.update(zip(ids, batch))
+        return vectors
+
     def count_memories(
         self,
         content_type: Optional[str] = None,
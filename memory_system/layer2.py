@@ -10,8 +10,9 @@ import uuid
 import json
 import hashlib
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Union, Tuple, Set
+from typing import Dict, List, Any, Iterator, Optional, Union, Tuple, Set
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import numpy as np
 
 try:
@@ -23,6 +24,8 @@ except ImportError:
     )
 
 from memory_system.config import config
+from memory_system.tag_cooccurrence import TagCooccurrence, tag_cooccurrence as default_tag_cooccurrence
+from memory_system.tag_dictionary import MIN_TAG_KEY, TagDictionary, tag_dictionary as default_tag_dictionary, tag_key
 
 logger = logging.getLogger("MemorySystem.Layer2")
 
@@ -33,17 +36,32 @@ class TagStorage:
     Stores machine-readable tags for each memory with vector embeddings for retrieval.
     """
 
-    def __init__(self, client: Optional[QdrantClient] = None):
+    def __init__(
+        self,
+        client: Optional[QdrantClient] = None,
+        tag_index: Optional[Any] = None,
+        tag_dictionary: Optional[TagDictionary] = None,
+        tag_cooccurrence: Optional[TagCooccurrence] = None
+    ):
         """
         Initialize the Tag Storage layer.
 
         Args:
             client: QdrantClient instance (optional)
+            tag_index: TagEmbeddingIndex used for semantic tag expansion (optional)
+            tag_dictionary: TagDictionary used to intern tags to integer IDs (optional)
+            tag_cooccurrence: TagCooccurrence matrix updated on tag writes (optional)
         """
         self.collection_name = config.get("vector_db.collections.memory_tags.name", "memory_tags")
         self.vector_size = config.get("vector_db.collections.memory_tags.vector_size", 384)
         self.distance = config.get("vector_db.collections.memory_tags.distance", "cosine")
 
+        # Tags are interned to integer keys; the type/value strings can be
+        # dropped from payloads once every reader resolves keys instead
+        self.store_tag_strings = config.get("vector_db.collections.memory_tags.store_tag_strings", True)
+        self.tag_dictionary = tag_dictionary if tag_dictionary is not None else default_tag_dictionary
+        self.tag_cooccurrence = tag_cooccurrence if tag_cooccurrence is not None else default_tag_cooccurrence
+
         # Connect to Qdrant
         if client:
             self.client = client
@@ -52,6 +70,12 @@ class TagStorage:
             port = config.get("vector_db.port", 6333)
             self.client = QdrantClient(host=host, port=port)
 
+        self.tag_index = tag_index
+
+        # Tag filters also match the type/value strings until every stored
+        # point is known to carry a current tag key
+        self.tag_keys_complete = False
+
         # Ensure the collection exists
         self._ensure_collection_exists()
 
@@ -83,14 +107,50 @@ class TagStorage:
 
                 # Create payload indexes for efficient filtering
                 self._create_payload_indexes()
+                self.tag_keys_complete = True
 
                 logger.info(f"Collection '{self.collection_name}' created successfully")
             else:
                 logger.info(f"Collection '{self.collection_name}' already exists")
+                self._ensure_tag_keys()
         except Exception as e:
             logger.error(f"Error ensuring collection exists: {str(e)}")
             raise
 
+    def _ensure_tag_keys(self) -> None:
+        """
+        Bring an existing collection up to date with interned tag keys.
+
+        Creates the tag_key payload index if it is missing and counts the
+        points stored before tags were interned. Until no such points
+        remain, tag filters keep matching the type/value strings; run
+        backfill_tag_keys() once to migrate them, or turn on
+        vector_db.collections.memory_tags.backfill_on_setup to do it here.
+        """
+        try:
+            self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name="tag_key",
+                field_schema=models.PayloadSchemaType.INTEGER
+            )
+        except Exception as e:
+            logger.debug(f"Tag key payload index not created: {str(e)}")
+
+        try:
+            if config.get("vector_db.collections.memory_tags.backfill_on_setup", False):
+                self.backfill_tag_keys()
+            else:
+                missing = self.client.count(
+                    collection_name=self.collection_name,
+                    count_filter=self._missing_tag_key_filter(),
+                    exact=True
+                ).count
+                self.tag_keys_complete = missing == 0
+                if missing:
+                    logger.warning(f"{missing} tag points have no current tag key; run backfill_tag_keys()")
+        except Exception as e:
+            logger.error(f"Error checking tag keys, matching tag strings as well: {str(e)}")
+
     def _create_payload_indexes(self) -> None:
         """Create payload indexes for efficient filtering."""
         try:
@@ -115,6 +175,13 @@ class TagStorage:
                 field_schema=models.PayloadSchemaType.KEYWORD
             )
 
+            # Create index for the interned tag key
+            self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name="tag_key",
+                field_schema=models.PayloadSchemaType.INTEGER
+            )
+
             # Create index for timestamp
             self.client.create_payload_index(
                 collection_name=self.collection_name,
@@ -126,6 +193,67 @@ class TagStorage:
         except Exception as e:
             logger.error(f"Error creating payload indexes: {str(e)}")
 
+    def _build_tag_points(
+        self,
+        memory_id: str,
+        tags: List[Dict[str, Any]],
+        embedding: Optional[List[float]] = None
+    ) -> List[models.PointStruct]:
+        """
+        Build the Qdrant points for a memory's tags.
+
+        Args:
+            memory_id: The unique identifier of the memory (string ID)
+            tags: List of tag dictionaries with 'type', 'value', and optional 'score'
+            embedding: Vector embedding for the tags (optional)
+
+        Returns:
+            List of points, one per tag
+        """
+        points = []
+        timestamp = datetime.now().isoformat()
+
+        # Use the provided embedding or a default one
+        tag_embedding = embedding if embedding else [0.0] * self.vector_size
+
+        for i, tag in enumerate(tags):
+            # Generate a unique tag ID string for the payload
+            tag_id_str = f"{memory_id}_tag_{i}"
+
+            # Generate a unique integer ID for Qdrant
+            # Use the first 8 bytes of a UUID as an integer
+            tag_id_int = int(uuid.uuid4().hex[:8], 16)
+
+            tag_type = tag.get("type", "general")
+            tag_value = tag.get("value", "")
+
+            # Prepare the payload
+            payload = {
+                "memory_id": memory_id,  # String memory ID
+                "tag_id": tag_id_str,    # String tag ID
+                "tag_key": tag_key(tag_type, tag_value),
+                "tag_score": tag.get("score", 1.0),
+                "timestamp": timestamp,
+            }
+
+            if self.store_tag_strings:
+                payload["tag_type"] = tag_type
+                payload["tag_value"] = tag_value
+
+            # Add any additional fields from the tag
+            for key, value in tag.items():
+                if key not in ["type", "value", "score"]:
+                    payload[key] = value
+
+            # Create the point with integer ID
+            points.append(models.PointStruct(
+                id=tag_id_int,  # Use integer ID for Qdrant
+                vector=tag_embedding,
+                payload=payload
+            ))
+
+        return points
+
     def add_tags(
         self,
         memory_id: str,
@@ -144,43 +272,7 @@ class TagStorage:
             True if tags were added successfully, False otherwise
         """
         try:
-            # Generate points for each tag
-            points = []
-
-            for i, tag in enumerate(tags):
-                # Generate a unique tag ID string for the payload
-                tag_id_str = f"{memory_id}_tag_{i}"
-
-                # Generate a unique integer ID for Qdrant
-                # Use the first 8 bytes of a UUID as an integer
-                tag_id_int = int(uuid.uuid4().hex[:8], 16)
-
-                # Prepare the payload
-                payload = {
-                    "memory_id": memory_id,  # String memory ID
-                    "tag_id": tag_id_str,    # String tag ID
-                    "tag_type": tag.get("type", "general"),
-                    "tag_value": tag.get("value", ""),
-                    "tag_score": tag.get("score", 1.0),
-                    "timestamp": datetime.now().isoformat(),
-                }
-
-                # Add any additional fields from the tag
-                for key, value in tag.items():
-                    if key not in ["type", "value", "score"]:
-                        payload[key] = value
-
-                # Use the provided embedding or a default one
-                tag_embedding = embedding if embedding else [0.0] * self.vector_size
-
-                # Create the point with integer ID
-                point = models.PointStruct(
-                    id=tag_id_int,  # Use integer ID for Qdrant
-                    vector=tag_embedding,
-                    payload=payload
-                )
-
-                points.append(point)
+            points = self._build_tag_points(memory_id, tags, embedding)
 
             # Store the points
             if points:
@@ -189,6 +281,8 @@ class TagStorage:
                     points=points
                 )
 
+                self._record_written_tags({memory_id: tags})
+
                 logger.info(f"Added {len(points)} tags to memory {memory_id}")
                 return True
             else:
@@ -198,6 +292,103 @@ class TagStorage:
             logger.error(f"Error adding tags: {str(e)}")
             return False
 
+    def _record_written_tags(self, tags_by_memory: Dict[str, List[Dict[str, Any]]]) -> None:
+        """
+        Update the tag dictionary, co-occurrence matrix and tag index for stored tags.
+
+        Args:
+            tags_by_memory: Mapping of memory ID to the tag dictionaries written for it
+        """
+        for tags in tags_by_memory.values():
+            self.tag_dictionary.encode(tags)
+        self.tag_dictionary.save()
+
+        for memory_id, tags in tags_by_memory.items():
+            self.tag_cooccurrence.add_memory_tags(memory_id, tags)
+
+        # Let the tag index embed any new values on its next query
+        if self.tag_index:
+            for tags in tags_by_memory.values():
+                self.tag_index.register(tags)
+
+    def add_tags_bulk(
+        self,
+        tags_by_memory: Dict[str, List[Dict[str, Any]]],
+        embeddings: Optional[Dict[str, List[float]]] = None,
+        batch_size: Optional[int] = None,
+        max_workers: int = 1
+    ) -> int:
+        """
+        Add tags to many memories at once.
+
+        All points are built in a single pass and upserted in chunks of
+        batch_size, optionally by several workers in parallel. Failed chunks
+        are logged rather than raised, and only memories whose points were
+        all stored are recorded in the tag dictionary, co-occurrence matrix
+        and tag index.
+
+        Args:
+            tags_by_memory: Mapping of memory ID to its list of tag dictionaries
+            embeddings: Mapping of memory ID to the vector embedding for its tags (optional)
+            batch_size: Number of points per upsert (optional, read from config)
+            max_workers: Number of parallel upsert workers
+
+        Returns:
+            Number of tag points stored, 0 if every chunk failed
+        """
+        batch_size = batch_size or config.get("vector_db.collections.memory_tags.upsert_batch_size", 512)
+        embeddings = embeddings or {}
+
+        points = []
+        for memory_id, tags in tags_by_memory.items():
+            points.extend(self._build_tag_points(memory_id, tags, embeddings.get(memory_id)))
+
+        if not points:
+            logger.warning("No tags to add")
+            return 0
+
+        chunks = [points[i:i + batch_size] for i in range(0, len(points), batch_size)]
+
+        def upsert_chunk(chunk: List[models.PointStruct]) -> int:
+            self.client.upsert(
+                collection_name=self.collection_name,
+                points=chunk,
+                wait=True
+            )
+            return len(chunk)
+
+        stored = 0
+        failed_memories = set()
+
+        def chunk_failed(chunk: List[models.PointStruct], error: Exception) -> None:
+            logger.error(f"Error adding a batch of {len(chunk)} tags in bulk: {str(error)}")
+            failed_memories.update(point.payload["memory_id"] for point in chunk)
+
+        if max_workers > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(upsert_chunk, chunk): chunk for chunk in chunks}
+                for future in as_completed(futures):
+                    try:
+                        stored += future.result()
+                    except Exception as e:
+                        chunk_failed(futures[future], e)
+        else:
+            for chunk in chunks:
+                try:
+                    stored += upsert_chunk(chunk)
+                except Exception as e:
+                    chunk_failed(chunk, e)
+
+        written = {memory_id: tags for memory_id, tags in tags_by_memory.items() if memory_id not in failed_memories}
+        if written:
+            self._record_written_tags(written)
+
+        if failed_memories:
+            logger.warning(f"Tags of {len(failed_memories)} memories were not fully stored")
+
+        logger.info(f"Added {stored} tags to {len(written)} memories in {len(chunks)} batches")
+        return stored
+
     def get_tags(self, memory_id: str) -> List[Dict[str, Any]]:
         """
         Get all tags for a memory.
@@ -210,9 +401,8 @@ class TagStorage:
         """
         try:
             # Search for tags with the memory_id
-            search_result = self.client.scroll(
-                collection_name=self.collection_name,
-                scroll_filter=models.Filter(
+            points = self._scroll_points(
+                models.Filter(
                     must=[
                         models.FieldCondition(
                             key="memory_id",
@@ -220,25 +410,23 @@ class TagStorage:
                         )
                     ]
                 ),
-                limit=100
+                page_size=100
             )
 
-            # Unpack the tuple returned by scroll
-            points, _ = search_result
-
             # Extract the tags
             tags = []
             for point in points:
                 payload = point.payload
+                tag_type, tag_value = self._payload_tag(payload)
                 tag = {
-                    "type": payload.get("tag_type", "general"),
-                    "value": payload.get("tag_value", ""),
+                    "type": tag_type,
+                    "value": tag_value,
                     "score": payload.get("tag_score", 1.0),
                 }
 
                 # Add any additional fields from the payload
                 for key, value in payload.items():
-                    if key not in ["memory_id", "tag_id", "tag_type", "tag_value", "tag_score", "timestamp"]:
+                    if key not in ["memory_id", "tag_id", "tag_key", "tag_type", "tag_value", "tag_score", "timestamp"]:
                         tag[key] = value
 
                 tags.append(tag)
@@ -249,72 +437,401 @@ class TagStorage:
             logger.error(f"Error retrieving tags: {str(e)}")
             return []
 
-    def search_by_tag(
+    def get_tags_bulk(
         self,
-        tag_type: Optional[str] = None,
-        tag_value: Optional[str] = None,
-        limit: int = 100
-    ) -> List[str]:
+        memory_ids: List[str],
+        batch_size: Optional[int] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
         """
-        Search for memories by tag.
+        Get the tags of many memories with a few memory_id filtered scrolls.
 
         Args:
-            tag_type: The type of tag to search for
-            tag_value: The value of tag to search for
-            limit: Maximum number of results
+            memory_ids: The unique identifiers of the memories (string IDs)
+            batch_size: Number of memory IDs per scroll filter (optional, read from config)
 
         Returns:
-            List of memory IDs
+            Mapping of memory ID to its list of tag dictionaries ('type', 'value', 'score')
         """
-        try:
-            # Prepare filter conditions
-            filter_conditions = []
+        batch_size = batch_size or config.get("vector_db.collections.memory_tags.delete_batch_size", 1000)
+        tags_by_memory: Dict[str, List[Dict[str, Any]]] = {memory_id: [] for memory_id in memory_ids}
 
-            if tag_type:
-                filter_conditions.append(
-                    models.FieldCondition(
-                        key="tag_type",
-                        match=models.MatchValue(value=tag_type)
+        try:
+            unique_ids = list(tags_by_memory.keys())
+            for start in range(0, len(unique_ids), batch_size):
+                chunk = unique_ids[start:start + batch_size]
+                points = self._scroll_points(
+                    models.Filter(
+                        must=[
+                            models.FieldCondition(
+                                key="memory_id",
+                                match=models.MatchAny(any=chunk)
+                            )
+                        ]
                     )
                 )
 
-            if tag_value:
-                filter_conditions.append(
-                    models.FieldCondition(
-                        key="tag_value",
-                        match=models.MatchValue(value=tag_value)
-                    )
+                for point in points:
+                    payload = point.payload
+                    tag_type, tag_value = self._payload_tag(payload)
+                    tags_by_memory[payload["memory_id"]].append({
+                        "type": tag_type,
+                        "value": tag_value,
+                        "score": payload.get("tag_score", 1.0),
+                    })
+
+            logger.info(f"Retrieved tags for {len(tags_by_memory)} memories")
+            return tags_by_memory
+        except Exception as e:
+            logger.error(f"Error retrieving tags in bulk: {str(e)}")
+            return tags_by_memory
+
+    def _payload_tag(self, payload: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Get the (type, value) pair of a stored tag point.
+
+        Args:
+            payload: The tag point payload
+
+        Returns:
+            Tuple of (tag type, tag value)
+        """
+        if "tag_type" in payload or "tag_key" not in payload:
+            return payload.get("tag_type", "general"), payload.get("tag_value", "")
+
+        tag = self.tag_dictionary.resolve(payload["tag_key"])
+        return tag["type"], tag["value"]
+
+    def _missing_tag_key_filter(self) -> models.Filter:
+        """Filter for tag points without a tag key or with one from the old dense numbering."""
+        return models.Filter(
+            should=[
+                models.IsEmptyCondition(is_empty=models.PayloadField(key="tag_key")),
+                models.FieldCondition(key="tag_key", range=models.Range(lt=MIN_TAG_KEY))
+            ]
+        )
+
+    def _tag_conditions(
+        self,
+        tag_type: Optional[str],
+        tag_values: Optional[List[str]]
+    ) -> Optional[List[models.Condition]]:
+        """
+        Build filter conditions for a tag type and/or values.
+
+        Interned integer keys are used for (type, value) pairs, and for a
+        type or values alone when the strings are not stored. Until every
+        stored point carries a current key, the type/value strings and the
+        dense keys of earlier versions are matched as well so older points
+        are still found.
+
+        Args:
+            tag_type: The type of tag (optional)
+            tag_values: Tag values to match any of (optional)
+
+        Returns:
+            List of filter conditions, or None if no stored tag can match
+        """
+        if tag_type and tag_values:
+            keys = [tag_key(tag_type, value) for value in tag_values]
+            if not self.tag_keys_complete:
+                legacy_ids = [self.tag_dictionary.legacy_id(tag_type, value) for value in tag_values]
+                keys.extend(legacy_id for legacy_id in legacy_ids if legacy_id is not None)
+        elif self.store_tag_strings:
+            keys = None
+        elif tag_type:
+            keys = self.tag_dictionary.ids_for_type(tag_type)
+        else:
+            keys = [key for value in tag_values for key in self.tag_dictionary.ids_for_value(value)]
+
+        string_conditions = self._tag_string_conditions(tag_type, tag_values)
+        if keys is None:
+            return string_conditions
+        if not keys:
+            return None if self.tag_keys_complete else string_conditions
+
+        match = models.MatchAny(any=keys) if len(keys) > 1 else models.MatchValue(value=keys[0])
+        key_condition = models.FieldCondition(key="tag_key", match=match)
+        if self.tag_keys_complete:
+            return [key_condition]
+        return [models.Filter(should=[key_condition, models.Filter(must=string_conditions)])]
+
+    def _tag_string_conditions(
+        self,
+        tag_type: Optional[str],
+        tag_values: Optional[List[str]]
+    ) -> List[models.FieldCondition]:
+        """
+        Build filter conditions on the type/value strings of tag points.
+
+        Args:
+            tag_type: The type of tag (optional)
+            tag_values: Tag values to match any of (optional)
+
+        Returns:
+            List of filter conditions
+        """
+        conditions = []
+        if tag_type:
+            conditions.append(
+                models.FieldCondition(
+                    key="tag_type",
+                    match=models.MatchValue(value=tag_type)
                 )
+            )
+        if tag_values:
+            match = models.MatchAny(any=tag_values) if len(tag_values) > 1 else models.MatchValue(value=tag_values[0])
+            conditions.append(
+                models.FieldCondition(
+                    key="tag_value",
+                    match=match
+                )
+            )
+        return conditions
 
-            # Create the filter
-            scroll_filter = None
-            if filter_conditions:
-                scroll_filter = models.Filter(
-                    must=filter_conditions
+    def backfill_tag_keys(self, batch_size: int = 1000) -> int:
+        """
+        Add interned tag keys to tag points stored before tags were interned.
+
+        Points with a key from the old dense numbering are rewritten too.
+        Runs during collection setup; once it completes, tag filters match
+        on keys alone.
+
+        Args:
+            batch_size: Number of points scrolled per request
+
+        Returns:
+            Number of points updated
+        """
+        updated = 0
+
+        try:
+            while True:
+                # Updated points drop out of the filter, so always scroll from the start
+                points, _ = self.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=self._missing_tag_key_filter(),
+                    limit=batch_size
                 )
+
+                if not points:
+                    break
+
+                # Group points by key so each key needs a single set_payload call
+                points_by_key: Dict[int, List[Any]] = {}
+                for point in points:
+                    tag_type, tag_value = self._payload_tag(point.payload)
+                    tag_key = self.tag_dictionary.intern(tag_type, tag_value)
+                    points_by_key.setdefault(tag_key, []).append(point.id)
+
+                for tag_key, point_ids in points_by_key.items():
+                    self.client.set_payload(
+                        collection_name=self.collection_name,
+                        payload={"tag_key": tag_key},
+                        points=point_ids
+                    )
+                    updated += len(point_ids)
+
+            self.tag_dictionary.save()
+            self.tag_keys_complete = True
+            logger.info(f"Backfilled tag keys for {updated} tag points")
+            return updated
+        except Exception as e:
+            logger.error(f"Error backfilling tag keys: {str(e)}")
+            raise
+
+    def _tag_filter(
+        self,
+        tag_type: Optional[str],
+        tag_value: Optional[str],
+        expand: bool = False,
+        threshold: Optional[float] = None
+    ) -> Optional[models.Filter]:
+        """
+        Build the scroll filter for a tag query.
+
+        Args:
+            tag_type: The type of tag to search for (optional)
+            tag_value: The value of tag to search for (optional)
+            expand: Also match tag values semantically close to tag_value (requires a tag index)
+            threshold: Minimum similarity for expanded values (optional)
+
+        Returns:
+            Filter, or None if no stored tag can match
+        """
+        if not tag_type and not tag_value:
+            logger.warning("No tag filters specified")
+            return None
+
+        tag_values = None
+        if tag_value:
+            if expand and self.tag_index:
+                tag_values = self.tag_index.expand(tag_value, tag_type, threshold)
             else:
-                logger.warning("No tag filters specified")
-                return []
+                if expand:
+                    logger.warning("Tag expansion requested but no tag index is configured")
+                tag_values = [tag_value]
+
+        # Prepare filter conditions
+        filter_conditions = self._tag_conditions(tag_type, tag_values)
+        if filter_conditions is None:
+            logger.info("No stored tags match the specified filters")
+            return None
 
-            # Search for tags
-            search_result = self.client.scroll(
+        return models.Filter(
+            must=filter_conditions
+        )
+
+    def _scroll_points(
+        self,
+        scroll_filter: Optional[models.Filter],
+        page_size: int = 1000,
+        with_payload: Union[bool, List[str]] = True
+    ) -> Iterator[Any]:
+        """
+        Stream every tag point matching a filter, one scroll page at a time.
+
+        Args:
+            scroll_filter: Filter to apply (optional)
+            page_size: Number of points per scroll request
+            with_payload: Payload fields to fetch
+
+        Yields:
+            Matching points
+        """
+        offset = None
+
+        while True:
+            points, offset = self.client.scroll(
                 collection_name=self.collection_name,
                 scroll_filter=scroll_filter,
-                limit=limit
+                limit=page_size,
+                offset=offset,
+                with_payload=with_payload
             )
 
-            # Unpack the tuple returned by scroll
-            points, _ = search_result
+            yield from points
 
-            # Extract unique memory IDs
-            memory_ids = set()
-            for point in points:
-                memory_id = point.payload.get("memory_id")
-                if memory_id:
-                    memory_ids.add(memory_id)
+            if not points or offset is None:
+                break
+
+    def search_by_tag_page(
+        self,
+        tag_type: Optional[str] = None,
+        tag_value: Optional[str] = None,
+        cursor: Optional[Any] = None,
+        page_size: Optional[int] = None,
+        expand: bool = False,
+        threshold: Optional[float] = None
+    ) -> Tuple[List[str], Optional[Any]]:
+        """
+        Get one page of memories by tag.
+
+        A memory with several matching tag points can appear on more than one
+        page; use iter_memories_by_tag for a de-duplicated stream.
+
+        Args:
+            tag_type: The type of tag to search for
+            tag_value: The value of tag to search for
+            cursor: Cursor returned by the previous page (None for the first page)
+            page_size: Number of tag points scanned per page (optional, read from config)
+            expand: Also match tag values semantically close to tag_value (requires a tag index)
+            threshold: Minimum similarity for expanded values (optional)
+
+        Returns:
+            Tuple of (list of memory IDs, cursor for the next page or None when done)
+        """
+        page_size = page_size or config.get("vector_db.collections.memory_tags.page_size", 1000)
+
+        try:
+            scroll_filter = self._tag_filter(tag_type, tag_value, expand, threshold)
+            if scroll_filter is None:
+                return [], None
+
+            points, next_cursor = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=scroll_filter,
+                limit=page_size,
+                offset=cursor,
+                with_payload=["memory_id"]
+            )
+
+            memory_ids = list(dict.fromkeys(
+                point.payload.get("memory_id") for point in points if point.payload.get("memory_id")
+            ))
+
+            return memory_ids, next_cursor
+        except Exception as e:
+            logger.error(f"Error searching by tag page: {str(e)}")
+            raise
+
+    def iter_memories_by_tag(
+        self,
+        tag_type: Optional[str] = None,
+        tag_value: Optional[str] = None,
+        page_size: Optional[int] = None,
+        expand: bool = False,
+        threshold: Optional[float] = None
+    ) -> Iterator[str]:
+        """
+        Stream every memory ID with a matching tag.
+
+        Pages through all matching tag points and yields each memory ID once,
+        holding only the current page and the set of IDs already yielded.
+
+        Args:
+            tag_type: The type of tag to search for
+            tag_value: The value of tag to search for
+            page_size: Number of tag points scanned per page (optional, read from config)
+            expand: Also match tag values semantically close to tag_value (requires a tag index)
+            threshold: Minimum similarity for expanded values (optional)
+
+        Yields:
+            Memory IDs
+        """
+        page_size = page_size or config.get("vector_db.collections.memory_tags.page_size", 1000)
+
+        scroll_filter = self._tag_filter(tag_type, tag_value, expand, threshold)
+        if scroll_filter is None:
+            return
+
+        seen = set()
+        for point in self._scroll_points(scroll_filter, page_size, with_payload=["memory_id"]):
+            memory_id = point.payload.get("memory_id")
+            if memory_id and memory_id not in seen:
+                seen.add(memory_id)
+                yield memory_id
+
+    def search_by_tag(
+        self,
+        tag_type: Optional[str] = None,
+        tag_value: Optional[str] = None,
+        limit: Optional[int] = None,
+        expand: bool = False,
+        threshold: Optional[float] = None
+    ) -> List[str]:
+        """
+        Search for memories by tag.
+
+        Args:
+            tag_type: The type of tag to search for
+            tag_value: The value of tag to search for
+            limit: Maximum number of memory IDs (None for all matching memories)
+            expand: Also match tag values semantically close to tag_value (requires a tag index)
+            threshold: Minimum similarity for expanded values (optional)
+
+        Returns:
+            List of memory IDs
+        """
+        try:
+            memory_ids = []
+            for memory_id in self.iter_memories_by_tag(tag_type, tag_value, expand=expand, threshold=threshold):
+                memory_ids.append(memory_id)
+                if limit is not None and len(memory_ids) >= limit:
+                    logger.info(f"Stopped at limit of {limit} memories with matching tags")
+                    break
 
             logger.info(f"Found {len(memory_ids)} memories with matching tags")
-            return list(memory_ids)
+            return memory_ids
         except Exception as e:
             logger.error(f"Error searching by tag: {str(e)}")
             return []
@@ -330,44 +847,87 @@ class TagStorage:
             True if tags were deleted successfully, False otherwise
         """
         try:
-            # First, find all tag points with this memory_id
-            search_result = self.client.scroll(
-                collection_name=self.collection_name,
-                scroll_filter=models.Filter(
-                    must=[
-                        models.FieldCondition(
-                            key="memory_id",
-                            match=models.MatchValue(value=memory_id)
-                        )
-                    ]
-                ),
-                limit=100  # Assuming no more than 100 tags per memory
+            memory_filter = models.Filter(
+                must=[
+                    models.FieldCondition(
+                        key="memory_id",
+                        match=models.MatchValue(value=memory_id)
+                    )
+                ]
             )
 
-            # Unpack the tuple returned by scroll
-            points, _ = search_result
+            count = self.client.count(
+                collection_name=self.collection_name,
+                count_filter=memory_filter,
+                exact=True
+            ).count
 
-            if not points:
+            if not count:
                 logger.warning(f"No tags found for memory {memory_id}")
                 return True  # No tags to delete is still a success
 
-            # Get all internal integer IDs
-            internal_ids = [point.id for point in points]
-
-            # Delete the points using their internal IDs
+            # Delete every tag point of the memory by filter
             self.client.delete(
                 collection_name=self.collection_name,
-                points_selector=models.PointIdsList(
-                    points=internal_ids
+                points_selector=models.FilterSelector(
+                    filter=memory_filter
                 )
             )
 
-            logger.info(f"Deleted {len(internal_ids)} tags for memory {memory_id}")
+            self.tag_cooccurrence.remove_memory(memory_id)
+
+            logger.info(f"Deleted {count} tags for memory {memory_id}")
             return True
         except Exception as e:
             logger.error(f"Error deleting tags: {str(e)}")
             return False
 
+    def delete_tags_bulk(
+        self,
+        memory_ids: List[str],
+        batch_size: Optional[int] = None
+    ) -> bool:
+        """
+        Delete all tags for many memories.
+
+        Deletes by a memory_id filter, so no scroll is needed to find the
+        tag points first.
+
+        Args:
+            memory_ids: The unique identifiers of the memories (string IDs)
+            batch_size: Number of memory IDs per delete request (optional, read from config)
+
+        Returns:
+            True if tags were deleted successfully, False otherwise
+        """
+        batch_size = batch_size or config.get("vector_db.collections.memory_tags.delete_batch_size", 1000)
+
+        try:
+            for start in range(0, len(memory_ids), batch_size):
+                chunk = memory_ids[start:start + batch_size]
+                self.client.delete(
+                    collection_name=self.collection_name,
+                    points_selector=models.FilterSelector(
+                        filter=models.Filter(
+                            must=[
+                                models.FieldCondition(
+                                    key="memory_id",
+                                    match=models.MatchAny(any=chunk)
+                                )
+                            ]
+                        )
+                    )
+                )
+
+            for memory_id in memory_ids:
+                self.tag_cooccurrence.remove_memory(memory_id)
+
+            logger.info(f"Deleted tags for {len(memory_ids)} memories")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting tags in bulk: {str(e)}")
+            return False
+
     def get_all_tag_types(self) -> List[str]:
         """
         Get all unique tag types in the system.
@@ -398,7 +958,7 @@ class TagStorage:
 
                 # Extract tag types
                 for point in points:
-                    tag_type = point.payload.get("tag_type")
+                    tag_type, _ = self._payload_tag(point.payload)
                     if tag_type:
                         all_tags.append(tag_type)
 
@@ -425,27 +985,21 @@ class TagStorage:
             List of unique tag values
         """
         try:
+            filter_conditions = self._tag_conditions(tag_type, None)
+            if filter_conditions is None:
+                return []
+
             # Search for tags with the specified type
-            search_result = self.client.scroll(
-                collection_name=self.collection_name,
-                scroll_filter=models.Filter(
-                    must=[
-                        models.FieldCondition(
-                            key="tag_type",
-                            match=models.MatchValue(value=tag_type)
-                        )
-                    ]
-                ),
-                limit=1000
+            points = self._scroll_points(
+                models.Filter(
+                    must=filter_conditions
+                )
             )
 
-            # Unpack the tuple returned by scroll
-            points, _ = search_result
-
             # Extract unique tag values
             tag_values = set()
             for point in points:
-                tag_value = point.payload.get("tag_value")
+                _, tag_value = self._payload_tag(point.payload)
                 if tag_value:
                     tag_values.add(tag_value)
 
@@ -470,8 +1024,8 @@ class TagStorage:
                 logger.warning("No tags specified")
                 return []
 
-            # Get memories for each tag
-            tag_memory_sets = []
+            # Intersect the memories of each tag
+            result_set = None
 
             for tag in tags:
                 tag_type = tag.get("type")
@@ -480,20 +1034,21 @@ class TagStorage:
                 if not tag_type or not tag_value:
                     continue
 
-                # Get memories with this tag
-                memory_ids = self.search_by_tag(tag_type, tag_value)
+                # Narrow the candidates with this tag, streaming its memories
+                if result_set is None:
+                    result_set = set(self.iter_memories_by_tag(tag_type, tag_value))
+                else:
+                    result_set = {
+                        memory_id for memory_id in self.iter_memories_by_tag(tag_type, tag_value)
+                        if memory_id in result_set
+                    }
 
-                if memory_ids:
-                    tag_memory_sets.append(set(memory_ids))
+                if not result_set:
+                    break
 
-            if not tag_memory_sets:
+            if not result_set:
                 return []
 
-            # Find intersection of all sets
-            result_set = tag_memory_sets[0]
-            for memory_set in tag_memory_sets[1:]:
-                result_set = result_set.intersection(memory_set)
-
             logger.info(f"Found {len(result_set)} memories with all specified tags")
             return list(result_set)
         except Exception as e:
@@ -526,10 +1081,7 @@ class TagStorage:
                     continue
 
                 # Get memories with this tag
-                memory_ids = self.search_by_tag(tag_type, tag_value)
-
-                if memory_ids:
-                    all_memory_ids.update(memory_ids)
+                all_memory_ids.update(self.iter_memories_by_tag(tag_type, tag_value))
 
             logger.info(f"Found {len(all_memory_ids)} memories with any of the specified tags")
             return list(all_memory_ids)
@@ -537,27 +1089,55 @@ class TagStorage:
             logger.error(f"Error finding memories with any tag: {str(e)}")
             return []
 
-    def get_memories_with_tag(self, tag_type: Optional[str] = None, tag_value: Optional[str] = None, limit: int = 100) -> List[str]:
+    def get_memories_with_tag(self, tag_type: Optional[str] = None, tag_value: Optional[str] = None, limit: Optional[int] = None, expand: bool = False) -> List[str]:
         """
         Get memories that have the specified tag.
 
         Args:
             tag_type: The type of tag (optional)
             tag_value: The value of tag (optional)
-            limit: Maximum number of results
+            limit: Maximum number of results (None for all matching memories)
+            expand: Also match semantically close tag values (requires a tag index)
 
         Returns:
             List of memory IDs
         """
         try:
             # Use the existing search_by_tag method
-            memory_ids = self.search_by_tag(tag_type, tag_value, limit)
+            memory_ids = self.search_by_tag(tag_type, tag_value, limit, expand=expand)
             logger.info(f"Found {len(memory_ids)} memories with tag type '{tag_type}' and value '{tag_value}'")
             return memory_ids
         except Exception as e:
             logger.error(f"Error finding memories with tag: {str(e)}")
             return []
 
+    def get_related_tags(
+        self,
+        tags: List[Dict[str, str]],
+        k: int = 10,
+        tag_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the tags that most often co-occur with the specified tags.
+
+        Answered from the co-occurrence matrix without querying storage.
+
+        Args:
+            tags: List of tag dictionaries with 'type' and 'value'
+            k: Maximum number of related tags
+            tag_type: Only return related tags of this type (optional)
+
+        Returns:
+            List of tag dictionaries with 'type', 'value', 'count' and 'score'
+        """
+        try:
+            related = self.tag_cooccurrence.related(tags, k=k, tag_type=tag_type)
+            logger.info(f"Found {len(related)} related tags")
+            return related
+        except Exception as e:
+            logger.error(f"Error finding related tags: {str(e)}")
+            return []
+
     def get_all_tags(self) -> List[Dict[str, Any]]:
         """
         Get all tags in the system.
@@ -585,9 +1165,10 @@ class TagStorage:
 
                 # Extract tags
                 for point in points:
+                    tag_type, tag_value = self._payload_tag(point.payload)
                     tag = {
-                        "type": point.payload.get("tag_type", "general"),
-                        "value": point.payload.get("tag_value", ""),
+                        "type": tag_type,
+                        "value": tag_value,
                         "score": point.payload.get("tag_score", 1.0),
                     }
                     all_tags.append(tag)
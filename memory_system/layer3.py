@@ -11,7 +11,8 @@ In the future, this will be implemented as an agent using Google's A2A protocol.
 import os
 import json
 import logging
-from typing import Dict, List, Any, Optional, Union
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Union
 import time
 from datetime import datetime
 
@@ -23,9 +24,27 @@ except ImportError:
     )
 
 from memory_system.config import config
+from memory_system.extractive import ExtractiveSummarizer
+from memory_system.llm_clients import get_openai_client
+from memory_system.metering import Meter, meter as default_meter
+from memory_system.prompt_builder import PromptBuilder
+from memory_system.provider_router import OpenAIProvider, ProviderRouter
+from memory_system.summary_cache import SummaryCache, content_hash
+from memory_system.tokens import count_tokens, split_into_chunks
 
 logger = logging.getLogger("MemorySystem.Layer3")
 
+# Bump whenever the prompts change so cached results are not reused
+PROMPT_VERSION = "2"
+
+SUMMARY_TYPES = ["general", "technical", "conceptual"]
+
+SUMMARY_INSTRUCTIONS = {
+    "general": "Please provide a comprehensive summary of the following content. Include key points, insights, and implications.",
+    "technical": "Please provide a technical analysis of the following content. Focus on technical details, implementation considerations, and potential challenges.",
+    "conceptual": "Please provide a conceptual explanation of the following content. Focus on the key concepts, their relationships, and their significance.",
+}
+
 class SummaryGenerator:
     """
     Layer 3: Summary Generator
@@ -33,15 +52,31 @@ class SummaryGenerator:
     Generates AI summaries, explanations, and commentaries about memories.
     """
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        cache: Optional[SummaryCache] = None,
+        tagger: Optional[Any] = None,
+        summary_storage: Optional[Any] = None,
+        base_url: Optional[str] = None,
+        router: Optional[ProviderRouter] = None,
+        meter: Optional[Meter] = None
+    ):
         """
         Initialize the Summary Generator.
 
         Args:
             api_key: OpenAI API key (optional, can be set in config or env var)
+            cache: SummaryCache for generated results (optional, created from config)
+            tagger: LocalTagger tried before the LLM when suggesting tags (optional)
+            summary_storage: SummaryStorage that generated summaries are persisted to (optional)
+            base_url: OpenAI API base URL, e.g. a local LLM stand-in (optional, read from config)
+            router: ProviderRouter for hedged, failover calls (optional, built from layer3.routing config)
+            meter: Meter that records the tokens, latency and cost of each call (optional, defaults to the shared meter)
         """
         # Get API key from config, parameter, or environment variable
         self.api_key = api_key or config.get("openai.api_key") or os.getenv("OPENAI_API_KEY")
+        self.base_url = base_url or config.get("openai.base_url")
 
         if not self.api_key:
             logger.warning("No OpenAI API key provided. Layer 3 functionality will be limited.")
@@ -51,19 +86,159 @@ class SummaryGenerator:
             # The client will be created when needed
             logger.info("OpenAI API key provided")
         else:
-            logger.warning("No OpenAI API key provided - Layer 3 will use mock responses")
+            logger.warning("No OpenAI API key provided - Layer 3 will use extractive summaries")
+
+        # Summary engine: llm, extractive (local, zero cost) or auto (LLM for high-value memories only)
+        self.engine = config.get("layer3.engine", "llm")
+        self.llm_min_priority = config.get("layer3.llm_min_priority", 1)
+        self.extractive = ExtractiveSummarizer()
+        self.tagger = tagger
+        self.summary_storage = summary_storage
 
         # Get model configuration
         self.model = config.get("openai.model", "gpt-3.5-turbo")
         self.temperature = config.get("openai.temperature", 0.7)
         self.max_tokens = config.get("openai.max_tokens", 500)
+        self.prompts = PromptBuilder(self.model)
 
         logger.info(f"Using OpenAI model: {self.model}")
 
+        self.max_retries = config.get("openai.max_retries", 5)
+
+        # OpenAI first; other providers from layer3.routing.providers take over or hedge slow calls
+        if router is not None:
+            self.router = router
+        else:
+            self.router = ProviderRouter.from_config(
+                "layer3", OpenAIProvider(self.api_key, self.base_url, self.model, self.max_retries)
+            )
+        self.max_workers = config.get("layer3.max_workers", 8)
+        self.meter = meter if meter is not None else default_meter
+
+        # Content longer than this is summarized chunk by chunk (map-reduce)
+        self.long_content_tokens = config.get("layer3.long_content_tokens", 3000)
+        self.chunk_tokens = config.get("layer3.chunk_tokens", 2000)
+
+        # Running totals of what combined multi-type calls saved
+        self.combined_stats = {
+            "combined_calls": 0,
+            "calls_saved": 0,
+            "prompt_tokens_saved": 0,
+            "latency_saved": 0.0,
+        }
+
+        # Set up the result cache
+        if cache is not None:
+            self.cache = cache
+        elif config.get("layer3.cache.enabled", True):
+            self.cache = SummaryCache()
+        else:
+            self.cache = None
+
+    def _memory_hash(self, memory: Dict[str, Any]) -> str:
+        """
+        Get the cache hash for a memory.
+
+        Uses the Layer 1 content hash, extended with the tags when present
+        since they are part of the prompt.
+
+        Args:
+            memory: The memory data
+
+        Returns:
+            Hash string
+        """
+        hash_value = memory.get("content_hash") or content_hash(memory.get("content", ""))
+        tags = memory.get("tags", [])
+        if tags:
+            tags_key = ",".join(sorted(f"{tag.get('type', 'general')}:{tag.get('value', '')}" for tag in tags))
+            hash_value = content_hash(f"{hash_value}|{tags_key}")
+        return hash_value
+
+    def _cache_get(self, hash_value: str, summary_type: str, method: str) -> Optional[Any]:
+        """Look up a cached result for the current model and prompt version, metering hits under method."""
+        if not self.cache:
+            return None
+        cached = self.cache.get(hash_value, summary_type, self.model, PROMPT_VERSION)
+        if cached:
+            self.meter.record("layer3", method, model=self.model, cache_hit=True)
+        return cached
+
+    def _cache_put(self, hash_value: str, summary_type: str, value: Any) -> None:
+        """Store a result for the current model and prompt version."""
+        if self.cache:
+            self.cache.put(hash_value, summary_type, self.model, PROMPT_VERSION, value)
+
+    @property
+    def client(self) -> Any:
+        """Shared, pooled OpenAI client (built on first use)."""
+        return get_openai_client(self.api_key, self.base_url)
+
+    def _chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int] = None,
+        method: str = "completion"
+    ) -> Dict[str, Any]:
+        """
+        Send a chat call through the provider router.
+
+        Calls are rate limited per provider, rate-limit errors (HTTP 429) are
+        retried with jittered backoff, and slow or failing calls are hedged
+        or failed over to the configured fallback providers. Every call,
+        failed or not, is metered under its method, including requests
+        that lost a hedge, once they finish.
+
+        Args:
+            messages: Chat messages
+            temperature: Sampling temperature
+            max_tokens: Completion token budget (optional, defaults to the configured max_tokens)
+            method: Call site the call is metered under
+
+        Returns:
+            Routed response with 'text', 'usage', 'provider' and 'model'
+        """
+        start = time.time()
+        try:
+            response = self.router.complete(
+                messages,
+                temperature,
+                max_tokens or self.max_tokens,
+                on_abandoned=lambda result: self.meter.record_response("layer3", method, result)
+            )
+        except Exception:
+            self.meter.record("layer3", method, model=self.model, latency=time.time() - start, error=True)
+            raise
+
+        self.meter.record_response("layer3", method, response, time.time() - start)
+        return response
+
+    def warm_cache(
+        self,
+        summaries: List[Dict[str, Any]],
+        content_hashes: Optional[Dict[str, str]] = None
+    ) -> int:
+        """
+        Load previously generated summaries into the cache.
+
+        Args:
+            summaries: Summary dictionaries as returned by generate_summary
+            content_hashes: Mapping of memory ID to cache hash for summaries without one (optional)
+
+        Returns:
+            Number of summaries loaded
+        """
+        if not self.cache:
+            logger.warning("Cannot warm cache: summary cache is disabled")
+            return 0
+        return self.cache.warm(summaries, PROMPT_VERSION, content_hashes)
+
     def generate_summary(
         self,
         memory: Dict[str, Any],
-        summary_type: str = "general"
+        summary_type: str = "general",
+        engine: Optional[str] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Generate a summary for a memory.
@@ -71,120 +246,480 @@ class SummaryGenerator:
         Args:
             memory: The memory data
             summary_type: Type of summary to generate (general, technical, conceptual)
+            engine: Summary engine (llm, extractive, auto), or None for layer3.engine from config
 
         Returns:
             Summary data or None if generation failed
         """
-        if not self.api_key:
-            logger.warning("Cannot generate summary: No OpenAI API key provided")
-            return self._generate_mock_summary(memory, summary_type)
+        hash_value = self._memory_hash(memory)
+        cached = self._cache_get(hash_value, summary_type, "summary")
+        if cached:
+            cached["memory_id"] = memory.get("memory_id")
+            logger.info(f"Using cached {summary_type} summary for memory {memory.get('memory_id')}")
+            return cached
+
+        if self._select_engine(memory, engine) == "extractive":
+            return self._generate_extractive_summary(memory, summary_type)
 
         try:
             # Extract memory content and tags
-            content = memory.get("content", "")
-            tags = memory.get("tags", [])
+            content = self.prompts.compact_text(memory.get("content", ""), "summary")
+            tags_text = self._format_tags_text(memory.get("tags", []))
 
-            # Format tags for the prompt
-            tags_text = ""
-            if tags:
-                tags_text = "Tags:\n" + "\n".join([f"- {tag.get('type', 'general')}: {tag.get('value', '')}" for tag in tags])
+            if count_tokens(content, self.model) > self.long_content_tokens:
+                summary_text = self._summarize_long_content(content, summary_type, tags_text)
+                summary = self._make_summary(memory, summary_type, summary_text, hash_value)
+                self._cache_put(hash_value, summary_type, summary)
+
+                logger.info(f"Generated {summary_type} summary for long memory {memory.get('memory_id')}")
+                return summary
 
             # Create prompt based on summary type
-            if summary_type == "technical":
-                prompt = f"Please provide a technical analysis of the following content. Focus on technical details, implementation considerations, and potential challenges.\n\nContent:\n{content}\n\n{tags_text}"
-            elif summary_type == "conceptual":
-                prompt = f"Please provide a conceptual explanation of the following content. Focus on the key concepts, their relationships, and their significance.\n\nContent:\n{content}\n\n{tags_text}"
-            else:  # general
-                prompt = f"Please provide a comprehensive summary of the following content. Include key points, insights, and implications.\n\nContent:\n{content}\n\n{tags_text}"
-
-            # Call OpenAI API (using the latest client version)
-            client = openai.OpenAI(api_key=self.api_key)
-            response = client.chat.completions.create(
-                model=self.model,
+            instruction = SUMMARY_INSTRUCTIONS.get(summary_type, SUMMARY_INSTRUCTIONS["general"])
+            prompt = f"{instruction}\n\nContent:\n{content}\n\n{tags_text}"
+
+            # Call OpenAI API
+            response = self._chat_completion(
                 messages=[
                     {"role": "system", "content": "You are an expert analyst providing insightful summaries and explanations."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=self.temperature,
-                max_tokens=self.max_tokens
+                method="summary"
             )
 
             # Extract summary text
-            summary_text = response.choices[0].message.content.strip()
+            summary_text = response["text"].strip()
 
             # Create summary data
-            summary = {
-                "memory_id": memory.get("memory_id"),
-                "summary_type": summary_type,
-                "summary_text": summary_text,
-                "model": self.model,
-                "timestamp": datetime.now().isoformat(),
-            }
+            summary = self._make_summary(memory, summary_type, summary_text, hash_value, response)
+            self._cache_put(hash_value, summary_type, summary)
 
             logger.info(f"Generated {summary_type} summary for memory {memory.get('memory_id')}")
             return summary
         except Exception as e:
-            logger.error(f"Error generating summary: {str(e)}")
-            return self._generate_mock_summary(memory, summary_type)
+            logger.error(f"Error generating summary, falling back to extractive summary: {str(e)}")
+            return self._generate_extractive_summary(memory, summary_type)
+
+    def _summarize_long_content(
+        self,
+        content: str,
+        summary_type: str,
+        tags_text: str
+    ) -> str:
+        """
+        Summarize content too long for a single prompt with map-reduce.
+
+        The content is split into token-bounded chunks that are summarized
+        concurrently (map), then the chunk summaries are combined (reduce),
+        in several rounds if they are still too long. Chunk summaries are
+        cached by chunk hash, so re-summarizing an appended document only
+        pays for its new chunks.
+
+        Args:
+            content: The content to summarize
+            summary_type: Type of summary to generate
+            tags_text: Formatted tags block for the final prompt
+
+        Returns:
+            Summary text
+        """
+        instruction = SUMMARY_INSTRUCTIONS.get(summary_type, SUMMARY_INSTRUCTIONS["general"])
+        chunks = split_into_chunks(content, self.chunk_tokens, self.model)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            partials = list(executor.map(lambda chunk: self._summarize_chunk(chunk, summary_type), chunks))
+
+        logger.info(f"Summarized {len(chunks)} chunks of long content")
+
+        # Reduce until the partial summaries fit in one prompt
+        while len(partials) > 1 and count_tokens("\n\n".join(partials), self.model) > self.long_content_tokens:
+            groups = split_into_chunks("\n\n".join(partials), self.chunk_tokens, self.model)
+            if len(groups) >= len(partials):
+                break
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                partials = list(executor.map(lambda group: self._summarize_chunk(group, summary_type), groups))
+
+        parts = "\n\n".join(f"Part {i + 1}:\n{partial}" for i, partial in enumerate(partials))
+        prompt = (
+            f"{instruction}\n\nThe content was too long to read at once, so it is given below as "
+            f"summaries of its consecutive parts.\n\n{parts}\n\n{tags_text}"
+        )
+
+        response = self._chat_completion(
+            messages=[
+                {"role": "system", "content": "You are an expert analyst providing insightful summaries and explanations."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=self.temperature,
+            method="summary_reduce"
+        )
+        return response["text"].strip()
+
+    def _summarize_chunk(self, chunk: str, summary_type: str) -> str:
+        """
+        Summarize one chunk of a long content (map step), using the cache.
+
+        Args:
+            chunk: The chunk text
+            summary_type: Type of the final summary the chunk feeds into
+
+        Returns:
+            Chunk summary text
+        """
+        hash_value = content_hash(chunk)
+        cache_type = f"chunk:{summary_type}"
+
+        cached = self._cache_get(hash_value, cache_type, "summary_chunk")
+        if cached:
+            return cached
+
+        focus = {
+            "technical": "technical details, implementation considerations and challenges",
+            "conceptual": "key concepts and how they relate",
+        }.get(summary_type, "key points, facts and insights")
+
+        response = self._chat_completion(
+            messages=[
+                {"role": "system", "content": "You are an expert analyst providing insightful summaries and explanations."},
+                {"role": "user", "content": f"The following is one part of a longer document. Summarize it concisely, preserving {focus}.\n\n{self.prompts.compact_text(chunk, 'summary_chunk')}"}
+            ],
+            temperature=self.temperature,
+            method="summary_chunk"
+        )
+        summary_text = response["text"].strip()
+
+        self._cache_put(hash_value, cache_type, summary_text)
+        return summary_text
+
+    def _format_tags_text(self, tags: List[Dict[str, Any]]) -> str:
+        """
+        Format tags for inclusion in a prompt, listing each tag type once.
+
+        Args:
+            tags: List of tag dictionaries
+
+        Returns:
+            Tags line, or an empty string when there are no tags
+        """
+        return self.prompts.format_tags(tags)
 
-    def _generate_mock_summary(
+    def _make_summary(
         self,
         memory: Dict[str, Any],
-        summary_type: str
+        summary_type: str,
+        summary_text: str,
+        hash_value: str,
+        response: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
-        Generate a mock summary when API is not available.
+        Build the summary data returned for a memory, noting the provider that served it.
+
+        Results are cached under the configured model whichever provider
+        served them, so a summary from a fallback model also records that
+        'primary_model' for warm_cache to key it the same way.
+        """
+        summary = {
+            "memory_id": memory.get("memory_id"),
+            "summary_type": summary_type,
+            "summary_text": summary_text,
+            "model": response["model"] if response else self.model,
+            "content_hash": hash_value,
+            "timestamp": datetime.now().isoformat(),
+        }
+        if response:
+            summary["provider"] = response["provider"]
+            if response["model"] != self.model:
+                summary["primary_model"] = self.model
+        return summary
+
+    def _select_engine(self, memory: Dict[str, Any], engine: Optional[str]) -> str:
+        """
+        Choose the summary engine for a memory.
+
+        In "auto" mode the LLM is reserved for high-value memories (metadata
+        priority at or above layer3.llm_min_priority) and everything else is
+        summarized locally.
 
         Args:
             memory: The memory data
-            summary_type: Type of summary to generate
+            engine: Requested engine (llm, extractive, auto), or None for the configured engine
 
         Returns:
-            Mock summary data
+            "llm" or "extractive"
         """
-        logger.warning(f"Generating mock {summary_type} summary for memory {memory.get('memory_id')}")
+        engine = engine or self.engine
+        if engine == "auto":
+            priority = (memory.get("metadata") or {}).get("priority", 0)
+            return "llm" if self.api_key and priority >= self.llm_min_priority else "extractive"
+        if engine == "llm" and not self.api_key:
+            return "extractive"
+        return engine
+
+    def _generate_extractive_summary(
+        self,
+        memory: Dict[str, Any],
+        summary_type: str
+    ) -> Dict[str, Any]:
+        """
+        Generate a summary locally with the extractive summarizer.
 
-        content = memory.get("content", "")
+        Used as the bulk engine and as the fallback when the API is not
+        available or a call fails.
 
-        if summary_type == "technical":
-            summary_text = f"Technical Analysis (Mock): This content discusses technical aspects of {content[:50]}..."
-        elif summary_type == "conceptual":
-            summary_text = f"Conceptual Explanation (Mock): The key concepts in this content are related to {content[:50]}..."
-        else:  # general
-            summary_text = f"General Summary (Mock): This content is about {content[:50]}..."
+        Args:
+            memory: The memory data
+            summary_type: Type of summary to generate
+
+        Returns:
+            Summary data
+        """
+        summary_text = self.extractive.summarize(memory.get("content", ""), summary_type)
 
         return {
             "memory_id": memory.get("memory_id"),
             "summary_type": summary_type,
             "summary_text": summary_text,
-            "model": "mock",
+            "model": "extractive",
+            "content_hash": self._memory_hash(memory),
             "timestamp": datetime.now().isoformat(),
         }
 
     def generate_multiple_summaries(
         self,
-        memory: Dict[str, Any]
+        memory: Dict[str, Any],
+        summary_types: Optional[List[str]] = None,
+        combined: Optional[bool] = None,
+        engine: Optional[str] = None
     ) -> Dict[str, Dict[str, Any]]:
         """
         Generate multiple types of summaries for a memory.
 
         Args:
             memory: The memory data
+            summary_types: Types of summary to generate (default: general, technical, conceptual)
+            combined: Request all types in a single structured call (optional, read from config)
+            engine: Summary engine (llm, extractive, auto), or None for layer3.engine from config
 
         Returns:
             Dictionary of summary types and their data
         """
-        summary_types = ["general", "technical", "conceptual"]
+        summary_types = summary_types or SUMMARY_TYPES
+        if combined is None:
+            combined = config.get("layer3.combined_summaries", False)
+
         summaries = {}
+        if combined and len(summary_types) > 1 and self._select_engine(memory, engine) == "llm":
+            summaries = self._generate_combined_summaries(memory, summary_types)
 
+        # Per-type calls for anything the combined call did not produce
         for summary_type in summary_types:
-            summary = self.generate_summary(memory, summary_type)
+            if summary_type in summaries:
+                continue
+            summary = self.generate_summary(memory, summary_type, engine)
             if summary:
                 summaries[summary_type] = summary
 
+        self._store_summaries(list(summaries.values()))
+
         logger.info(f"Generated {len(summaries)} summaries for memory {memory.get('memory_id')}")
         return summaries
 
+    def _generate_combined_summaries(
+        self,
+        memory: Dict[str, Any],
+        summary_types: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Generate several summary types with one structured (JSON) API call.
+
+        Cached types are served from the cache and left out of the request.
+        Types missing from an unparseable or incomplete response are left out
+        of the result so the caller can fall back to per-type calls.
+
+        Args:
+            memory: The memory data
+            summary_types: Types of summary to generate
+
+        Returns:
+            Dictionary of summary types and their data
+        """
+        hash_value = self._memory_hash(memory)
+        summaries = {}
+
+        for summary_type in summary_types:
+            cached = self._cache_get(hash_value, summary_type, "combined_summary")
+            if cached:
+                cached["memory_id"] = memory.get("memory_id")
+                summaries[summary_type] = cached
+
+        missing = [summary_type for summary_type in summary_types if summary_type not in summaries]
+        if len(missing) < 2:
+            return summaries
+
+        # Long content goes through the per-type map-reduce path instead
+        if count_tokens(memory.get("content", ""), self.model) > self.long_content_tokens:
+            return summaries
+
+        try:
+            content = self.prompts.compact_text(memory.get("content", ""), "combined_summary")
+            tags_text = self._format_tags_text(memory.get("tags", []))
+
+            instructions = "\n".join(
+                f"- {summary_type}: {SUMMARY_INSTRUCTIONS.get(summary_type, SUMMARY_INSTRUCTIONS['general'])}"
+                for summary_type in missing
+            )
+            prompt = (
+                f"Please provide each of the following analyses of the content below.\n\n{instructions}\n\n"
+                f"Respond with a single JSON object whose keys are exactly {', '.join(missing)} "
+                f"and whose values are the analysis text.\n\nContent:\n{content}\n\n{tags_text}"
+            )
+
+            start = time.time()
+            response = self._chat_completion(
+                messages=[
+                    {"role": "system", "content": "You are an expert analyst providing insightful summaries and explanations."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=self.temperature,
+                max_tokens=self.max_tokens * len(missing),
+                method="combined_summary"
+            )
+            latency = time.time() - start
+
+            # Parse the JSON object out of the response
+            response_text = response["text"].strip()
+            start_idx = response_text.find("{")
+            end_idx = response_text.rfind("}") + 1
+            parsed = json.loads(response_text[start_idx:end_idx]) if 0 <= start_idx < end_idx else {}
+
+            for summary_type in missing:
+                summary_text = parsed.get(summary_type)
+                if isinstance(summary_text, str) and summary_text.strip():
+                    summary = self._make_summary(memory, summary_type, summary_text.strip(), hash_value, response)
+                    self._cache_put(hash_value, summary_type, summary)
+                    summaries[summary_type] = summary
+
+            produced = len([summary_type for summary_type in missing if summary_type in summaries])
+            self._record_combined_savings(response, len(missing), produced, latency)
+
+            if produced < len(missing):
+                logger.warning(f"Combined summary response covered {produced} of {len(missing)} types, falling back for the rest")
+        except Exception as e:
+            logger.error(f"Error generating combined summaries, falling back to per-type calls: {str(e)}")
+
+        return summaries
+
+    def _record_combined_savings(self, response: Any, requested: int, produced: int, latency: float) -> None:
+        """
+        Record the savings of a combined call over one call per summary type.
+
+        Per-type calls would each resend the same content, so every type
+        produced beyond the first saves one call and roughly one prompt's
+        worth of input tokens and round-trip latency.
+
+        Args:
+            response: The routed chat response
+            requested: Number of summary types requested
+            produced: Number of summary types successfully parsed
+            latency: Wall time of the combined call in seconds
+        """
+        prompt_tokens = response.get("usage", {}).get("input_tokens", 0)
+        calls_saved = max(produced - 1, 0)
+
+        stats = self.combined_stats
+        stats["combined_calls"] += 1
+        stats["calls_saved"] += calls_saved
+        stats["prompt_tokens_saved"] += calls_saved * prompt_tokens
+        stats["latency_saved"] += calls_saved * latency / max(requested, 1)
+
+        logger.info(
+            f"Combined summary call produced {produced}/{requested} types in {latency:.2f}s, "
+            f"saving {calls_saved} calls and ~{calls_saved * prompt_tokens} prompt tokens"
+        )
+
+    def summarize_many(
+        self,
+        memories: Iterable[Dict[str, Any]],
+        summary_types: Optional[List[str]] = None,
+        max_workers: Optional[int] = None,
+        engine: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Generate summaries for many memories concurrently.
+
+        Requests run on a thread pool under the generator's rate limiter and
+        summaries are yielded as they complete, in completion order. Only a
+        bounded window of requests is in flight, so memories may be a lazy
+        iterable of any size.
+
+        Args:
+            memories: Memory data to summarize
+            summary_types: Types of summary to generate per memory (default: general, technical, conceptual)
+            max_workers: Number of concurrent requests (optional, read from config)
+            engine: Summary engine (llm, extractive, auto), or None for layer3.engine from config
+
+        Yields:
+            Summary data for each (memory, summary type) pair
+        """
+        summary_types = summary_types or ["general", "technical", "conceptual"]
+        max_workers = max_workers or self.max_workers
+        window = max_workers * 2
+
+        jobs = ((memory, summary_type) for memory in memories for summary_type in summary_types)
+        completed = 0
+
+        # Summaries are persisted in bulk rather than one upsert per summary
+        to_store: List[Dict[str, Any]] = []
+        store_batch_size = self.summary_storage.batch_size if self.summary_storage else 0
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = set()
+
+            for memory, summary_type in jobs:
+                pending.add(executor.submit(self.generate_summary, memory, summary_type, engine))
+
+                if len(pending) >= window:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        summary = future.result()
+                        if summary:
+                            completed += 1
+                            to_store.append(summary)
+                            yield summary
+
+                if self.summary_storage and len(to_store) >= store_batch_size:
+                    self._store_summaries(to_store)
+                    to_store = []
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    summary = future.result()
+                    if summary:
+                        completed += 1
+                        to_store.append(summary)
+                        yield summary
+
+        self._store_summaries(to_store)
+
+        logger.info(f"Generated {completed} summaries in batch")
+
+    def _store_summaries(self, summaries: List[Dict[str, Any]]) -> None:
+        """
+        Persist summaries to the summary storage, if one is configured.
+
+        Args:
+            summaries: Summary data to store
+        """
+        if not self.summary_storage or not summaries:
+            return
+
+        try:
+            self.summary_storage.store_summaries_bulk(summaries)
+        except Exception as e:
+            logger.error(f"Error storing summaries: {str(e)}")
+
     def analyze_content(
         self,
         content: str,
@@ -200,40 +735,47 @@ class SummaryGenerator:
         Returns:
             Analysis data or None if analysis failed
         """
+        hash_value = content_hash(f"{content}\0{context or ''}")
+        cached = self._cache_get(hash_value, "analysis", "analysis")
+        if cached:
+            logger.info("Using cached content analysis")
+            return cached
+
         if not self.api_key:
             logger.warning("Cannot analyze content: No OpenAI API key provided")
             return None
 
         try:
             # Create prompt
-            prompt = f"Please analyze the following content and provide insights, key points, and implications.\n\nContent:\n{content}"
+            prompt = f"Please analyze the following content and provide insights, key points, and implications.\n\nContent:\n{self.prompts.compact_text(content, 'analysis')}"
 
             if context:
-                prompt += f"\n\nContext:\n{context}"
+                prompt += f"\n\nContext:\n{self.prompts.compact_text(context, 'analysis_context')}"
 
-            # Call OpenAI API (using the latest client version)
-            client = openai.OpenAI(api_key=self.api_key)
-            response = client.chat.completions.create(
-                model=self.model,
+            # Call OpenAI API
+            response = self._chat_completion(
                 messages=[
                     {"role": "system", "content": "You are an expert analyst providing insightful analysis."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=self.temperature,
-                max_tokens=self.max_tokens
+                method="analysis"
             )
 
             # Extract analysis text
-            analysis_text = response.choices[0].message.content.strip()
+            analysis_text = response["text"].strip()
 
             # Create analysis data
             analysis = {
                 "content": content[:100] + "..." if len(content) > 100 else content,
                 "analysis_text": analysis_text,
-                "model": self.model,
+                "model": response["model"],
+                "provider": response["provider"],
                 "timestamp": datetime.now().isoformat(),
             }
 
+            self._cache_put(hash_value, "analysis", analysis)
+
             logger.info("Generated content analysis")
             return analysis
         except Exception as e:
@@ -247,16 +789,86 @@ class SummaryGenerator:
         """
         Suggest tags for content.
 
+        The local tagger is tried first; the LLM is only called when its
+        suggestions are low confidence.
+
         Args:
             content: The content to suggest tags for
 
         Returns:
             List of suggested tags
         """
-        if not self.api_key:
-            logger.warning("Cannot suggest tags: No OpenAI API key provided")
-            return []
+        return self.suggest_tags_many([content])[0]
+
+    def suggest_tags_many(
+        self,
+        contents: List[str],
+        embeddings: Optional[List[List[float]]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Suggest tags for many contents.
+
+        All contents are tagged locally in one batch; only the low-confidence
+        ones (or all of them, without a local tagger) go to the LLM.
 
+        Args:
+            contents: The contents to suggest tags for
+            embeddings: Precomputed content embeddings for the local tagger (optional)
+
+        Returns:
+            List of suggested tag lists, in the same order
+        """
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(contents)
+        hashes = [content_hash(content) for content in contents]
+
+        for i, hash_value in enumerate(hashes):
+            cached = self._cache_get(hash_value, "tags", "suggest_tags")
+            if cached:
+                logger.info(f"Using {len(cached)} cached suggested tags")
+                results[i] = cached
+
+        pending = [i for i, tags in enumerate(results) if tags is None]
+        local: Dict[int, List[Dict[str, Any]]] = {}
+
+        if self.tagger and pending:
+            try:
+                batch_embeddings = [embeddings[i] for i in pending] if embeddings is not None else None
+                suggestions = self.tagger.suggest_tags_batch([contents[i] for i in pending], batch_embeddings)
+                local = dict(zip(pending, suggestions))
+            except Exception as e:
+                logger.error(f"Error suggesting tags locally: {str(e)}")
+
+        llm_calls = 0
+        for i in pending:
+            tags = local.get(i, [])
+            if (self.tagger and self.tagger.is_confident(tags)) or not self.api_key:
+                results[i] = tags
+                continue
+
+            llm_tags = self._suggest_tags_llm(contents[i], hashes[i])
+            llm_calls += 1
+            results[i] = llm_tags or tags
+
+        if self.tagger and pending:
+            logger.info(f"Suggested tags for {len(pending)} contents with {llm_calls} LLM calls")
+
+        return results
+
+    def _suggest_tags_llm(
+        self,
+        content: str,
+        hash_value: str
+    ) -> List[Dict[str, Any]]:
+        """
+        Suggest tags for content with the LLM.
+
+        Args:
+            content: The content to suggest tags for
+            hash_value: Content hash used as the cache key
+
+        Returns:
+            List of suggested tags
+        """
         try:
             # Create prompt
             prompt = f"""Please suggest tags for the following content.
@@ -271,21 +883,20 @@ class SummaryGenerator:
             {content}
 
             JSON Tags:"""
+            prompt = self.prompts.compact_text(prompt, "suggest_tags")
 
-            # Call OpenAI API (using the latest client version)
-            client = openai.OpenAI(api_key=self.api_key)
-            response = client.chat.completions.create(
-                model=self.model,
+            # Call OpenAI API
+            response = self._chat_completion(
                 messages=[
                     {"role": "system", "content": "You are an expert at categorizing and tagging content."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.3,  # Lower temperature for more consistent output
-                max_tokens=self.max_tokens
+                method="suggest_tags"
             )
 
             # Extract tags text
-            tags_text = response.choices[0].message.content.strip()
+            tags_text = response["text"].strip()
 
             # Parse JSON
             try:
@@ -303,6 +914,9 @@ class SummaryGenerator:
                 logger.warning("Failed to parse tags JSON, using empty list")
                 tags = []
 
+            if tags:
+                self._cache_put(hash_value, "tags", tags)
+
             logger.info(f"Generated {len(tags)} suggested tags")
             return tags
         except Exception as e:
@@ -10,8 +10,12 @@ In the future, this will be implemented as an agent using Google's A2A protocol.
 
 import os
 import json
+import asyncio
+import hashlib
 import logging
-from typing import Dict, List, Any, Optional, Union
+import re
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Any, Optional, Tuple, Union
 import time
 from datetime import datetime
 
@@ -22,10 +26,43 @@ except ImportError:
         "Anthropic client not installed. Please install it with: pip install anthropic"
     )
 
+from memory_system.commentary_store import CommentaryStore
 from memory_system.config import config
+from memory_system.llm_clients import get_anthropic_client
+from memory_system.metering import Meter, meter as default_meter
+from memory_system.prompt_builder import PromptBuilder
+from memory_system.provider_router import AnthropicProvider, ProviderRouter
+from memory_system.summary_cache import SummaryCache, content_hash
+from memory_system.tokens import count_tokens
 
 logger = logging.getLogger("MemorySystem.Layer4")
 
+# Bump whenever the prompts change so cached results are not reused
+PROMPT_VERSION = "2"
+
+COMMENTARY_SYSTEM_PROMPT = "You are an expert analyst specializing in finding connections and patterns across different pieces of information. You provide insightful meta-level analysis."
+
+COMMENTARY_INSTRUCTIONS = {
+    "connections": "Please analyze the following memories and identify connections, relationships, and how they complement or contradict each other.",
+    "patterns": "Please analyze the following memories and identify patterns, trends, and recurring themes across them.",
+    "implications": "Please analyze the following memories and discuss their broader implications, potential applications, and future directions.",
+}
+
+# Intermediate commentaries condense a sub-group for the next level up
+SUBGROUP_INSTRUCTIONS = "Please condense the following memories into a compact analysis for a later, higher-level review. Keep every distinct theme, entity and relationship that matters for {focus}, and drop repetition."
+
+# Incremental updates revise the previous commentary with only the membership delta
+UPDATE_INSTRUCTIONS = "Below is an existing analysis of a group of memories, followed by the memories that have since been added to or removed from the group. Please revise the analysis so it reflects the group as it is now: integrate what the added memories contribute, drop conclusions that relied only on removed memories, and keep everything that still holds. Return the complete revised analysis."
+
+SUBGROUP_FOCUS = {
+    "connections": "connections and contradictions between them",
+    "patterns": "patterns and recurring themes",
+    "implications": "their broader implications",
+}
+
+# Labels the relationship prompt uses for the two memories
+MEMORY_LABEL_PATTERN = re.compile(r"\bMemory ([12])\b")
+
 class MetaCommentaryGenerator:
     """
     Layer 4: Meta Commentary Generator
@@ -33,22 +70,44 @@ class MetaCommentaryGenerator:
     Generates AI meta commentaries regarding groups of memories.
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        exact_storage: Optional[Any] = None,
+        tag_storage: Optional[Any] = None,
+        cache: Optional[SummaryCache] = None,
+        summary_storage: Optional[Any] = None,
+        graph: Optional[Any] = None,
+        store: Optional[CommentaryStore] = None,
+        router: Optional[ProviderRouter] = None,
+        meter: Optional[Meter] = None
+    ):
         """
         Initialize the Meta Commentary Generator.
         
         Args:
             api_key: Anthropic API key (optional, can be set in config or env var)
+            base_url: Anthropic API base URL, e.g. a local LLM stand-in (optional, read from config)
+            exact_storage: ExactStorage used to find connection candidates by vector (optional)
+            tag_storage: TagStorage used to filter connection candidates by tag overlap (optional)
+            cache: SummaryCache for sub-group commentaries (optional, created from config)
+            summary_storage: SummaryStorage the Layer 3 summaries are read from (optional)
+            graph: ConnectionGraph that records suggested connections and commentary members (optional)
+            store: CommentaryStore of versioned group commentaries (optional, created from config)
+            router: ProviderRouter for hedged, failover calls (optional, built from layer4.routing config)
+            meter: Meter that records the tokens, latency and cost of each call (optional, defaults to the shared meter)
         """
         # Get API key from config, parameter, or environment variable
         self.api_key = api_key or config.get("anthropic.api_key") or os.getenv("ANTHROPIC_API_KEY")
+        self.base_url = base_url or config.get("anthropic.base_url")
         
         if not self.api_key:
             logger.warning("No Anthropic API key provided. Layer 4 functionality will be limited.")
         
-        # Set up Anthropic client
+        # Set up Anthropic client (shared and pooled per process)
         if self.api_key:
-            self.client = anthropic.Anthropic(api_key=self.api_key)
+            self.client = get_anthropic_client(self.api_key, self.base_url)
             logger.info("Anthropic client initialized")
         else:
             self.client = None
@@ -57,13 +116,107 @@ class MetaCommentaryGenerator:
         self.model = config.get("anthropic.model", "claude-3-sonnet-20240229")
         self.temperature = config.get("anthropic.temperature", 0.7)
         self.max_tokens = config.get("anthropic.max_tokens", 1000)
+        self.prompts = PromptBuilder(self.model)
+        self.preview_tokens = config.get("layer4.preview_tokens", 60)
+        
+        # Connection suggestions: kNN candidates, filtered by tag overlap, top-N to the LLM
+        self.exact_storage = exact_storage
+        self.tag_storage = tag_storage
+        self.connection_mode = config.get("layer4.connection_mode", "llm")
+        self.connection_candidates = config.get("layer4.connection_candidates", 10)
+        self.min_shared_tags = config.get("layer4.min_shared_tags", 1)
+        self.tag_overlap_weight = config.get("layer4.tag_overlap_weight", 0.5)
+        
+        # Retries and concurrency for Anthropic calls; rate limits live on the router's providers
+        self.max_retries = config.get("anthropic.max_retries", 5)
+        self.max_workers = config.get("layer4.max_workers", 4)
+        
+        # Anthropic first; other providers from layer4.routing.providers take over or hedge slow calls
+        if router is not None:
+            self.router = router
+        else:
+            self.router = ProviderRouter.from_config(
+                "layer4", AnthropicProvider(self.api_key, self.base_url, self.model, self.max_retries)
+            )
+        self.meter = meter if meter is not None else default_meter
+        
+        # Hierarchical commentary: summaries instead of raw content, packed under a token budget
+        self.summary_storage = summary_storage
+        self.graph = graph
+        self.hierarchical = config.get("layer4.hierarchical", "auto")
+        self.context_tokens = config.get("layer4.context_tokens", 6000)
+        self.memory_tokens = config.get("layer4.memory_tokens", 300)
+        self.subgroup_fanout = config.get("layer4.subgroup_fanout", 8)
+        self.subgroup_max_tokens = config.get("layer4.subgroup_max_tokens", 500)
+        
+        # Set up the sub-group commentary cache
+        if cache is not None:
+            self.cache = cache
+        elif config.get("layer4.cache.enabled", True):
+            self.cache = SummaryCache(
+                config.get("layer4.cache.path", "memory_data/layer4_cache.sqlite"),
+                config.get("layer4.cache.max_entries", 20000),
+                config.get("layer4.cache.max_age_days", 0)
+            )
+        else:
+            self.cache = None
+        
+        # Versioned group commentaries, updated incrementally until the group drifts too far
+        if store is not None:
+            self.store = store
+        elif config.get("layer4.store.enabled", True):
+            self.store = CommentaryStore()
+        else:
+            self.store = None
+        self.drift_threshold = config.get("layer4.drift_threshold", 0.3)
+        
+        # Running latency and token usage per commentary type
+        self.commentary_stats: Dict[str, Dict[str, float]] = {}
         
         logger.info(f"Using Anthropic model: {self.model}")
     
+    def _use_hierarchical(self, memories: List[Dict[str, Any]], hierarchical: Optional[bool]) -> bool:
+        """Decide whether a group goes through hierarchical commentary."""
+        if hierarchical is not None:
+            return hierarchical
+        if self.hierarchical == "auto":
+            raw_tokens = sum(count_tokens(memory.get("content", ""), self.model) for memory in memories)
+            return raw_tokens > self.context_tokens
+        return bool(self.hierarchical)
+    
+    def _flat_prompt(self, memories: List[Dict[str, Any]], commentary_type: str) -> str:
+        """
+        Build the prompt of a commentary over the full memory contents.
+        
+        Args:
+            memories: List of memory data
+            commentary_type: Type of commentary to generate
+            
+        Returns:
+            Prompt text
+        """
+        # Compact the contents together so passages shared across the group are sent once
+        budget = max(self.context_tokens // max(len(memories), 1), self.memory_tokens)
+        contents = self.prompts.compact_group([memory.get("content", "") for memory in memories], "commentary", budget)
+        
+        memory_texts = []
+        for i, (memory, content) in enumerate(zip(memories, contents)):
+            tags_text = self.prompts.format_tags(memory.get("tags", []))
+            memory_texts.append(f"Memory {i+1}:\n{content}\n{tags_text}".strip())
+        
+        # Join memory texts
+        all_memories = "\n\n".join(memory_texts)
+        
+        # Create prompt based on commentary type
+        instructions = COMMENTARY_INSTRUCTIONS.get(commentary_type, COMMENTARY_INSTRUCTIONS["connections"])
+        return f"{instructions}\n\n{all_memories}"
+    
     def generate_meta_commentary(
         self, 
         memories: List[Dict[str, Any]],
-        commentary_type: str = "connections"
+        commentary_type: str = "connections",
+        hierarchical: Optional[bool] = None,
+        group_id: Optional[str] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Generate a meta commentary for a group of memories.
@@ -71,6 +224,10 @@ class MetaCommentaryGenerator:
         Args:
             memories: List of memory data
             commentary_type: Type of commentary to generate (connections, patterns, implications)
+            hierarchical: Build the commentary from summaries through sub-group commentaries
+                (optional, defaults to layer4.hierarchical; "auto" uses it when the raw group
+                does not fit in layer4.context_tokens)
+            group_id: ID of the memory group, used for the commentary ID (optional)
             
         Returns:
             Meta commentary data or None if generation failed
@@ -79,53 +236,33 @@ class MetaCommentaryGenerator:
             logger.warning("Cannot generate meta commentary: No Anthropic client available")
             return self._generate_mock_meta_commentary(memories, commentary_type)
         
+        if self._use_hierarchical(memories, hierarchical):
+            return self._generate_hierarchical_commentary(memories, commentary_type, group_id)
+        
         try:
-            # Extract memory contents and summaries
-            memory_texts = []
-            for i, memory in enumerate(memories):
-                content = memory.get("content", "")
-                tags = memory.get("tags", [])
-                
-                # Format tags
-                tags_text = ""
-                if tags:
-                    tags_text = "Tags: " + ", ".join([f"{tag.get('type', 'general')}: {tag.get('value', '')}" for tag in tags])
-                
-                memory_texts.append(f"Memory {i+1}:\n{content}\n{tags_text}")
-            
-            # Join memory texts
-            all_memories = "\n\n".join(memory_texts)
-            
-            # Create prompt based on commentary type
-            if commentary_type == "patterns":
-                prompt = f"Please analyze the following memories and identify patterns, trends, and recurring themes across them.\n\n{all_memories}"
-            elif commentary_type == "implications":
-                prompt = f"Please analyze the following memories and discuss their broader implications, potential applications, and future directions.\n\n{all_memories}"
-            else:  # connections
-                prompt = f"Please analyze the following memories and identify connections, relationships, and how they complement or contradict each other.\n\n{all_memories}"
+            prompt = self._flat_prompt(memories, commentary_type)
             
             # Call Anthropic API
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=self.max_tokens,
+            response = self._create_message(
+                system=COMMENTARY_SYSTEM_PROMPT,
+                prompt=prompt,
                 temperature=self.temperature,
-                system="You are an expert analyst specializing in finding connections and patterns across different pieces of information. You provide insightful meta-level analysis.",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
+                method="commentary"
             )
             
             # Extract commentary text
-            commentary_text = response.content[0].text
+            commentary_text = response["text"]
             
             # Create meta commentary data
             meta_commentary = {
                 "memory_ids": [memory.get("memory_id") for memory in memories if memory.get("memory_id")],
                 "commentary_type": commentary_type,
                 "commentary_text": commentary_text,
-                "model": self.model,
+                "model": response["model"],
+                "provider": response["provider"],
                 "timestamp": datetime.now().isoformat(),
             }
+            self._record_commentary(meta_commentary, group_id)
             
             logger.info(f"Generated {commentary_type} meta commentary for {len(memories)} memories")
             return meta_commentary
@@ -133,6 +270,318 @@ class MetaCommentaryGenerator:
             logger.error(f"Error generating meta commentary: {str(e)}")
             return self._generate_mock_meta_commentary(memories, commentary_type)
     
+    def _create_message(
+        self,
+        system: str,
+        prompt: str,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        method: str = "completion"
+    ) -> Dict[str, Any]:
+        """
+        Send a message through the provider router.
+        
+        Calls are rate limited per provider, rate-limit errors (HTTP 429) are
+        retried with jittered backoff, and slow or failing calls are hedged
+        or failed over to the configured fallback providers. Every call,
+        failed or not, is metered under its method, including requests
+        that lost a hedge, once they finish.
+        
+        Args:
+            system: System prompt
+            prompt: User prompt
+            temperature: Sampling temperature (optional, defaults to the configured temperature)
+            max_tokens: Completion token budget (optional, defaults to the configured max_tokens)
+            method: Call site the call is metered under
+            
+        Returns:
+            Routed response with 'text', 'usage', 'provider' and 'model'
+        """
+        start = time.perf_counter()
+        try:
+            response = self.router.complete(
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=self.temperature if temperature is None else temperature,
+                max_tokens=max_tokens or self.max_tokens,
+                on_abandoned=lambda result: self.meter.record_response("layer4", method, result)
+            )
+        except Exception:
+            self.meter.record("layer4", method, model=self.model, latency=time.perf_counter() - start, error=True)
+            raise
+        
+        self.meter.record_response("layer4", method, response, time.perf_counter() - start)
+        return response
+    
+    async def _create_message_async(
+        self,
+        system: str,
+        prompt: str,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        method: str = "completion"
+    ) -> Dict[str, Any]:
+        """
+        Send a message through the provider router from an event loop.
+        
+        Requests go out on the providers' async clients, with the same rate
+        limiting, retries, hedging, failover and metering as _create_message.
+        
+        Args:
+            system: System prompt
+            prompt: User prompt
+            temperature: Sampling temperature (optional, defaults to the configured temperature)
+            max_tokens: Completion token budget (optional, defaults to the configured max_tokens)
+            method: Call site the call is metered under
+            
+        Returns:
+            Routed response with 'text', 'usage', 'provider' and 'model'
+        """
+        start = time.perf_counter()
+        try:
+            response = await self.router.complete_async(
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=self.temperature if temperature is None else temperature,
+                max_tokens=max_tokens or self.max_tokens,
+                on_abandoned=lambda result: self.meter.record_response("layer4", method, result)
+            )
+        except Exception:
+            self.meter.record("layer4", method, model=self.model, latency=time.perf_counter() - start, error=True)
+            raise
+        
+        self.meter.record_response("layer4", method, response, time.perf_counter() - start)
+        return response
+    
+    def _memory_texts(self, memories: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        """
+        Get a compact text for each memory, preferring its Layer 3 summary.
+        
+        Summaries are taken from the memory itself ('summary' or
+        'summaries'), then from the summary storage in one bulk lookup;
+        memories without a summary fall back to truncated content.
+        
+        Args:
+            memories: List of memory data
+            
+        Returns:
+            List of (memory ID, text) tuples
+        """
+        stored: Dict[str, str] = {}
+        if self.summary_storage:
+            ids = [m.get("memory_id") for m in memories if m.get("memory_id") and not m.get("summary")]
+            try:
+                stored = self.summary_storage.get_summary_texts(ids) if ids else {}
+            except Exception as e:
+                logger.error(f"Error reading summaries: {str(e)}")
+        
+        texts = []
+        for memory in memories:
+            memory_id = memory.get("memory_id") or content_hash(memory.get("content", ""))
+            summary = memory.get("summary") or (memory.get("summaries") or {}).get("general", {}).get("summary_text")
+            text = self.prompts.compact_text(
+                summary or stored.get(memory_id) or memory.get("content", ""), "commentary_memory", self.memory_tokens
+            )
+            
+            tags_text = self.prompts.format_tags(memory.get("tags", []))
+            if tags_text:
+                text += "\n" + tags_text
+            texts.append((memory_id, text))
+        
+        return texts
+    
+    def _pack_groups(self, items: List[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
+        """
+        Pack (ID, text) items into sub-groups that fit the token budget.
+        
+        Items are ordered by ID and packed greedily. A sub-group also closes
+        before any item whose ID hash falls on a fanout boundary, so group
+        boundaries depend on the items themselves rather than on their
+        positions: adding one memory changes only the sub-group it lands in.
+        
+        Args:
+            items: List of (ID, text) tuples
+            
+        Returns:
+            List of sub-groups
+        """
+        groups: List[List[Tuple[str, str]]] = []
+        current: List[Tuple[str, str]] = []
+        current_tokens = 0
+        
+        for item_id, text in sorted(items):
+            tokens = count_tokens(text, self.model) + 8
+            boundary = int(hashlib.md5(item_id.encode()).hexdigest()[:8], 16) % self.subgroup_fanout == 0
+            
+            if current and (current_tokens + tokens > self.context_tokens or boundary):
+                groups.append(current)
+                current, current_tokens = [], 0
+            
+            current.append((item_id, text))
+            current_tokens += tokens
+        
+        if current:
+            groups.append(current)
+        
+        return groups
+    
+    def _subgroup_commentary(
+        self,
+        group: List[Tuple[str, str]],
+        commentary_type: str,
+        level: int,
+        stats: Dict[str, int]
+    ) -> Tuple[str, str]:
+        """
+        Condense a sub-group into an intermediate commentary, using the cache.
+        
+        Args:
+            group: List of (ID, text) tuples
+            commentary_type: Type of the final commentary
+            level: Level of the sub-group in the hierarchy (0 = memories)
+            stats: Counters of LLM calls and cache hits, updated in place
+            
+        Returns:
+            Tuple of (sub-group ID, commentary text)
+        """
+        body = "\n\n".join(f"Memory {item_id}:\n{text}" for item_id, text in group)
+        hash_value = content_hash(f"{commentary_type}\n{body}")
+        group_id = f"subgroup_{level}_{hash_value[:12]}"
+        cache_type = f"meta:{commentary_type}"
+        
+        if self.cache:
+            cached = self.cache.get(hash_value, cache_type, self.model, PROMPT_VERSION)
+            if cached:
+                stats["cached"] += 1
+                self.meter.record("layer4", "subgroup_commentary", model=self.model, cache_hit=True)
+                return group_id, cached
+        
+        focus = SUBGROUP_FOCUS.get(commentary_type, SUBGROUP_FOCUS["connections"])
+        prompt = f"{SUBGROUP_INSTRUCTIONS.format(focus=focus)}\n\n{body}"
+        response = self._create_message(
+            system=COMMENTARY_SYSTEM_PROMPT,
+            prompt=prompt,
+            max_tokens=self.subgroup_max_tokens,
+            method="subgroup_commentary"
+        )
+        text = response["text"]
+        stats["llm_calls"] += 1
+        
+        if self.cache:
+            self.cache.put(hash_value, cache_type, self.model, PROMPT_VERSION, text)
+        
+        return group_id, text
+    
+    def _generate_hierarchical_commentary(
+        self,
+        memories: List[Dict[str, Any]],
+        commentary_type: str,
+        group_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate a meta commentary for a large group through sub-group commentaries.
+        
+        Memories are represented by their Layer 3 summaries and packed into
+        sub-groups under the token budget. Each sub-group is condensed into
+        a cached intermediate commentary, and levels are reduced the same
+        way until everything fits into one final prompt.
+        
+        Args:
+            memories: List of memory data
+            commentary_type: Type of commentary to generate
+            group_id: ID of the memory group, used for the commentary ID (optional)
+            
+        Returns:
+            Meta commentary data
+        """
+        try:
+            stats = {"llm_calls": 0, "cached": 0}
+            items = self._memory_texts(memories)
+            level = 0
+            
+            groups = self._pack_groups(items)
+            while len(groups) > 1:
+                items = [self._subgroup_commentary(group, commentary_type, level, stats) for group in groups]
+                level += 1
+                
+                # Make sure every level shrinks, even when the budget is too tight for the fanout
+                previous = len(groups)
+                groups = self._pack_groups(items)
+                if len(groups) >= previous:
+                    groups = [sorted(items)[i:i + 2] for i in range(0, len(items), 2)]
+            
+            label = "Memory" if level == 0 else "Group analysis"
+            all_memories = "\n\n".join(f"{label} {i+1}:\n{text}" for i, (_, text) in enumerate(groups[0] if groups else []))
+            
+            instructions = COMMENTARY_INSTRUCTIONS.get(commentary_type, COMMENTARY_INSTRUCTIONS["connections"])
+            prompt = f"{instructions}\n\n{all_memories}"
+            response = self._create_message(system=COMMENTARY_SYSTEM_PROMPT, prompt=prompt, method="hierarchical_commentary")
+            stats["llm_calls"] += 1
+            
+            meta_commentary = {
+                "memory_ids": [memory.get("memory_id") for memory in memories if memory.get("memory_id")],
+                "commentary_type": commentary_type,
+                "commentary_text": response["text"],
+                "model": response["model"],
+                "provider": response["provider"],
+                "timestamp": datetime.now().isoformat(),
+                "hierarchy": {"levels": level + 1, **stats},
+            }
+            self._record_commentary(meta_commentary, group_id)
+            
+            logger.info(f"Generated hierarchical {commentary_type} meta commentary for {len(memories)} memories "
+                        f"({level + 1} levels, {stats['llm_calls']} calls, {stats['cached']} cached sub-groups)")
+            return meta_commentary
+        except Exception as e:
+            logger.error(f"Error generating hierarchical meta commentary: {str(e)}")
+            return self._generate_mock_meta_commentary(memories, commentary_type)
+    
+    def _record_commentary(self, meta_commentary: Dict[str, Any], group_id: Optional[str] = None) -> None:
+        """
+        Give a meta commentary a stable ID and record its members in the connection graph.
+        
+        Commentaries of a named group keep one ID as the group changes;
+        others are identified by their set of members.
+        
+        Args:
+            meta_commentary: Meta commentary data, updated in place with 'commentary_id'
+            group_id: ID of the memory group (optional)
+        """
+        memory_ids = meta_commentary.get("memory_ids", [])
+        commentary_type = meta_commentary.get("commentary_type", "connections")
+        if group_id:
+            meta_commentary["commentary_id"] = f"{group_id}_{commentary_type}"
+        else:
+            meta_commentary["commentary_id"] = f"{commentary_type}_{content_hash(','.join(sorted(memory_ids)))[:16]}"
+        
+        if self.graph is None:
+            return
+        
+        try:
+            self.graph.add_commentary(meta_commentary["commentary_id"], memory_ids)
+        except Exception as e:
+            logger.error(f"Error recording meta commentary in connection graph: {str(e)}")
+    
+    def _record_connections(self, memory_id: Optional[str], connections: List[Dict[str, Any]]) -> None:
+        """
+        Record suggested connections in the connection graph.
+        
+        Args:
+            memory_id: The memory the connections were suggested for
+            connections: Suggested connections with 'memory_id' and 'score'
+        """
+        if self.graph is None or not memory_id:
+            return
+        
+        try:
+            self.graph.add_connections(memory_id, [c for c in connections if isinstance(c, dict)])
+        except Exception as e:
+            logger.error(f"Error recording connections in connection graph: {str(e)}")
+    
     def _generate_mock_meta_commentary(
         self, 
         memories: List[Dict[str, Any]],
@@ -167,28 +616,284 @@ class MetaCommentaryGenerator:
     
     def generate_multiple_commentaries(
         self, 
-        memories: List[Dict[str, Any]]
+        memories: List[Dict[str, Any]],
+        commentary_types: Optional[List[str]] = None
     ) -> Dict[str, Dict[str, Any]]:
         """
         Generate multiple types of meta commentaries for a group of memories.
         
+        The types are requested concurrently, so the latency is that of the
+        slowest type rather than their sum.
+        
         Args:
             memories: List of memory data
+            commentary_types: Types of commentary to generate (default: connections, patterns, implications)
             
         Returns:
             Dictionary of commentary types and their data
         """
-        commentary_types = ["connections", "patterns", "implications"]
+        commentary_types = commentary_types or ["connections", "patterns", "implications"]
         commentaries = {}
         
-        for commentary_type in commentary_types:
-            commentary = self.generate_meta_commentary(memories, commentary_type)
-            if commentary:
-                commentaries[commentary_type] = commentary
+        with ThreadPoolExecutor(max_workers=len(commentary_types)) as executor:
+            futures = {
+                executor.submit(self.generate_meta_commentary, memories, commentary_type): commentary_type
+                for commentary_type in commentary_types
+            }
+            for future in as_completed(futures):
+                commentary = future.result()
+                if commentary:
+                    commentaries[futures[future]] = commentary
         
         logger.info(f"Generated {len(commentaries)} meta commentaries for {len(memories)} memories")
         return commentaries
     
+    async def generate_meta_commentary_async(
+        self,
+        memories: List[Dict[str, Any]],
+        commentary_type: str = "connections",
+        hierarchical: Optional[bool] = None,
+        group_id: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Generate a meta commentary for a group of memories from an event loop.
+        
+        The result also carries the request 'latency' in seconds and the
+        token 'usage', which are added to commentary_stats. Hierarchical
+        groups run the synchronous path in a worker thread.
+        
+        Args:
+            memories: List of memory data
+            commentary_type: Type of commentary to generate (connections, patterns, implications)
+            hierarchical: Build the commentary through sub-group commentaries (optional, see generate_meta_commentary)
+            group_id: ID of the memory group, used for the commentary ID (optional)
+            
+        Returns:
+            Meta commentary data or None if generation failed
+        """
+        if not self.client:
+            logger.warning("Cannot generate meta commentary: No Anthropic client available")
+            return self._generate_mock_meta_commentary(memories, commentary_type)
+        
+        if self._use_hierarchical(memories, hierarchical):
+            return await asyncio.to_thread(self.generate_meta_commentary, memories, commentary_type, True, group_id)
+        
+        try:
+            prompt = self._flat_prompt(memories, commentary_type)
+            
+            start = time.perf_counter()
+            response = await self._create_message_async(
+                system=COMMENTARY_SYSTEM_PROMPT,
+                prompt=prompt,
+                temperature=self.temperature,
+                method="commentary"
+            )
+            latency = time.perf_counter() - start
+            
+            usage = response["usage"]
+            stats = self.commentary_stats.setdefault(
+                commentary_type, {"calls": 0, "latency": 0.0, "input_tokens": 0, "output_tokens": 0}
+            )
+            stats["calls"] += 1
+            stats["latency"] += latency
+            stats["input_tokens"] += usage["input_tokens"]
+            stats["output_tokens"] += usage["output_tokens"]
+            
+            meta_commentary = {
+                "memory_ids": [memory.get("memory_id") for memory in memories if memory.get("memory_id")],
+                "commentary_type": commentary_type,
+                "commentary_text": response["text"],
+                "model": response["model"],
+                "provider": response["provider"],
+                "timestamp": datetime.now().isoformat(),
+                "latency": round(latency, 3),
+                "usage": usage,
+            }
+            self._record_commentary(meta_commentary, group_id)
+            
+            logger.info(f"Generated {commentary_type} meta commentary for {len(memories)} memories in {latency:.2f}s")
+            return meta_commentary
+        except Exception as e:
+            logger.error(f"Error generating meta commentary: {str(e)}")
+            return self._generate_mock_meta_commentary(memories, commentary_type)
+    
+    async def generate_multiple_commentaries_async(
+        self,
+        memories: List[Dict[str, Any]],
+        commentary_types: Optional[List[str]] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Generate multiple types of meta commentaries concurrently from an event loop.
+        
+        All requests go through the provider router and share its rate
+        limiters, and results are yielded as they complete.
+        
+        Args:
+            memories: List of memory data
+            commentary_types: Types of commentary to generate (default: connections, patterns, implications)
+            
+        Yields:
+            (commentary type, meta commentary data) tuples, in completion order
+        """
+        commentary_types = commentary_types or ["connections", "patterns", "implications"]
+        
+        async def run(commentary_type: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+            return commentary_type, await self.generate_meta_commentary_async(memories, commentary_type)
+        
+        for next_result in asyncio.as_completed([run(commentary_type) for commentary_type in commentary_types]):
+            commentary_type, commentary = await next_result
+            if commentary:
+                yield commentary_type, commentary
+    
+    def update_meta_commentary(
+        self,
+        group_id: str,
+        memories: List[Dict[str, Any]],
+        commentary_type: str = "connections"
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Bring a group's stored meta commentary up to date with its current members.
+        
+        The members and content hashes of the stored version are compared
+        with the group as it is now. Without changes the stored commentary
+        is returned as is. Otherwise the previous commentary is revised from
+        the added and removed memories only, unless the changes accumulated
+        since the last full regeneration exceed layer4.drift_threshold (as a
+        fraction of the group), in which case it is regenerated from scratch.
+        Every result is stored as a new version.
+        
+        Args:
+            group_id: ID of the memory group
+            memories: Current memories of the group
+            commentary_type: Type of commentary (connections, patterns, implications)
+            
+        Returns:
+            Meta commentary data with 'version', 'update_mode' and 'drift', or None if generation failed
+        """
+        members = {
+            memory["memory_id"]: {
+                "hash": memory.get("content_hash") or content_hash(memory.get("content", "")),
+                "excerpt": self.prompts.compact_text(memory.get("content", ""), "commentary_update", self.memory_tokens),
+            }
+            for memory in memories if memory.get("memory_id")
+        }
+        previous = self.store.latest(group_id, commentary_type) if self.store else None
+        
+        update_mode, drift = "full", 0.0
+        if previous:
+            old_members = previous["members"]
+            added = [m for m in members if old_members.get(m, {}).get("hash") != members[m]["hash"]]
+            removed = [m for m in old_members if members.get(m, {}).get("hash") != old_members[m]["hash"]]
+            
+            if not added and not removed:
+                logger.info(f"Meta commentary for group {group_id} is up to date (v{previous['version']})")
+                return {
+                    **previous["commentary"],
+                    "update_mode": previous["update_mode"],
+                    "drift": previous["drift"],
+                    "version": previous["version"],
+                }
+            
+            changed = len(set(added) | set(removed))
+            drift = previous["drift"] + changed / max(len(old_members), 1)
+            if drift <= self.drift_threshold and self.client:
+                update_mode = "incremental"
+        
+        if update_mode == "incremental":
+            commentary = self._revise_commentary(previous, members, added, removed, group_id)
+            if commentary is None:
+                update_mode, drift = "full", 0.0
+        if update_mode == "full":
+            drift = 0.0
+            commentary = self.generate_meta_commentary(memories, commentary_type, group_id=group_id)
+        
+        if not commentary or commentary.get("model") == "mock" or not self.store:
+            return commentary
+        
+        commentary["update_mode"] = update_mode
+        commentary["drift"] = round(drift, 4)
+        commentary["version"] = self.store.save(group_id, commentary, members, update_mode, drift)
+        return commentary
+    
+    def _revise_commentary(
+        self,
+        previous: Dict[str, Any],
+        members: Dict[str, Dict[str, str]],
+        added: List[str],
+        removed: List[str],
+        group_id: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Revise a stored commentary from the membership delta.
+        
+        Args:
+            previous: Latest stored entry of the group
+            members: Current members as {memory_id: {'hash', 'excerpt'}}
+            added: IDs of memories that are new or changed
+            removed: IDs of memories that were removed or changed
+            group_id: ID of the memory group
+            
+        Returns:
+            Meta commentary data or None if the revision failed
+        """
+        commentary_type = previous["commentary_type"]
+        old_members = previous["members"]
+        
+        try:
+            previous_text = self.prompts.compact_text(previous["commentary"].get("commentary_text", ""), "commentary_update")
+            sections = [f"Existing analysis:\n{previous_text}"]
+            if added:
+                sections.append("Added memories:\n" + "\n\n".join(
+                    f"Memory {memory_id}:\n{members[memory_id]['excerpt']}" for memory_id in added
+                ))
+            if removed:
+                sections.append("Removed memories:\n" + "\n\n".join(
+                    f"Memory {memory_id}:\n{old_members[memory_id].get('excerpt', '')}" for memory_id in removed
+                ))
+            
+            instructions = COMMENTARY_INSTRUCTIONS.get(commentary_type, COMMENTARY_INSTRUCTIONS["connections"])
+            prompt = f"{UPDATE_INSTRUCTIONS}\n\nThe analysis was written for this task: {instructions}\n\n" + "\n\n".join(sections)
+            
+            response = self._create_message(
+                system=COMMENTARY_SYSTEM_PROMPT,
+                prompt=prompt,
+                temperature=self.temperature,
+                method="commentary_update"
+            )
+            
+            meta_commentary = {
+                "memory_ids": list(members),
+                "commentary_type": commentary_type,
+                "commentary_text": response["text"],
+                "model": response["model"],
+                "provider": response["provider"],
+                "timestamp": datetime.now().isoformat(),
+                "base_version": previous["version"],
+            }
+            self._record_commentary(meta_commentary, group_id)
+            
+            logger.info(f"Revised {commentary_type} meta commentary for group {group_id} "
+                        f"(+{len(added)} / -{len(removed)} memories)")
+            return meta_commentary
+        except Exception as e:
+            logger.error(f"Error revising meta commentary for group {group_id}: {str(e)}")
+            return None
+    
+    def _relationship_key(self, memory1: Dict[str, Any], memory2: Dict[str, Any]) -> Tuple[str, bool]:
+        """
+        Get the symmetric cache key of a memory pair.
+        
+        Args:
+            memory1: First memory data
+            memory2: Second memory data
+            
+        Returns:
+            Tuple of (hash of the unordered pair of content hashes, whether the pair is swapped)
+        """
+        hash1 = content_hash(memory1.get("content", ""))
+        hash2 = content_hash(memory2.get("content", ""))
+        return content_hash(":".join(sorted((hash1, hash2)))), hash2 < hash1
+    
     def analyze_relationship(
         self, 
         memory1: Dict[str, Any],
@@ -197,6 +902,12 @@ class MetaCommentaryGenerator:
         """
         Analyze the relationship between two memories.
         
+        Analyses are cached on the unordered pair of content hashes, so
+        (A, B) and (B, A) share one API call. The pair is always presented
+        in content-hash order; when that is the reverse of the caller's
+        order, "Memory 1" and "Memory 2" are swapped in the returned text
+        so they still refer to memory_id1 and memory_id2.
+        
         Args:
             memory1: First memory data
             memory2: Second memory data
@@ -204,17 +915,31 @@ class MetaCommentaryGenerator:
         Returns:
             Relationship analysis data or None if analysis failed
         """
-        if not self.client:
+        hash_value, swapped = self._relationship_key(memory1, memory2)
+        
+        # Present the pair in content-hash order so both directions get the same prompt
+        first, second = (memory2, memory1) if swapped else (memory1, memory2)
+        
+        # Cached as {'analysis_text', 'model', 'provider'}; older entries hold only the text
+        cached = self.cache.get(hash_value, "relationship", self.model, PROMPT_VERSION) if self.cache else None
+        if isinstance(cached, str):
+            cached = {"analysis_text": cached, "model": self.model, "provider": self.router.providers[0].name}
+        if cached is not None:
+            self.meter.record("layer4", "relationship", provider=cached["provider"], model=cached["model"], cache_hit=True)
+        
+        if cached is None and not self.client:
             logger.warning("Cannot analyze relationship: No Anthropic client available")
             return None
         
         try:
-            # Extract memory contents
-            content1 = memory1.get("content", "")
-            content2 = memory2.get("content", "")
-            
-            # Create prompt
-            prompt = f"""Please analyze the relationship between these two pieces of information:
+            if cached is None:
+                # Extract memory contents, sending passages they share only once
+                content1, content2 = self.prompts.compact_group(
+                    [first.get("content", ""), second.get("content", "")], "relationship"
+                )
+                
+                # Create prompt
+                prompt = f"""Please analyze the relationship between these two pieces of information:
 
 Memory 1:
 {content1}
@@ -228,27 +953,37 @@ Analyze how they relate to each other, including:
 3. Any contradictions or tensions
 4. How understanding one enhances understanding of the other
 """
+                
+                # Call Anthropic API
+                response = self._create_message(
+                    system="You are an expert analyst specializing in comparing and contrasting different pieces of information. You provide insightful relationship analysis.",
+                    prompt=prompt,
+                    temperature=self.temperature,
+                    method="relationship"
+                )
+                
+                cached = {
+                    "analysis_text": response["text"],
+                    "model": response["model"],
+                    "provider": response["provider"],
+                }
+                
+                if self.cache:
+                    self.cache.put(hash_value, "relationship", self.model, PROMPT_VERSION, cached)
             
-            # Call Anthropic API
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                system="You are an expert analyst specializing in comparing and contrasting different pieces of information. You provide insightful relationship analysis.",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
-            # Extract analysis text
-            analysis_text = response.content[0].text
+            analysis_text = cached["analysis_text"]
+            if swapped:
+                analysis_text = MEMORY_LABEL_PATTERN.sub(
+                    lambda match: "Memory 2" if match.group(1) == "1" else "Memory 1", analysis_text
+                )
             
             # Create relationship analysis data
             analysis = {
                 "memory_id1": memory1.get("memory_id"),
                 "memory_id2": memory2.get("memory_id"),
                 "analysis_text": analysis_text,
-                "model": self.model,
+                "model": cached["model"],
+                "provider": cached["provider"],
                 "timestamp": datetime.now().isoformat(),
             }
             
@@ -258,53 +993,202 @@ Analyze how they relate to each other, including:
             logger.error(f"Error analyzing relationship: {str(e)}")
             return None
     
+    def analyze_relationships(
+        self,
+        pairs: Iterable[Tuple[Dict[str, Any], Dict[str, Any]]],
+        max_workers: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Analyze the relationships of many memory pairs concurrently.
+        
+        Requests run on a thread pool under the providers' rate limiters and
+        analyses are yielded as they complete, in completion order. Pairs
+        that repeat an earlier pair in either direction are skipped, and
+        only a bounded window of requests is in flight, so pairs may be a
+        lazy iterable of any size.
+        
+        Args:
+            pairs: (memory1, memory2) tuples to analyze
+            max_workers: Number of concurrent requests (optional, read from config)
+            
+        Yields:
+            Relationship analysis data for each distinct pair
+        """
+        max_workers = max_workers or self.max_workers
+        window = max_workers * 2
+        seen = set()
+        completed = 0
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = set()
+            
+            for memory1, memory2 in pairs:
+                hash_value, _ = self._relationship_key(memory1, memory2)
+                if hash_value in seen:
+                    continue
+                seen.add(hash_value)
+                
+                pending.add(executor.submit(self.analyze_relationship, memory1, memory2))
+                
+                if len(pending) >= window:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        analysis = future.result()
+                        if analysis:
+                            completed += 1
+                            yield analysis
+            
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    analysis = future.result()
+                    if analysis:
+                        completed += 1
+                        yield analysis
+        
+        logger.info(f"Analyzed {completed} of {len(seen)} distinct memory pairs")
+    
+    def _connection_candidates(
+        self,
+        memory: Dict[str, Any],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Find candidate connections with a kNN query over the memory's stored vector.
+        
+        Candidates that share fewer than min_shared_tags tags with the target
+        are dropped (the filter is skipped when the target has no tags). The
+        remaining candidates are ranked by vector similarity boosted by tag
+        overlap (Jaccard).
+        
+        Args:
+            memory: The target memory data
+            limit: Maximum number of candidates
+        
+        Returns:
+            Candidate memories with 'score', 'vector_score' and 'shared_tags', best first
+        """
+        memory_id = memory.get("memory_id")
+        
+        vector = memory.get("embedding")
+        if vector is None:
+            vector = self.exact_storage.get_vectors([memory_id]).get(memory_id)
+        if vector is None:
+            logger.warning(f"No stored vector for memory {memory_id}")
+            return []
+        
+        # Over-fetch so the tag filter still leaves enough candidates
+        neighbors = self.exact_storage.search_similar(list(map(float, vector)), limit=limit * 3 + 1)
+        neighbors = [n for n in neighbors if n.get("memory_id") != memory_id]
+        if not neighbors:
+            return []
+        
+        if self.tag_storage is None:
+            for neighbor in neighbors:
+                neighbor["vector_score"] = neighbor["score"]
+                neighbor["shared_tags"] = []
+            return neighbors[:limit]
+        
+        tags_by_memory = self.tag_storage.get_tags_bulk([memory_id] + [n["memory_id"] for n in neighbors])
+        target_tags = {(t["type"], t["value"]) for t in tags_by_memory.get(memory_id, [])}
+        
+        candidates = []
+        for neighbor in neighbors:
+            neighbor_tags = {(t["type"], t["value"]) for t in tags_by_memory.get(neighbor["memory_id"], [])}
+            shared = target_tags & neighbor_tags
+            if target_tags and len(shared) < self.min_shared_tags:
+                continue
+            
+            union = target_tags | neighbor_tags
+            overlap = len(shared) / len(union) if union else 0.0
+            neighbor["vector_score"] = neighbor["score"]
+            neighbor["score"] = neighbor["score"] * (1.0 + self.tag_overlap_weight * overlap)
+            neighbor["shared_tags"] = [{"type": tag_type, "value": tag_value} for tag_type, tag_value in sorted(shared)]
+            candidates.append(neighbor)
+        
+        candidates.sort(key=lambda c: -c["score"])
+        return candidates[:limit]
+    
     def suggest_new_connections(
-        self, 
+        self,
         memory: Dict[str, Any],
-        all_memories: List[Dict[str, Any]],
-        max_connections: int = 3
+        all_memories: Optional[List[Dict[str, Any]]] = None,
+        max_connections: int = 3,
+        mode: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         Suggest new connections between a memory and other memories.
         
+        Candidates come from a kNN query over the memory's stored vector,
+        filtered by tag overlap. In "vector" mode they are returned directly
+        without an API call; in "llm" mode only the top candidates are sent
+        to Claude to pick and explain the connections.
+        
         Args:
             memory: The target memory data
-            all_memories: List of all available memories
+            all_memories: Candidate memories, only used when no exact storage is configured (optional)
             max_connections: Maximum number of connections to suggest
-            
+            mode: "llm" or "vector" (optional, read from config)
+        
         Returns:
-            List of suggested connections
+            List of suggested connections with 'memory_id', 'explanation' and 'score'
         """
-        if not self.client:
-            logger.warning("Cannot suggest connections: No Anthropic client available")
-            return []
+        mode = mode or self.connection_mode
+        if mode == "llm" and not self.client:
+            logger.warning("No Anthropic client available, suggesting connections by vector similarity")
+            mode = "vector"
         
         try:
             # Extract memory content
             memory_id = memory.get("memory_id")
             content = memory.get("content", "")
             
-            # Filter out the target memory from all_memories
-            other_memories = [m for m in all_memories if m.get("memory_id") != memory_id]
+            if self.exact_storage is not None:
+                other_memories = self._connection_candidates(memory, self.connection_candidates)
+            elif all_memories is not None:
+                # Without storage there are no vectors to rank by
+                other_memories = [m for m in all_memories if m.get("memory_id") != memory_id][:self.connection_candidates]
+            else:
+                logger.warning("Cannot suggest connections: no exact storage or candidate memories")
+                return []
+            
+            if mode == "vector":
+                connections = []
+                for candidate in other_memories[:max_connections]:
+                    shared = ", ".join(f"{t['type']}:{t['value']}" for t in candidate.get("shared_tags", []))
+                    explanation = f"Vector similarity {candidate.get('vector_score', 0.0):.2f}"
+                    if shared:
+                        explanation += f"; shared tags: {shared}"
+                    connections.append({
+                        "memory_id": candidate.get("memory_id"),
+                        "explanation": explanation,
+                        "score": round(float(candidate.get("score", 0.0)), 4),
+                    })
+                
+                logger.info(f"Suggested {len(connections)} connections by vector similarity for memory {memory_id}")
+                self._record_connections(memory_id, connections)
+                return connections
             
-            # Limit the number of memories to consider
-            other_memories = other_memories[:10]  # Consider at most 10 other memories
+            if not other_memories:
+                return []
             
-            # Create memory descriptions
+            # Create memory descriptions; short aliases stand in for the memory IDs
+            aliases = {}
             memory_descriptions = []
             for i, m in enumerate(other_memories):
-                m_id = m.get("memory_id")
-                m_content = m.get("content", "")
-                memory_descriptions.append(f"Memory {i+1} (ID: {m_id}):\n{m_content[:200]}...")
+                alias = f"M{i+1}"
+                aliases[alias] = m.get("memory_id")
+                preview = self.prompts.compact_text(m.get("content", ""), "connections_candidate", self.preview_tokens)
+                memory_descriptions.append(f"{alias}: {preview}")
             
             # Join memory descriptions
-            all_descriptions = "\n\n".join(memory_descriptions)
+            all_descriptions = "\n".join(memory_descriptions)
             
             # Create prompt
             prompt = f"""I have a target memory and several other memories. Please suggest up to {max_connections} other memories that might have meaningful connections with the target memory.
 
 Target Memory:
-{content}
+{self.prompts.compact_text(content, "connections_target", self.context_tokens)}
 
 Other Memories:
 {all_descriptions}
@@ -316,24 +1200,21 @@ For each suggested connection, provide:
 
 Format your response as a JSON array:
 [
-  {{"memory_id": "memory_123", "explanation": "These are connected because...", "score": 0.85}},
+  {{"memory_id": "M1", "explanation": "These are connected because...", "score": 0.85}},
   ...
 ]
 """
             
             # Call Anthropic API
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=self.max_tokens,
-                temperature=0.3,  # Lower temperature for more consistent output
+            response = self._create_message(
                 system="You are an expert at finding connections between different pieces of information. You provide insightful connection suggestions in the exact format requested.",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
+                prompt=prompt,
+                temperature=0.3,  # Lower temperature for more consistent output
+                method="connections"
             )
             
             # Extract connections text
-            connections_text = response.content[0].text
+            connections_text = response["text"]
             
             # Parse JSON
             try:
@@ -344,6 +1225,9 @@ Format your response as a JSON array:
                 if start_idx >= 0 and end_idx > start_idx:
                     json_str = connections_text[start_idx:end_idx]
                     connections = json.loads(json_str)
+                    for connection in connections:
+                        if isinstance(connection, dict):
+                            connection["memory_id"] = aliases.get(connection.get("memory_id"), connection.get("memory_id"))
                 else:
                     # Fallback if JSON array not found
                     connections = []
@@ -352,6 +1236,7 @@ Format your response as a JSON array:
                 connections = []
             
             logger.info(f"Generated {len(connections)} suggested connections for memory {memory_id}")
+            self._record_connections(memory_id, connections)
             return connections
         except Exception as e:
             logger.error(f"Error suggesting connections: {str(e)}")
@@ -0,0 +1,170 @@
+"""
+LLM Clients
+
+This module provides shared, lazily built LLM API clients. Reusing one client
+per process keeps HTTP connection pools and TLS sessions alive across calls
+instead of paying a new handshake on every request.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from memory_system.config import config
+
+logger = logging.getLogger("MemorySystem.LLMClients")
+
+_clients: Dict[Tuple[str, str, Optional[str]], Any] = {}
+_lock = threading.Lock()
+
+def _http_settings(provider: str) -> Tuple[httpx.Limits, httpx.Timeout]:
+    """
+    Get the connection pool limits and timeouts for a provider from config.
+
+    Args:
+        provider: Config prefix of the provider (e.g. "openai")
+
+    Returns:
+        Tuple of (pool limits, timeouts)
+    """
+    pool_size = config.get(f"{provider}.pool_size", 20)
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=config.get(f"{provider}.keepalive_expiry", 60.0)
+    )
+    timeout = httpx.Timeout(
+        config.get(f"{provider}.timeout", 60.0),
+        connect=config.get(f"{provider}.connect_timeout", 10.0)
+    )
+    return limits, timeout
+
+def _get_or_create(key: Tuple[str, str, Optional[str]], factory) -> Any:
+    """Return the cached client for a key, building it once under the lock."""
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = factory()
+            _clients[key] = client
+            logger.info(f"Created shared {key[0]} client")
+        return client
+
+def get_openai_client(api_key: str, base_url: Optional[str] = None) -> Any:
+    """
+    Get the shared synchronous OpenAI client.
+
+    The client is thread-safe and built once per (api_key, base_url).
+
+    Args:
+        api_key: OpenAI API key
+        base_url: API base URL (optional, defaults to the public API)
+
+    Returns:
+        openai.OpenAI instance
+    """
+    import openai
+
+    def factory():
+        limits, timeout = _http_settings("openai")
+        return openai.OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            # Rate-limit retries are handled by the caller with jittered backoff
+            max_retries=0,
+            http_client=httpx.Client(limits=limits, timeout=timeout)
+        )
+
+    return _get_or_create(("openai", api_key, base_url), factory)
+
+def get_async_openai_client(api_key: str, base_url: Optional[str] = None) -> Any:
+    """
+    Get the shared asynchronous OpenAI client.
+
+    Args:
+        api_key: OpenAI API key
+        base_url: API base URL (optional, defaults to the public API)
+
+    Returns:
+        openai.AsyncOpenAI instance
+    """
+    import openai
+
+    def factory():
+        limits, timeout = _http_settings("openai")
+        return openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,
+            http_client=httpx.AsyncClient(limits=limits, timeout=timeout)
+        )
+
+    return _get_or_create(("openai_async", api_key, base_url), factory)
+
+def get_anthropic_client(api_key: str, base_url: Optional[str] = None) -> Any:
+    """
+    Get the shared synchronous Anthropic client.
+
+    The client is thread-safe and built once per (api_key, base_url).
+
+    Args:
+        api_key: Anthropic API key
+        base_url: API base URL (optional, defaults to the public API)
+
+    Returns:
+        anthropic.Anthropic instance
+    """
+    import anthropic
+
+    def factory():
+        limits, timeout = _http_settings("anthropic")
+        return anthropic.Anthropic(
+            api_key=api_key,
+            base_url=base_url,
+            # Rate-limit retries are handled by the caller with jittered backoff
+            max_retries=0,
+            # The SDK's own client class keeps its default headers and transport settings
+            http_client=anthropic.DefaultHttpxClient(limits=limits, timeout=timeout)
+        )
+
+    return _get_or_create(("anthropic", api_key, base_url), factory)
+
+def get_async_anthropic_client(api_key: str, base_url: Optional[str] = None) -> Any:
+    """
+    Get the shared asynchronous Anthropic client.
+
+    Args:
+        api_key: Anthropic API key
+        base_url: API base URL (optional, defaults to the public API)
+
+    Returns:
+        anthropic.AsyncAnthropic instance
+    """
+    import anthropic
+
+    def factory():
+        limits, timeout = _http_settings("anthropic")
+        return anthropic.AsyncAnthropic(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,
+            http_client=anthropic.DefaultAsyncHttpxClient(limits=limits, timeout=timeout)
+        )
+
+    return _get_or_create(("anthropic_async", api_key, base_url), factory)
+
+def close_clients() -> None:
+    """Close and forget all shared synchronous clients."""
+    with _lock:
+        for key, client in list(_clients.items()):
+            if not key[0].endswith("_async"):
+                try:
+                    client.close()
+                except Exception as e:
+                    logger.warning(f"Error closing {key[0]} client: {str(e)}")
+        _clients.clear()
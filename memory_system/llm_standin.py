@@ -0,0 +1,411 @@
+"""
+LLM Stand-in
+
+This module implements a local stand-in server for the LLM APIs used by
+Layers 3 and 4: OpenAI chat completions (POST /v1/chat/completions) and
+Anthropic messages (POST /v1/messages). It lets those code paths be
+benchmarked end to end on an offline machine.
+
+Modes:
+    record: forward each request to the real API, save the response to a
+        cassette and return it
+    replay: serve responses from the cassette; requests missing from the
+        cassette get a synthetic response (or a 404 in strict mode)
+    synthetic: always serve synthetic responses
+
+Point the generators at it with base-URL config:
+    openai.base_url: http://127.0.0.1:<port>/v1
+    anthropic.base_url: http://127.0.0.1:<port>
+
+Usage:
+    python -m memory_system.llm_standin --mode replay --cassette memory_data/cassettes/llm.jsonl --latency lognormal:400:0.5
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from memory_system.tokens import count_tokens
+
+logger = logging.getLogger("MemorySystem.LLMStandIn")
+
+OPENAI_PATH = "/v1/chat/completions"
+ANTHROPIC_PATH = "/v1/messages"
+
+UPSTREAMS = {
+    OPENAI_PATH: "https://api.openai.com",
+    ANTHROPIC_PATH: "https://api.anthropic.com",
+}
+
+# Request headers passed through to the real API in record mode
+FORWARDED_HEADERS = ("authorization", "x-api-key", "anthropic-version", "anthropic-beta", "content-type")
+
+def request_key(path: str, body: Dict[str, Any]) -> str:
+    """
+    Get the cassette key of a request.
+
+    Args:
+        path: Request path
+        body: Parsed JSON request body
+
+    Returns:
+        SHA-256 hex digest of the path and the canonical request body
+    """
+    canonical = json.dumps({k: v for k, v in body.items() if k != "stream"}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{path}\n{canonical}".encode()).hexdigest()
+
+def parse_latency(spec: Optional[str], seed: Optional[int] = None) -> Callable[[Optional[float]], float]:
+    """
+    Build a latency sampler from a distribution spec.
+
+    Specs (all values in milliseconds):
+        none                  no added latency
+        fixed:MS              constant latency
+        uniform:LOW:HIGH      uniform between LOW and HIGH
+        normal:MEAN:STD       normal, truncated at 0
+        lognormal:MEDIAN:SIGMA  log-normal with the given median and shape
+        recorded[:SCALE]      latency captured with the response, times SCALE
+
+    Args:
+        spec: Distribution spec (optional, defaults to none)
+        seed: Random seed for reproducible runs (optional)
+
+    Returns:
+        Function mapping the recorded latency in ms (or None) to a delay in seconds
+    """
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    parts = (spec or "none").split(":")
+    kind, args = parts[0], [float(p) for p in parts[1:]]
+
+    def sample(draw: Callable[[], float]) -> float:
+        with lock:
+            return max(draw(), 0.0) / 1000.0
+
+    if kind == "none":
+        return lambda recorded: 0.0
+    if kind == "fixed":
+        return lambda recorded: args[0] / 1000.0
+    if kind == "uniform":
+        return lambda recorded: sample(lambda: rng.uniform(args[0], args[1]))
+    if kind == "normal":
+        return lambda recorded: sample(lambda: rng.gauss(args[0], args[1]))
+    if kind == "lognormal":
+        mu = math.log(args[0])
+        return lambda recorded: sample(lambda: rng.lognormvariate(mu, args[1]))
+    if kind == "recorded":
+        scale = args[0] if args else 1.0
+        return lambda recorded: (recorded or 0.0) * scale / 1000.0
+
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+def synthetic_response(path: str, body: Dict[str, Any], key: str) -> Dict[str, Any]:
+    """
+    Build a deterministic synthetic response for a request.
+
+    Args:
+        path: Request path
+        body: Parsed JSON request body
+        key: Cassette key of the request
+
+    Returns:
+        Response body in the format of the requested API
+    """
+    model = body.get("model", "stand-in")
+    messages = body.get("messages", [])
+    prompt_text = body.get("system", "") if isinstance(body.get("system"), str) else ""
+    for message in messages:
+        content = message.get("content", "")
+        prompt_text += content if isinstance(content, str) else json.dumps(content)
+
+    text = f"Stand-in response {key[:12]} for a {len(prompt_text)}-character prompt."
+    prompt_tokens = count_tokens(prompt_text)
+    completion_tokens = count_tokens(text)
+
+    if path == ANTHROPIC_PATH:
+        return {
+            "id": f"msg_standin_{key[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": model,
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": prompt_tokens, "output_tokens": completion_tokens},
+        }
+
+    return {
+        "id": f"chatcmpl-standin-{key[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": text},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+class LLMStandIn:
+    """
+    Local record/replay stand-in for the OpenAI and Anthropic APIs.
+
+    Cassettes are JSON Lines files with one {key, path, status, response,
+    latency_ms} entry per recorded request.
+    """
+
+    def __init__(
+        self,
+        cassette_path: Optional[str] = None,
+        mode: str = "replay",
+        latency: Optional[str] = None,
+        seed: Optional[int] = None,
+        strict: bool = False,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        error_rate: float = 0.0
+    ):
+        """
+        Initialize the LLM Stand-in.
+
+        Args:
+            cassette_path: Path of the cassette file (required for record mode)
+            mode: record, replay or synthetic
+            latency: Latency distribution spec (see parse_latency)
+            seed: Random seed for the latency distribution (optional)
+            strict: In replay mode, answer cassette misses with 404 instead of a synthetic response
+            host: Address to bind
+            port: Port to bind (0 picks a free port)
+            error_rate: Fraction of requests answered with an HTTP 500, for failover testing
+        """
+        if mode not in ("record", "replay", "synthetic"):
+            raise ValueError(f"Unknown stand-in mode: {mode}")
+        if mode == "record" and not cassette_path:
+            raise ValueError("Record mode needs a cassette path")
+
+        self.cassette_path = cassette_path
+        self.mode = mode
+        self.strict = strict
+        self.host = host
+        self.port = port
+        self._latency = parse_latency(latency, seed)
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+
+        self.stats = {"requests": 0, "hits": 0, "misses": 0, "recorded": 0, "errors": 0}
+        self._cassette: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+        if cassette_path and os.path.exists(cassette_path):
+            self._load_cassette()
+
+    def _load_cassette(self) -> None:
+        """Load the recorded responses from the cassette file."""
+        with open(self.cassette_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entry = json.loads(line)
+                    self._cassette[entry["key"]] = entry
+
+        logger.info(f"Loaded {len(self._cassette)} recorded responses from {self.cassette_path}")
+
+    def _record(self, entry: Dict[str, Any]) -> None:
+        """Add a response to the cassette and append it to the cassette file."""
+        with self._lock:
+            self._cassette[entry["key"]] = entry
+            self.stats["recorded"] += 1
+
+            directory = os.path.dirname(self.cassette_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.cassette_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def _forward(self, path: str, raw_body: bytes, headers: Dict[str, str]) -> Tuple[int, Dict[str, Any], float]:
+        """
+        Send a request to the real API.
+
+        Returns:
+            Tuple of (HTTP status, response body, latency in ms)
+        """
+        import httpx
+
+        start = time.perf_counter()
+        response = httpx.post(UPSTREAMS[path] + path, content=raw_body, headers=headers, timeout=120.0)
+        latency_ms = (time.perf_counter() - start) * 1000.0
+        return response.status_code, response.json(), latency_ms
+
+    def handle(self, path: str, raw_body: bytes, headers: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        """
+        Produce the response to an API request.
+
+        Args:
+            path: Request path
+            raw_body: Raw JSON request body
+            headers: Request headers (lower-case names)
+
+        Returns:
+            Tuple of (HTTP status, response body)
+        """
+        body = json.loads(raw_body or b"{}")
+        key = request_key(path, body)
+
+        with self._lock:
+            self.stats["requests"] += 1
+            entry = self._cassette.get(key)
+            inject_error = self.error_rate and self._rng.random() < self.error_rate
+
+        if inject_error and self.mode != "record":
+            with self._lock:
+                self.stats["errors"] += 1
+            time.sleep(self._latency(None))
+            return 500, {"error": {"type": "api_error", "message": "Injected stand-in error"}}
+
+        if self.mode == "record":
+            forwarded = {name: value for name, value in headers.items() if name in FORWARDED_HEADERS}
+            status, response, latency_ms = self._forward(path, raw_body, forwarded)
+            if status == 200:
+                self._record({"key": key, "path": path, "status": status, "response": response, "latency_ms": latency_ms})
+            return status, response
+
+        if entry is not None and self.mode == "replay":
+            with self._lock:
+                self.stats["hits"] += 1
+            time.sleep(self._latency(entry.get("latency_ms")))
+            return entry.get("status", 200), entry["response"]
+
+        with self._lock:
+            self.stats["misses"] += 1
+
+        if self.mode == "replay" and self.strict:
+            return 404, {"error": {"type": "not_found", "message": f"No recorded response for request {key[:12]}"}}
+
+        time.sleep(self._latency(None))
+        return 200, synthetic_response(path, body, key)
+
+    def _make_handler(self):
+        """Build the HTTP request handler bound to this stand-in."""
+        standin = self
+
+        class StandInHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                path = self.path.split("?", 1)[0].rstrip("/")
+                length = int(self.headers.get("Content-Length", 0))
+                raw_body = self.rfile.read(length)
+
+                if path not in UPSTREAMS:
+                    status, response = 404, {"error": {"type": "not_found", "message": f"Unknown path: {path}"}}
+                else:
+                    try:
+                        headers = {name.lower(): value for name, value in self.headers.items()}
+                        status, response = standin.handle(path, raw_body, headers)
+                    except Exception as e:
+                        logger.error(f"Error handling stand-in request: {str(e)}")
+                        with standin._lock:
+                            standin.stats["errors"] += 1
+                        status, response = 500, {"error": {"type": "api_error", "message": str(e)}}
+
+                data = json.dumps(response).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return StandInHandler
+
+    @property
+    def url(self) -> str:
+        """Root URL of the running server (the Anthropic base URL)."""
+        return f"http://{self.host}:{self._server.server_address[1]}"
+
+    @property
+    def openai_base_url(self) -> str:
+        """OpenAI base URL of the running server."""
+        return f"{self.url}/v1"
+
+    @property
+    def anthropic_base_url(self) -> str:
+        """Anthropic base URL of the running server."""
+        return self.url
+
+    def start(self) -> "LLMStandIn":
+        """
+        Start serving on a background thread.
+
+        Returns:
+            The stand-in itself
+        """
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="llm-standin", daemon=True)
+        self._thread.start()
+
+        logger.info(f"LLM stand-in ({self.mode}) listening on {self.url}")
+        return self
+
+    def stop(self) -> None:
+        """Stop the server."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "LLMStandIn":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+def main():
+    """Run the stand-in server in the foreground."""
+    parser = argparse.ArgumentParser(description="Local record/replay stand-in for the OpenAI and Anthropic APIs")
+    parser.add_argument("--mode", choices=["record", "replay", "synthetic"], default="replay")
+    parser.add_argument("--cassette", default="memory_data/cassettes/llm.jsonl", help="Cassette file (JSON Lines)")
+    parser.add_argument("--latency", default=None, help="Latency distribution, e.g. fixed:200, lognormal:400:0.5, recorded")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for the latency distribution")
+    parser.add_argument("--strict", action="store_true", help="Answer cassette misses with 404 in replay mode")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    standin = LLMStandIn(args.cassette, args.mode, args.latency, args.seed, args.strict, args.host, args.port, args.error_rate).start()
+    print(f"openai.base_url: {standin.openai_base_url}")
+    print(f"anthropic.base_url: {standin.anthropic_base_url}")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin.stop()
+        print(json.dumps(standin.stats))
+
+if __name__ == "__main__":
+    main()
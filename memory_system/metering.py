@@ -0,0 +1,397 @@
+"""
+Metering
+
+This module records the cost of every LLM call Layers 3 and 4 make: tokens
+in and out, wall time, retries, cache hits and the estimated price, broken
+down by layer, method, provider and model. Recent calls are kept in memory
+and written to SQLite in batches, and a report of the totals is available
+from Python, the Flask API and the command line:
+
+    python -m memory_system.metering --since 24 --by layer,method
+"""
+
+import argparse
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+from memory_system.config import config
+
+logger = logging.getLogger("MemorySystem.Metering")
+
+# USD per million input and output tokens; override or extend with metering.prices
+DEFAULT_PRICES = {
+    "gpt-3.5-turbo": {"input": 0.50, "output": 1.50},
+    "gpt-4o-mini": {"input": 0.15, "output": 0.60},
+    "gpt-4o": {"input": 2.50, "output": 10.00},
+    "claude-3-haiku-20240307": {"input": 0.25, "output": 1.25},
+    "claude-3-sonnet-20240229": {"input": 3.00, "output": 15.00},
+    "claude-3-opus-20240229": {"input": 15.00, "output": 75.00},
+}
+
+GROUP_COLUMNS = ("layer", "method", "provider", "model")
+
+class Meter:
+    """
+    Per-call LLM usage and cost records.
+
+    Records go into a ring buffer of the most recent calls and a pending
+    batch that is written to SQLite once it reaches flush_size records, by
+    a background thread every flush_interval seconds, before a report, and
+    when the process exits.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        capacity: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        flush_size: Optional[int] = None,
+        prices: Optional[Dict[str, Dict[str, float]]] = None
+    ):
+        """
+        Initialize the Meter.
+
+        Args:
+            path: Path of the SQLite database (optional, read from config)
+            capacity: Recent records kept in memory (optional, read from config)
+            flush_interval: Longest time in seconds a record waits to be written (optional, read from config)
+            flush_size: Pending records that trigger a write (optional, read from config)
+            prices: Mapping of model to USD per million 'input' and 'output' tokens (optional, read from config)
+        """
+        self.path = path or config.get("metering.path", "memory_data/metering.sqlite")
+        self.capacity = capacity or config.get("metering.capacity", 1000)
+        self.flush_interval = flush_interval if flush_interval is not None else config.get("metering.flush_interval", 30.0)
+        self.flush_size = flush_size or config.get("metering.flush_size", 100)
+        self.enabled = config.get("metering.enabled", True)
+
+        self.prices = dict(DEFAULT_PRICES)
+        self.prices.update(prices if prices is not None else config.get("metering.prices", {}) or {})
+
+        self._recent = deque(maxlen=self.capacity)
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._conn = None
+
+        # Started on the first record, so idle processes run no thread
+        self._flusher: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+        atexit.register(self.flush)
+
+    def _start_flusher(self) -> None:
+        """Start the background flush thread if it is not running. Caller must hold the lock."""
+        if self._flusher is not None or self.flush_interval <= 0 or self._stopped.is_set():
+            return
+        self._flusher = threading.Thread(target=self._flush_periodically, name="MeterFlush", daemon=True)
+        self._flusher.start()
+
+    def _flush_periodically(self) -> None:
+        """Flush pending records every flush_interval seconds until closed."""
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use."""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS calls (
+                    timestamp REAL NOT NULL,
+                    layer TEXT NOT NULL,
+                    method TEXT NOT NULL,
+                    provider TEXT,
+                    model TEXT,
+                    input_tokens INTEGER NOT NULL,
+                    output_tokens INTEGER NOT NULL,
+                    latency REAL NOT NULL,
+                    retries INTEGER NOT NULL,
+                    hedged INTEGER NOT NULL,
+                    cache_hit INTEGER NOT NULL,
+                    error INTEGER NOT NULL,
+                    cost REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS calls_timestamp ON calls (timestamp)")
+            self._conn.commit()
+        return self._conn
+
+    def estimate_cost(self, model: Optional[str], input_tokens: int, output_tokens: int) -> float:
+        """
+        Estimate the price of a call in USD.
+
+        Models are matched exactly first, then by the longest configured
+        name they start with, so dated model versions share a price.
+
+        Args:
+            model: Model name
+            input_tokens: Prompt tokens
+            output_tokens: Completion tokens
+
+        Returns:
+            Estimated cost, 0.0 for models without a price
+        """
+        price = self.prices.get(model or "")
+        if price is None and model:
+            matches = [name for name in self.prices if model.startswith(name)]
+            if matches:
+                price = self.prices[max(matches, key=len)]
+        if not price:
+            return 0.0
+        return (input_tokens * price.get("input", 0.0) + output_tokens * price.get("output", 0.0)) / 1_000_000
+
+    def record(
+        self,
+        layer: str,
+        method: str,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        latency: float = 0.0,
+        retries: int = 0,
+        hedged: bool = False,
+        cache_hit: bool = False,
+        error: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Record one LLM call or cache hit.
+
+        Args:
+            layer: Layer that made the call, e.g. "layer3"
+            method: Call site, e.g. "summary" or "relationship"
+            provider: Provider that served the call (optional)
+            model: Model that served the call (optional)
+            input_tokens: Prompt tokens
+            output_tokens: Completion tokens
+            latency: Wall time in seconds
+            retries: Rate-limit retries and failed provider attempts
+            hedged: Whether a duplicate request was sent
+            cache_hit: Whether the result was served from a cache instead
+            error: Whether the call failed
+
+        Returns:
+            The record, or None if metering is disabled
+        """
+        if not self.enabled:
+            return None
+
+        entry = {
+            "timestamp": time.time(),
+            "layer": layer,
+            "method": method,
+            "provider": provider,
+            "model": model,
+            "input_tokens": int(input_tokens or 0),
+            "output_tokens": int(output_tokens or 0),
+            "latency": float(latency or 0.0),
+            "retries": int(retries or 0),
+            "hedged": bool(hedged),
+            "cache_hit": bool(cache_hit),
+            "error": bool(error),
+            "cost": 0.0 if cache_hit or error else self.estimate_cost(model, input_tokens or 0, output_tokens or 0),
+        }
+
+        with self._lock:
+            self._recent.append(entry)
+            self._pending.append(entry)
+            self._start_flusher()
+            due = len(self._pending) >= self.flush_size
+
+        if due:
+            self.flush()
+        return entry
+
+    def record_response(
+        self,
+        layer: str,
+        method: str,
+        response: Dict[str, Any],
+        latency: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Record a call from a routed response.
+
+        Args:
+            layer: Layer that made the call
+            method: Call site
+            response: ProviderRouter response with 'usage', 'provider', 'model', 'latency', 'retries',
+                'hedged' and, for a failed request that lost a hedge, 'error'
+            latency: Wall time in seconds (optional, defaults to the response's latency)
+
+        Returns:
+            The record, or None if metering is disabled
+        """
+        usage = response.get("usage") or {}
+        return self.record(
+            layer,
+            method,
+            provider=response.get("provider"),
+            model=response.get("model"),
+            input_tokens=usage.get("input_tokens", 0),
+            output_tokens=usage.get("output_tokens", 0),
+            latency=latency if latency is not None else response.get("latency", 0.0),
+            retries=response.get("retries", 0),
+            hedged=response.get("hedged", False),
+            error=response.get("error", False)
+        )
+
+    def flush(self) -> int:
+        """
+        Write pending records to SQLite.
+
+        Returns:
+            Number of records written
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+
+            try:
+                conn = self._connect()
+                conn.executemany(
+                    "INSERT INTO calls (timestamp, layer, method, provider, model, input_tokens, output_tokens, "
+                    "latency, retries, hedged, cache_hit, error, cost) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (e["timestamp"], e["layer"], e["method"], e["provider"], e["model"], e["input_tokens"],
+                         e["output_tokens"], e["latency"], e["retries"], int(e["hedged"]), int(e["cache_hit"]),
+                         int(e["error"]), e["cost"])
+                        for e in pending
+                    ]
+                )
+                conn.commit()
+            except Exception as e:
+                # Keep the records for the next flush rather than losing them
+                self._pending = pending + self._pending
+                logger.error(f"Error writing metering records: {str(e)}")
+                return 0
+
+        logger.debug(f"Wrote {len(pending)} metering records")
+        return len(pending)
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get the most recent records, newest first.
+
+        Args:
+            limit: Maximum number of records (optional)
+
+        Returns:
+            List of records
+        """
+        with self._lock:
+            records = list(self._recent)
+        records.reverse()
+        return records[:limit] if limit else records
+
+    def report(
+        self,
+        since: Optional[float] = None,
+        group_by: Sequence[str] = ("layer", "method", "model")
+    ) -> Dict[str, Any]:
+        """
+        Aggregate recorded calls.
+
+        Args:
+            since: Only include records after this Unix timestamp (optional)
+            group_by: Columns to group by, any of layer, method, provider and model
+
+        Returns:
+            Dictionary with 'rows' (one per group, with calls, cache_hits,
+            errors, retries, hedged, input_tokens, output_tokens, cost,
+            avg_latency and max_latency) and 'totals'
+        """
+        columns = [column for column in group_by if column in GROUP_COLUMNS]
+        self.flush()
+
+        try:
+            with self._lock:
+                conn = self._connect()
+                select = ", ".join(columns + [
+                    "SUM(1 - cache_hit)", "SUM(cache_hit)", "SUM(error)", "SUM(retries)", "SUM(hedged)",
+                    "SUM(input_tokens)", "SUM(output_tokens)", "SUM(cost)",
+                    "AVG(CASE WHEN cache_hit = 0 THEN latency END)", "MAX(latency)",
+                ])
+                query = f"SELECT {select} FROM calls WHERE timestamp >= ?"
+                if columns:
+                    query += f" GROUP BY {', '.join(columns)} ORDER BY SUM(cost) DESC"
+                rows = conn.execute(query, (since or 0,)).fetchall()
+        except Exception as e:
+            logger.error(f"Error reading metering records: {str(e)}")
+            return {"rows": [], "totals": {}}
+
+        keys = ["calls", "cache_hits", "errors", "retries", "hedged", "input_tokens", "output_tokens",
+                "cost", "avg_latency", "max_latency"]
+        results = []
+        for row in rows:
+            entry = dict(zip(columns, row[:len(columns)]))
+            entry.update({key: value or 0 for key, value in zip(keys, row[len(columns):])})
+            entry["cost"] = round(entry["cost"], 6)
+            results.append(entry)
+
+        totals = {key: sum(row[key] for row in results) for key in keys if key not in ("avg_latency", "max_latency")}
+        if totals:
+            totals["cost"] = round(totals["cost"], 6)
+        return {"rows": results, "totals": totals}
+
+    def close(self) -> None:
+        """Stop the background flush thread, flush pending records and close the database connection."""
+        self._stopped.set()
+        self.flush()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+# Create a singleton instance
+meter = Meter()
+
+def main():
+    """Print a usage and cost report."""
+    parser = argparse.ArgumentParser(description="Report LLM token usage and estimated cost")
+    parser.add_argument("--since", type=float, default=None, help="Only include the last N hours")
+    parser.add_argument("--by", default="layer,method,model", help="Comma-separated grouping columns")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    since = time.time() - args.since * 3600 if args.since else None
+    columns = [column.strip() for column in args.by.split(",") if column.strip()]
+    report = meter.report(since, columns)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    headers = columns + ["calls", "cache_hits", "errors", "retries", "input_tokens", "output_tokens", "avg_latency", "cost"]
+    lines = [[str(row.get(header) or "-") if header in columns else
+              f"{row[header]:.3f}" if header == "avg_latency" else
+              f"${row[header]:.4f}" if header == "cost" else str(row[header])
+              for header in headers]
+             for row in report["rows"]]
+    widths = [max([len(header)] + [len(line[i]) for line in lines]) for i, header in enumerate(headers)]
+
+    print("  ".join(header.ljust(width) for header, width in zip(headers, widths)))
+    for line in lines:
+        print("  ".join(value.ljust(width) for value, width in zip(line, widths)))
+
+    totals = report["totals"]
+    if totals:
+        print(f"\nTotal: {totals['calls']} calls, {totals['cache_hits']} cache hits, "
+              f"{totals['input_tokens']} input / {totals['output_tokens']} output tokens, ${totals['cost']:.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Prompt Builder
+
+This module compacts the text that Layers 3 and 4 put into prompts:
+boilerplate whitespace is removed, runs of repeated lines (such as table
+rows) are collapsed, passages repeated across a group of memories are sent
+once, long texts are truncated to a token budget keeping their head and
+tail, and tags are listed once per type. The tokens saved are recorded
+per call site unless prompts.track_savings is switched off.
+"""
+
+import logging
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from memory_system.config import config
+from memory_system.tokens import count_tokens
+
+logger = logging.getLogger("MemorySystem.PromptBuilder")
+
+_SPACES = re.compile(r"[ \t ]+")
+_INDENT = re.compile(r"^[ \t ]*")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_SENTENCES = re.compile(r"(?<=[.!?])\s+")
+
+def normalize_whitespace(text: str) -> str:
+    """
+    Collapse runs of spaces inside lines and of blank lines, and strip line ends.
+
+    Leading indentation is kept, so code, nested lists and tables keep
+    their structure.
+
+    Args:
+        text: Text to normalize
+
+    Returns:
+        Normalized text
+    """
+    lines = []
+    for line in text.replace("\r\n", "\n").split("\n"):
+        indent = _INDENT.match(line).group()
+        lines.append(indent + _SPACES.sub(" ", line[len(indent):]).rstrip() if line.strip() else "")
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip("\n")
+
+def collapse_repeated_lines(text: str, min_run: int = 3) -> str:
+    """
+    Replace runs of identical consecutive lines with one line and a count.
+
+    Args:
+        text: Text to collapse
+        min_run: Shortest run that is collapsed
+
+    Returns:
+        Collapsed text
+    """
+    lines = text.split("\n")
+    collapsed = []
+    i = 0
+    while i < len(lines):
+        j = i
+        while j + 1 < len(lines) and lines[j + 1] == lines[i]:
+            j += 1
+        run = j - i + 1
+        if run >= min_run and lines[i]:
+            collapsed.append(f"{lines[i]} [x{run}]")
+        else:
+            collapsed.extend(lines[i:j + 1])
+        i = j + 1
+    return "\n".join(collapsed)
+
+class PromptBuilder:
+    """
+    Prompt compaction with per-call-site savings tracking.
+
+    Compaction can be switched off with prompts.compaction, in which case
+    texts pass through unchanged apart from budget truncation. Savings are
+    measured with the token counts truncation already takes where it can,
+    and can be switched off with track_savings.
+    """
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        enabled: Optional[bool] = None,
+        head_ratio: Optional[float] = None,
+        min_repeat_words: Optional[int] = None,
+        track_savings: Optional[bool] = None
+    ):
+        """
+        Initialize the Prompt Builder.
+
+        Args:
+            model: Model whose tokenizer counts tokens (optional)
+            enabled: Apply compaction (optional, read from config)
+            head_ratio: Share of a truncation budget kept from the start of a text (optional, read from config)
+            min_repeat_words: Shortest sentence, in words, deduplicated across a group (optional, read from config)
+            track_savings: Count the tokens saved per call site (optional, read from config)
+        """
+        self.model = model
+        self.enabled = enabled if enabled is not None else config.get("prompts.compaction", True)
+        self.head_ratio = head_ratio if head_ratio is not None else config.get("prompts.head_ratio", 0.7)
+        self.min_repeat_words = min_repeat_words or config.get("prompts.min_repeat_words", 6)
+        self.track_savings = track_savings if track_savings is not None else config.get("prompts.track_savings", True)
+
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _record(self, label: str, before: str, after: str, tokens_after: Optional[int] = None) -> None:
+        """Record the tokens saved by one compaction, reusing the count of the result if known."""
+        if not self.track_savings:
+            return
+
+        if tokens_after is None:
+            tokens_after = count_tokens(after, self.model)
+        tokens_before = tokens_after if before == after else count_tokens(before, self.model)
+
+        with self._lock:
+            stats = self.stats.setdefault(label, {"calls": 0, "tokens_before": 0, "tokens_after": 0})
+            stats["calls"] += 1
+            stats["tokens_before"] += tokens_before
+            stats["tokens_after"] += tokens_after
+
+        if tokens_before > tokens_after:
+            logger.debug(f"Compacted {label} prompt text from {tokens_before} to {tokens_after} tokens")
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Truncate text to a token budget, keeping its head and tail.
+
+        Args:
+            text: Text to truncate
+            max_tokens: Token budget
+
+        Returns:
+            Text of at most about max_tokens tokens, with an omission marker in the middle
+        """
+        return self._truncate(text, max_tokens)[0]
+
+    def _truncate(self, text: str, max_tokens: int) -> Tuple[str, Optional[int]]:
+        """Truncate text to a token budget; also returns its token count when it already fit."""
+        total = count_tokens(text, self.model)
+        if total <= max_tokens:
+            return text, total
+
+        # Approximate token positions by character share, which is close for prose
+        head_chars = int(len(text) * max_tokens * self.head_ratio / total)
+        tail_chars = int(len(text) * max_tokens * (1 - self.head_ratio) / total)
+        head = text[:head_chars].rsplit(" ", 1)[0]
+        tail = text[len(text) - tail_chars:].split(" ", 1)[-1] if tail_chars else ""
+        omitted = total - count_tokens(head + tail, self.model)
+        return f"{head} [... {omitted} tokens omitted ...] {tail}".strip(), None
+
+    def compact_text(self, text: str, label: str, max_tokens: Optional[int] = None) -> str:
+        """
+        Compact one text for a prompt.
+
+        Args:
+            text: Raw text (content, excerpt or commentary)
+            label: Call site the savings are recorded under
+            max_tokens: Token budget, truncating with head/tail preservation (optional)
+
+        Returns:
+            Compacted text
+        """
+        compacted, tokens = text, None
+        if self.enabled:
+            compacted = collapse_repeated_lines(normalize_whitespace(text))
+        if max_tokens:
+            compacted, tokens = self._truncate(compacted, max_tokens)
+
+        self._record(label, text, compacted, tokens)
+        return compacted
+
+    def compact_group(
+        self,
+        texts: List[str],
+        label: str,
+        max_tokens: Optional[int] = None
+    ) -> List[str]:
+        """
+        Compact the texts of a group of memories for one prompt.
+
+        Sentences that already appeared in an earlier text of the group are
+        replaced by a reference to it, so shared passages are sent once.
+
+        Args:
+            texts: Raw texts, in prompt order (the first text is Memory 1)
+            label: Call site the savings are recorded under
+            max_tokens: Token budget per text (optional)
+
+        Returns:
+            Compacted texts in the same order
+        """
+        if not self.enabled:
+            return [self.truncate(text, max_tokens) if max_tokens else text for text in texts]
+
+        seen: Dict[str, int] = {}
+        compacted = []
+        for index, text in enumerate(texts):
+            text_out = collapse_repeated_lines(normalize_whitespace(text))
+
+            lines = []
+            for line in text_out.split("\n"):
+                sentences = []
+                for sentence in _SENTENCES.split(line):
+                    key = sentence.lower()
+                    if len(sentence.split()) < self.min_repeat_words:
+                        sentences.append(sentence)
+                    elif key in seen and seen[key] != index:
+                        reference = f"[repeats Memory {seen[key] + 1}]"
+                        if not sentences or sentences[-1] != reference:
+                            sentences.append(reference)
+                    else:
+                        seen.setdefault(key, index)
+                        sentences.append(sentence)
+                lines.append(" ".join(sentences))
+            text_out = "\n".join(lines)
+
+            if max_tokens:
+                text_out = self.truncate(text_out, max_tokens)
+            compacted.append(text_out)
+
+        self._record(label, "\n\n".join(texts), "\n\n".join(compacted))
+        return compacted
+
+    def format_tags(self, tags: List[Dict[str, Any]], prefix: str = "Tags: ") -> str:
+        """
+        Format tags with each type listed once.
+
+        Args:
+            tags: List of tag dictionaries
+            prefix: Text before the tag list
+
+        Returns:
+            Tags line, e.g. "Tags: category: food, health; location: bakersfield",
+            or an empty string when there are no tags
+        """
+        if not tags:
+            return ""
+
+        by_type: Dict[str, List[str]] = {}
+        for tag in tags:
+            values = by_type.setdefault(tag.get("type", "general"), [])
+            value = str(tag.get("value", ""))
+            if value not in values:
+                values.append(value)
+
+        return prefix + "; ".join(f"{tag_type}: {', '.join(values)}" for tag_type, values in by_type.items())
+
+    def savings(self) -> Dict[str, Dict[str, int]]:
+        """
+        Get the tokens saved per call site.
+
+        Returns an empty mapping when track_savings is off.
+
+        Returns:
+            Mapping of call site to calls, tokens_before, tokens_after and tokens_saved
+        """
+        with self._lock:
+            return {
+                label: {**stats, "tokens_saved": stats["tokens_before"] - stats["tokens_after"]}
+                for label, stats in self.stats.items()
+            }
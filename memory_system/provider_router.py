@@ -0,0 +1,651 @@
+"""
+Provider Router
+
+This module routes Layer 3 and Layer 4 LLM calls across providers. A call
+goes to the first provider whose circuit breaker is closed; if it has not
+answered by the provider's observed latency percentile, a hedged duplicate
+is sent to the next provider and the first good answer wins. Failed calls
+fail over to the next provider immediately. Every response records which
+provider and model served it. complete_async does the same on an event
+loop with the providers' async clients.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Set, Union
+
+import numpy as np
+
+from memory_system.config import config
+from memory_system.llm_clients import (
+    get_anthropic_client,
+    get_async_anthropic_client,
+    get_async_openai_client,
+    get_openai_client,
+)
+from memory_system.rate_limiter import RateLimiter, async_call_with_retry, call_with_retry
+from memory_system.tokens import count_tokens
+
+logger = logging.getLogger("MemorySystem.ProviderRouter")
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker.
+
+    Opens after failure_threshold consecutive failures and rejects calls
+    until reset_timeout has passed; then one trial call is let through
+    (half-open), which closes the breaker on success or reopens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize the Circuit Breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds the breaker stays open before a trial call
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Current state: closed, open or half_open."""
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Check whether a call may be sent, claiming the trial call when half-open."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful call."""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        """Count a failed call, opening the breaker past the threshold."""
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning(f"Circuit opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+class Provider:
+    """
+    An LLM provider the router can send chat calls to.
+
+    Subclasses implement _send, and _send_async when they have an async
+    client; the base class applies the provider's shared rate limiter and
+    retries rate-limit errors.
+    """
+
+    name = ""
+    default_model = ""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+        max_retries: Optional[int] = None
+    ):
+        """
+        Initialize the Provider.
+
+        Args:
+            api_key: API key (optional, read from config)
+            base_url: API base URL (optional, read from config)
+            model: Model name (optional, read from config)
+            max_retries: Rate-limit retries (optional, read from config)
+        """
+        self.api_key = api_key or config.get(f"{self.name}.api_key") or os.getenv(f"{self.name.upper()}_API_KEY")
+        self.base_url = base_url or config.get(f"{self.name}.base_url")
+        self.model = model or config.get(f"{self.name}.model", self.default_model)
+        self.max_retries = max_retries if max_retries is not None else config.get(f"{self.name}.max_retries", 5)
+        self.rate_limiter = RateLimiter.shared(self.name)
+
+    def _send(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+        """Send one request and return {'text', 'usage'}."""
+        raise NotImplementedError
+
+    async def _send_async(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+        """Send one request with the async client and return {'text', 'usage'}; runs _send in a thread by default."""
+        return await asyncio.to_thread(self._send, messages, temperature, max_tokens)
+
+    def _retry_on(self) -> tuple:
+        """Exception types that are retried with backoff."""
+        return ()
+
+    def complete(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+        """
+        Send a chat call under the rate limiter.
+
+        Args:
+            messages: Chat messages in OpenAI format (system and user roles)
+            temperature: Sampling temperature
+            max_tokens: Completion token budget
+
+        Returns:
+            Dictionary with 'text', 'usage' ({'input_tokens', 'output_tokens'})
+            and 'retries' (rate-limit retries before the call went through)
+        """
+        estimated_tokens = sum(count_tokens(m["content"], self.model) for m in messages) + max_tokens
+        self.rate_limiter.acquire(estimated_tokens)
+
+        attempts = {"count": 0}
+
+        def send() -> Dict[str, Any]:
+            attempts["count"] += 1
+            return self._send(messages, temperature, max_tokens)
+
+        result = call_with_retry(send, retry_on=self._retry_on(), max_retries=self.max_retries)
+        result["retries"] = attempts["count"] - 1
+        return result
+
+    async def complete_async(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+        """
+        Send a chat call under the rate limiter without blocking the event loop.
+
+        Args:
+            messages: Chat messages in OpenAI format (system and user roles)
+            temperature: Sampling temperature
+            max_tokens: Completion token budget
+
+        Returns:
+            Dictionary with 'text', 'usage' ({'input_tokens', 'output_tokens'})
+            and 'retries' (rate-limit retries before the call went through)
+        """
+        estimated_tokens = sum(count_tokens(m["content"], self.model) for m in messages) + max_tokens
+        await self.rate_limiter.acquire_async(estimated_tokens)
+
+        attempts = {"count": 0}
+
+        async def send() -> Dict[str, Any]:
+            attempts["count"] += 1
+            return await self._send_async(messages, temperature, max_tokens)
+
+        result = await async_call_with_retry(send, retry_on=self._retry_on(), max_retries=self.max_retries)
+        result["retries"] = attempts["count"] - 1
+        return result
+
+class OpenAIProvider(Provider):
+    """OpenAI chat completions."""
+
+    name = "openai"
+    default_model = "gpt-3.5-turbo"
+
+    def _retry_on(self) -> tuple:
+        import openai
+        return (openai.RateLimitError,)
+
+    def _send(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+        response = get_openai_client(self.api_key, self.base_url).chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        return self._parse(response)
+
+    async def _send_async(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+        response = await get_async_openai_client(self.api_key, self.base_url).chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        return self._parse(response)
+
+    def _parse(self, response: Any) -> Dict[str, Any]:
+        """Get the text and token usage of a chat completion."""
+        usage = getattr(response, "usage", None)
+        return {
+            "text": response.choices[0].message.content,
+            "usage": {
+                "input_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+                "output_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            },
+        }
+
+class AnthropicProvider(Provider):
+    """Anthropic messages."""
+
+    name = "anthropic"
+    default_model = "claude-3-sonnet-20240229"
+
+    def _retry_on(self) -> tuple:
+        import anthropic
+        return (anthropic.RateLimitError,)
+
+    def _request(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+        """Get the messages.create arguments, with system prompts moved out of the messages."""
+        return {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "system": "\n\n".join(m["content"] for m in messages if m["role"] == "system"),
+            "messages": [m for m in messages if m["role"] != "system"],
+        }
+
+    def _send(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+        response = get_anthropic_client(self.api_key, self.base_url).messages.create(
+            **self._request(messages, temperature, max_tokens)
+        )
+        return self._parse(response)
+
+    async def _send_async(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+        response = await get_async_anthropic_client(self.api_key, self.base_url).messages.create(
+            **self._request(messages, temperature, max_tokens)
+        )
+        return self._parse(response)
+
+    def _parse(self, response: Any) -> Dict[str, Any]:
+        """Get the text and token usage of a message."""
+        usage = getattr(response, "usage", None)
+        return {
+            "text": response.content[0].text,
+            "usage": {
+                "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+                "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+            },
+        }
+
+PROVIDERS = {
+    OpenAIProvider.name: OpenAIProvider,
+    AnthropicProvider.name: AnthropicProvider,
+}
+
+class ProviderRouter:
+    """
+    Hedged, failover routing of chat calls across providers.
+
+    Providers are tried in order. The hedge delay of a provider is its
+    observed latency at hedge_percentile (clamped to [min_hedge_delay,
+    hedge_delay]); before min_samples calls have completed, hedge_delay
+    is used as is.
+    """
+
+    def __init__(
+        self,
+        providers: List[Provider],
+        hedge: bool = True,
+        hedge_percentile: Optional[float] = None,
+        hedge_delay: Optional[float] = None,
+        min_hedge_delay: Optional[float] = None,
+        min_samples: Optional[int] = None,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None
+    ):
+        """
+        Initialize the Provider Router.
+
+        Args:
+            providers: Providers in order of preference
+            hedge: Send hedged duplicates to the next provider when the current one is slow
+            hedge_percentile: Latency percentile after which a call is hedged (optional, read from config)
+            hedge_delay: Upper bound of the hedge delay in seconds (optional, read from config)
+            min_hedge_delay: Lower bound of the hedge delay in seconds (optional, read from config)
+            min_samples: Completed calls needed before the percentile is trusted (optional, read from config)
+            failure_threshold: Consecutive failures that open a provider's breaker (optional, read from config)
+            reset_timeout: Seconds an open breaker waits before a trial call (optional, read from config)
+        """
+        if not providers:
+            raise ValueError("ProviderRouter needs at least one provider")
+
+        self.providers = providers
+        self.hedge = hedge and len(providers) > 1
+        self.hedge_percentile = hedge_percentile or config.get("routing.hedge_percentile", 95)
+        self.hedge_delay = hedge_delay or config.get("routing.hedge_delay", 10.0)
+        self.min_hedge_delay = min_hedge_delay if min_hedge_delay is not None else config.get("routing.min_hedge_delay", 0.5)
+        self.min_samples = min_samples or config.get("routing.min_samples", 20)
+
+        failure_threshold = failure_threshold or config.get("routing.breaker.failure_threshold", 5)
+        reset_timeout = reset_timeout or config.get("routing.breaker.reset_timeout", 30.0)
+        self.breakers = {p.name: CircuitBreaker(failure_threshold, reset_timeout) for p in providers}
+
+        window = config.get("routing.latency_window", 500)
+        self._latencies = {p.name: deque(maxlen=window) for p in providers}
+        self.stats = {p.name: {"calls": 0, "wins": 0, "failures": 0, "hedges": 0} for p in providers}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=config.get("routing.max_workers", 32))
+
+        # Async requests that lost a hedge; referenced here so they are not collected while running
+        self._abandoned_tasks: Set[asyncio.Task] = set()
+
+    @classmethod
+    def from_config(cls, section: str, primary: Provider) -> "ProviderRouter":
+        """
+        Create a router for a layer from its routing config.
+
+        '<section>.routing.providers' lists the provider names in order of
+        preference; the primary provider (configured by the generator) is
+        always first. Without the setting the router only uses the primary.
+
+        Args:
+            section: Config section of the layer (e.g. "layer3")
+            primary: The generator's own provider
+
+        Returns:
+            ProviderRouter instance
+        """
+        providers = [primary]
+        for name in config.get(f"{section}.routing.providers", []):
+            if name != primary.name and name in PROVIDERS:
+                provider = PROVIDERS[name]()
+                if provider.api_key:
+                    providers.append(provider)
+                else:
+                    logger.warning(f"Skipping {name} as a {section} fallback: no API key configured")
+
+        return cls(providers, hedge=config.get(f"{section}.routing.hedge", True))
+
+    def hedge_after(self, provider: Provider) -> float:
+        """
+        Get how long to wait for a provider before hedging.
+
+        Args:
+            provider: The provider
+
+        Returns:
+            Delay in seconds
+        """
+        latencies = self._latencies[provider.name]
+        if len(latencies) < self.min_samples:
+            return self.hedge_delay
+        percentile = float(np.percentile(np.fromiter(latencies, dtype=float), self.hedge_percentile))
+        return min(max(percentile, self.min_hedge_delay), self.hedge_delay)
+
+    def _record_failure(self, provider: Provider) -> None:
+        """Count a failed call against a provider's breaker."""
+        self.breakers[provider.name].record_failure()
+        with self._lock:
+            self.stats[provider.name]["failures"] += 1
+
+    def _record_success(self, provider: Provider, result: Dict[str, Any], start: float) -> Dict[str, Any]:
+        """Record a provider's latency and tag its result with the provider and model."""
+        latency = time.perf_counter() - start
+        self.breakers[provider.name].record_success()
+        with self._lock:
+            self._latencies[provider.name].append(latency)
+
+        result.update({"provider": provider.name, "model": provider.model, "latency": latency})
+        return result
+
+    def _call(self, provider: Provider, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+        """Call one provider, updating its breaker and latency window."""
+        start = time.perf_counter()
+        try:
+            result = provider.complete(messages, temperature, max_tokens)
+            if not result.get("text"):
+                raise ValueError("empty response")
+        except Exception:
+            self._record_failure(provider)
+            raise
+
+        return self._record_success(provider, result, start)
+
+    async def _call_async(self, provider: Provider, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+        """Call one provider from the event loop, updating its breaker and latency window."""
+        start = time.perf_counter()
+        try:
+            result = await provider.complete_async(messages, temperature, max_tokens)
+            if not result.get("text"):
+                raise ValueError("empty response")
+        except Exception:
+            self._record_failure(provider)
+            raise
+
+        return self._record_success(provider, result, start)
+
+    def _next_provider(self, remaining: List[Provider], errors: List[str]) -> Optional[Provider]:
+        """Take the next provider whose breaker allows a call, counting the call."""
+        while remaining:
+            provider = remaining.pop(0)
+            if not self.breakers[provider.name].allow():
+                errors.append(f"{provider.name}: circuit open")
+                continue
+            with self._lock:
+                self.stats[provider.name]["calls"] += 1
+            return provider
+        return None
+
+    def complete(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        on_abandoned: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Send a chat call through the router and return the first good answer.
+
+        Requests still in flight when an answer wins keep running; their
+        outcome is passed to on_abandoned once they finish, so the tokens
+        they used can still be accounted for.
+
+        Args:
+            messages: Chat messages in OpenAI format (system and user roles)
+            temperature: Sampling temperature
+            max_tokens: Completion token budget
+            on_abandoned: Called with the response of each losing request, or with
+                'provider', 'model', 'usage' and 'error' if it failed (optional)
+
+        Returns:
+            Dictionary with 'text', 'usage', 'provider', 'model', 'latency',
+            'hedged' (whether a duplicate request was sent) and 'retries'
+            (rate-limit retries plus failed provider attempts)
+
+        Raises:
+            RuntimeError: When every provider failed or is unavailable
+        """
+        remaining = list(self.providers)
+        pending: Dict[Future, Provider] = {}
+        errors: List[str] = []
+        hedged = False
+        failures = 0
+        start = time.perf_counter()
+        last_launch = {"provider": None, "at": start}
+
+        def launch() -> Optional[Provider]:
+            provider = self._next_provider(remaining, errors)
+            if provider:
+                pending[self._executor.submit(self._call, provider, messages, temperature, max_tokens)] = provider
+                last_launch.update(provider=provider, at=time.perf_counter())
+            return provider
+
+        launch()
+        while pending:
+            # Hedge once the most recently launched provider is past its latency percentile
+            timeout = None
+            if self.hedge and remaining:
+                deadline = last_launch["at"] + self.hedge_after(last_launch["provider"])
+                timeout = max(deadline - time.perf_counter(), 0.0)
+
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                provider = launch()
+                if provider:
+                    hedged = True
+                    with self._lock:
+                        self.stats[provider.name]["hedges"] += 1
+                continue
+
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failures += 1
+                    errors.append(f"{provider.name}: {str(e)}")
+                    logger.warning(f"Provider {provider.name} failed, failing over: {str(e)}")
+                    continue
+
+                with self._lock:
+                    self.stats[provider.name]["wins"] += 1
+                result["hedged"] = hedged
+                result["latency"] = time.perf_counter() - start
+                result["retries"] = result.get("retries", 0) + failures
+
+                if on_abandoned is not None:
+                    for loser, loser_provider in pending.items():
+                        loser.add_done_callback(
+                            lambda f, p=loser_provider: self._report_abandoned(f, p, on_abandoned)
+                        )
+                return result
+
+            # Fail over immediately when nothing is left in flight
+            if not pending:
+                launch()
+
+        raise RuntimeError(f"All providers failed: {'; '.join(errors) or 'none available'}")
+
+    async def complete_async(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        on_abandoned: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Send a chat call through the router without blocking the event loop.
+
+        Routing is the same as complete: hedged duplicates after the latency
+        percentile, immediate failover and circuit breaking, with requests
+        running as tasks on the caller's event loop. Losing requests keep
+        running and are passed to on_abandoned once they finish (or with
+        'error' if the loop cancels them first).
+
+        Args:
+            messages: Chat messages in OpenAI format (system and user roles)
+            temperature: Sampling temperature
+            max_tokens: Completion token budget
+            on_abandoned: Called with the response of each losing request, or with
+                'provider', 'model', 'usage' and 'error' if it failed (optional)
+
+        Returns:
+            Dictionary with 'text', 'usage', 'provider', 'model', 'latency',
+            'hedged' (whether a duplicate request was sent) and 'retries'
+            (rate-limit retries plus failed provider attempts)
+
+        Raises:
+            RuntimeError: When every provider failed or is unavailable
+        """
+        remaining = list(self.providers)
+        pending: Dict[asyncio.Task, Provider] = {}
+        errors: List[str] = []
+        hedged = False
+        failures = 0
+        start = time.perf_counter()
+        last_launch = {"provider": None, "at": start}
+
+        def launch() -> Optional[Provider]:
+            provider = self._next_provider(remaining, errors)
+            if provider:
+                task = asyncio.ensure_future(self._call_async(provider, messages, temperature, max_tokens))
+                pending[task] = provider
+                last_launch.update(provider=provider, at=time.perf_counter())
+            return provider
+
+        launch()
+        while pending:
+            # Hedge once the most recently launched provider is past its latency percentile
+            timeout = None
+            if self.hedge and remaining:
+                deadline = last_launch["at"] + self.hedge_after(last_launch["provider"])
+                timeout = max(deadline - time.perf_counter(), 0.0)
+
+            done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                provider = launch()
+                if provider:
+                    hedged = True
+                    with self._lock:
+                        self.stats[provider.name]["hedges"] += 1
+                continue
+
+            for task in done:
+                provider = pending.pop(task)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    failures += 1
+                    errors.append(f"{provider.name}: {str(e)}")
+                    logger.warning(f"Provider {provider.name} failed, failing over: {str(e)}")
+                    continue
+
+                with self._lock:
+                    self.stats[provider.name]["wins"] += 1
+                result["hedged"] = hedged
+                result["latency"] = time.perf_counter() - start
+                result["retries"] = result.get("retries", 0) + failures
+
+                for loser, loser_provider in pending.items():
+                    self._abandoned_tasks.add(loser)
+                    loser.add_done_callback(self._abandoned_tasks.discard)
+                    if on_abandoned is not None:
+                        loser.add_done_callback(
+                            lambda t, p=loser_provider: self._report_abandoned(t, p, on_abandoned)
+                        )
+                return result
+
+            # Fail over immediately when nothing is left in flight
+            if not pending:
+                launch()
+
+        raise RuntimeError(f"All providers failed: {'; '.join(errors) or 'none available'}")
+
+    def _report_abandoned(
+        self,
+        future: Union[Future, asyncio.Future],
+        provider: Provider,
+        on_abandoned: Callable[[Dict[str, Any]], None]
+    ) -> None:
+        """Pass the outcome of a request that lost a hedge to the caller's callback."""
+        if not future.cancelled() and future.exception() is None:
+            result = future.result()
+        else:
+            result = {"provider": provider.name, "model": provider.model, "usage": {}, "error": True}
+        result["hedged"] = True
+
+        try:
+            on_abandoned(result)
+        except Exception as e:
+            logger.error(f"Error reporting abandoned {provider.name} request: {str(e)}")
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Get per-provider counters, breaker state and current hedge delay."""
+        with self._lock:
+            return {
+                p.name: {
+                    **self.stats[p.name],
+                    "breaker": self.breakers[p.name].state,
+                    "hedge_after": round(self.hedge_after(p), 3),
+                }
+                for p in self.providers
+            }
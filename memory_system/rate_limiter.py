@@ -0,0 +1,227 @@
+"""
+Rate Limiter
+
+This module provides a token-bucket rate limiter for LLM providers
+(requests per minute and tokens per minute) and a retry helper with
+jittered exponential backoff for rate-limit errors.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+from memory_system.config import config
+
+logger = logging.getLogger("MemorySystem.RateLimiter")
+
+_shared: Dict[str, "RateLimiter"] = {}
+_shared_lock = threading.Lock()
+
+class RateLimiter:
+    """
+    Token-bucket limiter for requests/min and tokens/min.
+
+    Both buckets refill continuously. A caller blocks until both hold enough
+    capacity for its request.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        """
+        Initialize the Rate Limiter.
+
+        Args:
+            requests_per_minute: Request budget per minute (None or 0 for unlimited)
+            tokens_per_minute: Token budget per minute (None or 0 for unlimited)
+        """
+        self.requests_per_minute = requests_per_minute or 0
+        self.tokens_per_minute = tokens_per_minute or 0
+
+        self._requests = float(self.requests_per_minute)
+        self._tokens = float(self.tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, provider: str) -> "RateLimiter":
+        """
+        Create a limiter from the provider's rate_limits config section.
+
+        Args:
+            provider: Config prefix of the provider (e.g. "openai", "anthropic")
+
+        Returns:
+            RateLimiter instance
+        """
+        return cls(
+            requests_per_minute=config.get(f"{provider}.rate_limits.requests_per_minute", 0),
+            tokens_per_minute=config.get(f"{provider}.rate_limits.tokens_per_minute", 0)
+        )
+
+    @classmethod
+    def shared(cls, provider: str) -> "RateLimiter":
+        """
+        Get the process-wide limiter of a provider, created from config on first use.
+
+        Every caller using the same provider draws from one budget, whether
+        it sends requests from threads or from an event loop.
+
+        Args:
+            provider: Config prefix of the provider (e.g. "openai", "anthropic")
+
+        Returns:
+            RateLimiter instance
+        """
+        with _shared_lock:
+            limiter = _shared.get(provider)
+            if limiter is None:
+                limiter = cls.from_config(provider)
+                _shared[provider] = limiter
+            return limiter
+
+    def _refill(self) -> None:
+        """Refill both buckets for the time elapsed. Caller must hold the lock."""
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+
+        if self.requests_per_minute:
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60.0)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60.0)
+
+    def _try_acquire(self, tokens: int) -> float:
+        """
+        Take capacity for one request if available.
+
+        Returns:
+            0 if acquired, otherwise the number of seconds to wait before retrying
+        """
+        with self._lock:
+            self._refill()
+
+            # A single request larger than the whole bucket is let through once the bucket is full
+            tokens = min(tokens, self.tokens_per_minute) if self.tokens_per_minute else 0
+
+            wait = 0.0
+            if self.requests_per_minute and self._requests < 1:
+                wait = max(wait, (1 - self._requests) * 60.0 / self.requests_per_minute)
+            if self.tokens_per_minute and self._tokens < tokens:
+                wait = max(wait, (tokens - self._tokens) * 60.0 / self.tokens_per_minute)
+
+            if wait > 0:
+                return wait
+
+            if self.requests_per_minute:
+                self._requests -= 1
+            if self.tokens_per_minute:
+                self._tokens -= tokens
+            return 0.0
+
+    def acquire(self, tokens: int = 0) -> None:
+        """
+        Block until a request using the given number of tokens may be sent.
+
+        Args:
+            tokens: Estimated tokens used by the request
+        """
+        while True:
+            wait = self._try_acquire(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 0) -> None:
+        """
+        Wait without blocking the event loop until a request may be sent.
+
+        Args:
+            tokens: Estimated tokens used by the request
+        """
+        while True:
+            wait = self._try_acquire(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+def backoff_delay(attempt: int, base_delay: float = 1.0, max_delay: float = 60.0) -> float:
+    """
+    Get a jittered exponential backoff delay.
+
+    Args:
+        attempt: Zero-based retry attempt
+        base_delay: Delay of the first retry in seconds
+        max_delay: Upper bound of the delay in seconds
+
+    Returns:
+        Delay in seconds, drawn uniformly from [0, min(max_delay, base_delay * 2**attempt)]
+    """
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+def call_with_retry(
+    fn: Callable[[], Any],
+    retry_on: Tuple[Type[BaseException], ...],
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0
+) -> Any:
+    """
+    Call a function, retrying with jittered backoff on the given errors.
+
+    Args:
+        fn: Function to call
+        retry_on: Exception types that trigger a retry
+        max_retries: Maximum number of retries
+        base_delay: Delay of the first retry in seconds
+        max_delay: Upper bound of a single delay in seconds
+
+    Returns:
+        The function's return value
+
+    Raises:
+        Exception: The last error once retries are exhausted
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except retry_on as e:
+            if attempt >= max_retries:
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            logger.warning(f"Rate limited ({type(e).__name__}), retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})")
+            time.sleep(delay)
+
+async def async_call_with_retry(
+    fn: Callable[[], Awaitable[Any]],
+    retry_on: Tuple[Type[BaseException], ...],
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0
+) -> Any:
+    """
+    Await a coroutine function, retrying with jittered backoff on the given errors.
+
+    Args:
+        fn: Coroutine function to call
+        retry_on: Exception types that trigger a retry
+        max_retries: Maximum number of retries
+        base_delay: Delay of the first retry in seconds
+        max_delay: Upper bound of a single delay in seconds
+
+    Returns:
+        The coroutine's return value
+
+    Raises:
+        Exception: The last error once retries are exhausted
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return await fn()
+        except retry_on as e:
+            if attempt >= max_retries:
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            logger.warning(f"Rate limited ({type(e).__name__}), retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})")
+            await asyncio.sleep(delay)
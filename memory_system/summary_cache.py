@@ -0,0 +1,277 @@
+"""
+Summary Cache
+
+This module implements a persistent SQLite cache for AI-generated results,
+keyed by (content_hash, summary_type, model, prompt_version). Identical content
+summarized with the same prompt and model is served locally instead of
+calling the API again.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from memory_system.config import config
+
+logger = logging.getLogger("MemorySystem.SummaryCache")
+
+def content_hash(content: str) -> str:
+    """
+    Hash content the same way Layer 1 does for deduplication.
+
+    Args:
+        content: The content to hash
+
+    Returns:
+        Hex MD5 digest of the content
+    """
+    return hashlib.md5(content.encode()).hexdigest()
+
+class SummaryCache:
+    """
+    Persistent cache of AI-generated results.
+
+    Entries are evicted least-recently-used first once the cache grows past
+    max_entries, and optionally once they are older than max_age_days.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        max_age_days: Optional[float] = None
+    ):
+        """
+        Initialize the Summary Cache.
+
+        Args:
+            path: Path of the SQLite database (optional, read from config)
+            max_entries: Maximum number of cached entries (optional, read from config)
+            max_age_days: Maximum age of an entry in days (optional, read from config)
+        """
+        self.path = path or config.get("layer3.cache.path", "memory_data/layer3_cache.sqlite")
+        self.max_entries = max_entries or config.get("layer3.cache.max_entries", 100000)
+        self.max_age_days = max_age_days if max_age_days is not None else config.get("layer3.cache.max_age_days")
+
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                content_hash TEXT NOT NULL,
+                summary_type TEXT NOT NULL,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (content_hash, summary_type, model, prompt_version)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache (last_access)")
+        self._conn.commit()
+
+    def get(
+        self,
+        content_hash: str,
+        summary_type: str,
+        model: str,
+        prompt_version: str
+    ) -> Optional[Any]:
+        """
+        Look up a cached result.
+
+        Args:
+            content_hash: Hash of the content the result was generated from
+            summary_type: Kind of result (general, technical, analysis, tags, ...)
+            model: Model that generated the result
+            prompt_version: Version of the prompt that generated the result
+
+        Returns:
+            The cached value or None on a miss
+        """
+        key = (content_hash, summary_type, model, prompt_version)
+
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM cache "
+                    "WHERE content_hash = ? AND summary_type = ? AND model = ? AND prompt_version = ?",
+                    key
+                ).fetchone()
+
+                if row and self._expired(row[1]):
+                    row = None
+
+                if row is None:
+                    self.misses += 1
+                    return None
+
+                self.hits += 1
+                self._conn.execute(
+                    "UPDATE cache SET last_access = ?, hits = hits + 1 "
+                    "WHERE content_hash = ? AND summary_type = ? AND model = ? AND prompt_version = ?",
+                    (time.time(),) + key
+                )
+                self._conn.commit()
+
+            return json.loads(row[0])
+        except Exception as e:
+            logger.error(f"Error reading summary cache: {str(e)}")
+            return None
+
+    def put(
+        self,
+        content_hash: str,
+        summary_type: str,
+        model: str,
+        prompt_version: str,
+        value: Any
+    ) -> None:
+        """
+        Store a result in the cache.
+
+        Args:
+            content_hash: Hash of the content the result was generated from
+            summary_type: Kind of result (general, technical, analysis, tags, ...)
+            model: Model that generated the result
+            prompt_version: Version of the prompt that generated the result
+            value: JSON-serializable result
+        """
+        now = time.time()
+
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache "
+                    "(content_hash, summary_type, model, prompt_version, value, created_at, last_access, hits) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                    (content_hash, summary_type, model, prompt_version, json.dumps(value), now, now)
+                )
+                self._conn.commit()
+                self._puts += 1
+                evict_due = self._puts % 1000 == 0
+
+            if evict_due:
+                self.evict()
+        except Exception as e:
+            logger.error(f"Error writing summary cache: {str(e)}")
+
+    def _expired(self, created_at: float) -> bool:
+        """Check whether an entry created at the given time is past max_age_days."""
+        return bool(self.max_age_days) and time.time() - created_at > self.max_age_days * 86400
+
+    def evict(self) -> int:
+        """
+        Evict expired entries and least-recently-used entries beyond max_entries.
+
+        Returns:
+            Number of entries evicted
+        """
+        evicted = 0
+
+        try:
+            with self._lock:
+                if self.max_age_days:
+                    cursor = self._conn.execute(
+                        "DELETE FROM cache WHERE created_at < ?",
+                        (time.time() - self.max_age_days * 86400,)
+                    )
+                    evicted += cursor.rowcount
+
+                count = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+                if count > self.max_entries:
+                    cursor = self._conn.execute(
+                        "DELETE FROM cache WHERE rowid IN "
+                        "(SELECT rowid FROM cache ORDER BY last_access ASC LIMIT ?)",
+                        (count - self.max_entries,)
+                    )
+                    evicted += cursor.rowcount
+
+                self._conn.commit()
+
+            if evicted:
+                logger.info(f"Evicted {evicted} summary cache entries")
+            return evicted
+        except Exception as e:
+            logger.error(f"Error evicting summary cache entries: {str(e)}")
+            return evicted
+
+    def warm(
+        self,
+        summaries: Iterable[Dict[str, Any]],
+        prompt_version: str,
+        content_hashes: Optional[Dict[str, str]] = None
+    ) -> int:
+        """
+        Load previously stored summaries into the cache.
+
+        Each summary needs a content hash, either in its own 'content_hash'
+        field or through content_hashes keyed by memory ID. Summaries served
+        by a fallback model are keyed under their 'primary_model', the model
+        lookups use. Mock summaries are skipped.
+
+        Args:
+            summaries: Summary dictionaries as returned by SummaryGenerator
+            prompt_version: Prompt version the summaries were generated with
+            content_hashes: Mapping of memory ID to content hash (optional)
+
+        Returns:
+            Number of summaries loaded
+        """
+        content_hashes = content_hashes or {}
+        loaded = 0
+
+        for summary in summaries:
+            model = summary.get("model")
+            summary_type = summary.get("summary_type")
+            hash_value = summary.get("content_hash") or content_hashes.get(summary.get("memory_id"))
+
+            # Local summaries are cheap to recompute and must not shadow a later LLM summary
+            if not model or model in ("mock", "extractive") or not summary_type or not hash_value:
+                continue
+
+            self.put(hash_value, summary_type, summary.get("primary_model") or model, prompt_version, summary)
+            loaded += 1
+
+        logger.info(f"Warmed summary cache with {loaded} summaries")
+        return loaded
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with entries, hits, misses and hit_rate for this process
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
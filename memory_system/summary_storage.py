@@ -0,0 +1,408 @@
+"""
+Summary Storage
+
+This module stores Layer 3 summaries in their own vector collection, next to
+Layer 1 (exact storage) and Layer 2 (tags), so that search and agents can
+retrieve compact summaries instead of full content.
+"""
+
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+try:
+    from qdrant_client import QdrantClient
+    from qdrant_client.http import models
+except ImportError:
+    raise ImportError(
+        "Qdrant client not installed. Please install it with: pip install qdrant-client"
+    )
+
+from memory_system.config import config
+from memory_system.embeddings import Embedder
+
+logger = logging.getLogger("MemorySystem.SummaryStorage")
+
+class SummaryStorage:
+    """
+    Layer 3 summary storage.
+
+    Stores one point per (memory_id, summary_type), embedded from the summary
+    text. Point IDs are derived from that pair, so storing a summary again
+    replaces the previous version.
+    """
+
+    def __init__(
+        self,
+        client: Optional[QdrantClient] = None,
+        embedder: Optional[Embedder] = None
+    ):
+        """
+        Initialize the Summary Storage.
+
+        Args:
+            client: QdrantClient instance (optional)
+            embedder: Embedder used for summaries stored without a vector (optional)
+        """
+        self.collection_name = config.get("vector_db.collections.summaries.name", "memory_summaries")
+        self.vector_size = config.get("vector_db.collections.summaries.vector_size", 384)
+        self.distance = config.get("vector_db.collections.summaries.distance", "cosine")
+        self.batch_size = config.get("vector_db.collections.summaries.upsert_batch_size", 256)
+
+        # Connect to Qdrant
+        if client:
+            self.client = client
+        else:
+            host = config.get("vector_db.host", "localhost")
+            port = config.get("vector_db.port", 6333)
+            self.client = QdrantClient(host=host, port=port)
+
+        self.embedder = embedder or Embedder()
+
+        # Ensure the collection exists
+        self._ensure_collection_exists()
+
+    def _ensure_collection_exists(self) -> None:
+        """Ensure the collection exists in Qdrant."""
+        try:
+            collections = self.client.get_collections().collections
+            collection_names = [c.name for c in collections]
+
+            if self.collection_name not in collection_names:
+                logger.info(f"Creating collection '{self.collection_name}'")
+
+                # Convert string distance to enum
+                distance_map = {
+                    "cosine": models.Distance.COSINE,
+                    "euclid": models.Distance.EUCLID,
+                    "dot": models.Distance.DOT
+                }
+                distance = distance_map.get(self.distance.lower(), models.Distance.COSINE)
+
+                # Create the collection
+                self.client.create_collection(
+                    collection_name=self.collection_name,
+                    vectors_config=models.VectorParams(
+                        size=self.vector_size,
+                        distance=distance
+                    )
+                )
+
+                # Create payload indexes for efficient filtering
+                self._create_payload_indexes()
+
+                logger.info(f"Collection '{self.collection_name}' created successfully")
+            else:
+                logger.info(f"Collection '{self.collection_name}' already exists")
+        except Exception as e:
+            logger.error(f"Error ensuring collection exists: {str(e)}")
+            raise
+
+    def _create_payload_indexes(self) -> None:
+        """Create payload indexes for efficient filtering."""
+        try:
+            for field_name in ("memory_id", "summary_type", "content_hash"):
+                self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=models.PayloadSchemaType.KEYWORD
+                )
+
+            logger.info(f"Created payload indexes for collection '{self.collection_name}'")
+        except Exception as e:
+            logger.error(f"Error creating payload indexes: {str(e)}")
+
+    def _point_id(self, memory_id: str, summary_type: str) -> int:
+        """Get the stable integer point ID of a (memory_id, summary_type) pair."""
+        digest = hashlib.md5(f"{memory_id}/{summary_type}".encode()).hexdigest()
+        return int(digest[:15], 16)
+
+    def _summary_filter(
+        self,
+        memory_ids: Optional[List[str]] = None,
+        summary_type: Optional[str] = None
+    ) -> Optional[models.Filter]:
+        """Build a filter on memory IDs and/or summary type."""
+        conditions = []
+
+        if memory_ids is not None:
+            conditions.append(
+                models.FieldCondition(
+                    key="memory_id",
+                    match=models.MatchAny(any=memory_ids)
+                )
+            )
+
+        if summary_type:
+            conditions.append(
+                models.FieldCondition(
+                    key="summary_type",
+                    match=models.MatchValue(value=summary_type)
+                )
+            )
+
+        return models.Filter(must=conditions) if conditions else None
+
+    def store_summaries_bulk(
+        self,
+        summaries: List[Dict[str, Any]],
+        embeddings: Optional[List[List[float]]] = None,
+        batch_size: Optional[int] = None,
+        max_workers: int = 1
+    ) -> int:
+        """
+        Store many summaries at once.
+
+        Summaries without a precomputed embedding are embedded in one batch.
+        Points are upserted in chunks of batch_size, optionally by several
+        workers in parallel.
+
+        Args:
+            summaries: Summary dictionaries as returned by SummaryGenerator
+            embeddings: Vector embeddings of the summary texts, in the same order (optional)
+            batch_size: Number of points per upsert (optional, read from config)
+            max_workers: Number of parallel upsert workers
+
+        Returns:
+            Number of summaries stored
+        """
+        batch_size = batch_size or self.batch_size
+        summaries = [s for s in summaries if s and s.get("memory_id") and s.get("summary_text")]
+
+        if not summaries:
+            logger.warning("No summaries to store")
+            return 0
+
+        if embeddings is None:
+            embeddings = self.embedder.embed([s["summary_text"] for s in summaries]).tolist()
+
+        timestamp = datetime.now().isoformat()
+        points = []
+        for summary, embedding in zip(summaries, embeddings):
+            summary_type = summary.get("summary_type", "general")
+            payload = {
+                "memory_id": summary["memory_id"],
+                "summary_type": summary_type,
+                "summary_text": summary["summary_text"],
+                "model": summary.get("model"),
+                "content_hash": summary.get("content_hash"),
+                "timestamp": summary.get("timestamp", timestamp),
+            }
+
+            points.append(models.PointStruct(
+                id=self._point_id(summary["memory_id"], summary_type),
+                vector=list(map(float, embedding)),
+                payload=payload
+            ))
+
+        chunks = [points[i:i + batch_size] for i in range(0, len(points), batch_size)]
+
+        def upsert_chunk(chunk: List[models.PointStruct]) -> int:
+            self.client.upsert(
+                collection_name=self.collection_name,
+                points=chunk,
+                wait=True
+            )
+            return len(chunk)
+
+        stored = 0
+        try:
+            if max_workers > 1 and len(chunks) > 1:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    futures = [executor.submit(upsert_chunk, chunk) for chunk in chunks]
+                    for future in as_completed(futures):
+                        stored += future.result()
+            else:
+                for chunk in chunks:
+                    stored += upsert_chunk(chunk)
+        except Exception as e:
+            logger.error(f"Error storing summaries in bulk: {str(e)}")
+            raise
+
+        logger.info(f"Stored {stored} summaries in {len(chunks)} batches")
+        return stored
+
+    def store_summary(
+        self,
+        summary: Dict[str, Any],
+        embedding: Optional[List[float]] = None
+    ) -> bool:
+        """
+        Store a single summary.
+
+        Args:
+            summary: Summary dictionary as returned by SummaryGenerator
+            embedding: Vector embedding of the summary text (optional)
+
+        Returns:
+            True if the summary was stored, False otherwise
+        """
+        try:
+            embeddings = [embedding] if embedding is not None else None
+            return self.store_summaries_bulk([summary], embeddings) > 0
+        except Exception as e:
+            logger.error(f"Error storing summary: {str(e)}")
+            return False
+
+    def get_summaries(self, memory_id: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Get all stored summaries of a memory.
+
+        Args:
+            memory_id: The unique identifier of the memory
+
+        Returns:
+            Mapping of summary type to summary data
+        """
+        return self.get_summaries_bulk([memory_id]).get(memory_id, {})
+
+    def get_summaries_bulk(
+        self,
+        memory_ids: List[str],
+        summary_type: Optional[str] = None
+    ) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Get the stored summaries of many memories with filtered scrolls.
+
+        Args:
+            memory_ids: The unique identifiers of the memories
+            summary_type: Only return this summary type (optional)
+
+        Returns:
+            Mapping of memory ID to a mapping of summary type to summary data
+        """
+        results: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        if not memory_ids:
+            return results
+
+        try:
+            unique_ids = list(dict.fromkeys(memory_ids))
+            for start in range(0, len(unique_ids), self.batch_size):
+                scroll_filter = self._summary_filter(unique_ids[start:start + self.batch_size], summary_type)
+                offset = None
+
+                while True:
+                    points, offset = self.client.scroll(
+                        collection_name=self.collection_name,
+                        scroll_filter=scroll_filter,
+                        limit=1000,
+                        offset=offset
+                    )
+
+                    for point in points:
+                        payload = point.payload
+                        results.setdefault(payload["memory_id"], {})[payload["summary_type"]] = payload
+
+                    if not points or offset is None:
+                        break
+
+            logger.info(f"Retrieved summaries for {len(results)} of {len(unique_ids)} memories")
+            return results
+        except Exception as e:
+            logger.error(f"Error retrieving summaries: {str(e)}")
+            return results
+
+    def get_summary_texts(
+        self,
+        memory_ids: List[str],
+        summary_type: str = "general"
+    ) -> Dict[str, str]:
+        """
+        Get the compact summary text of many memories, for use in place of full content.
+
+        Args:
+            memory_ids: The unique identifiers of the memories
+            summary_type: Summary type to return
+
+        Returns:
+            Mapping of memory ID to summary text, for memories that have one
+        """
+        summaries = self.get_summaries_bulk(memory_ids, summary_type)
+        return {
+            memory_id: by_type[summary_type]["summary_text"]
+            for memory_id, by_type in summaries.items()
+            if summary_type in by_type
+        }
+
+    def search_summaries(
+        self,
+        embedding: List[float],
+        limit: int = 10,
+        summary_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search for summaries similar to a query vector.
+
+        Args:
+            embedding: Vector embedding to search for
+            limit: Maximum number of results
+            summary_type: Filter by summary type (optional)
+
+        Returns:
+            List of summary data with a similarity 'score'
+        """
+        try:
+            search_result = self.client.search(
+                collection_name=self.collection_name,
+                query_vector=list(map(float, embedding)),
+                query_filter=self._summary_filter(summary_type=summary_type),
+                limit=limit
+            )
+
+            results = []
+            for point in search_result:
+                summary = point.payload
+                summary["score"] = point.score
+                results.append(summary)
+
+            logger.info(f"Found {len(results)} similar summaries")
+            return results
+        except Exception as e:
+            logger.error(f"Error searching summaries: {str(e)}")
+            raise
+
+    def search_summaries_by_text(
+        self,
+        query: str,
+        limit: int = 10,
+        summary_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search for summaries similar to a text query.
+
+        Args:
+            query: The query text
+            limit: Maximum number of results
+            summary_type: Filter by summary type (optional)
+
+        Returns:
+            List of summary data with a similarity 'score'
+        """
+        return self.search_summaries(self.embedder.embed_one(query).tolist(), limit, summary_type)
+
+    def delete_summaries(self, memory_ids: List[str]) -> bool:
+        """
+        Delete all stored summaries of the given memories.
+
+        Args:
+            memory_ids: The unique identifiers of the memories
+
+        Returns:
+            True if the summaries were deleted, False otherwise
+        """
+        try:
+            for start in range(0, len(memory_ids), self.batch_size):
+                self.client.delete(
+                    collection_name=self.collection_name,
+                    points_selector=models.FilterSelector(
+                        filter=self._summary_filter(memory_ids[start:start + self.batch_size])
+                    )
+                )
+
+            logger.info(f"Deleted summaries for {len(memory_ids)} memories")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting summaries: {str(e)}")
+            return False
@@ -0,0 +1,342 @@
+"""
+Tag Co-occurrence
+
+This module maintains a sparse tag x tag co-occurrence matrix over interned
+tag IDs. It is updated incrementally on tag writes and answers "related tags"
+and facet questions without querying storage.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from memory_system.config import config
+from memory_system.tag_dictionary import MIN_TAG_KEY, TagDictionary, tag_dictionary as default_tag_dictionary
+
+logger = logging.getLogger("MemorySystem.TagCooccurrence")
+
+class TagCooccurrence:
+    """
+    Sparse co-occurrence counts between tags.
+
+    Keeps the set of tag IDs of every memory so that added and removed tags
+    update exactly the affected pairs. The memory -> tag ID rows are
+    persisted to SQLite as they change, and committed every autosave_every
+    updates and on save().
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        tag_dictionary: Optional[TagDictionary] = None,
+        autosave_every: Optional[int] = None
+    ):
+        """
+        Initialize the Tag Co-occurrence matrix.
+
+        Args:
+            path: Path of the SQLite database the matrix is persisted to (optional, read from config)
+            tag_dictionary: TagDictionary used to intern tags (optional)
+            autosave_every: Commit after this many memory updates, 0 to commit only on save() (optional, read from config)
+        """
+        self.path = path or config.get("tag_cooccurrence.path", "memory_data/tag_cooccurrence.sqlite")
+        self.tag_dictionary = tag_dictionary if tag_dictionary is not None else default_tag_dictionary
+        self.autosave_every = autosave_every if autosave_every is not None else config.get("tag_cooccurrence.autosave_every", 100)
+
+        self._memory_tags: Dict[str, Set[int]] = {}
+        self._tag_counts: Counter = Counter()
+        self._pairs: Dict[int, Counter] = {}
+        self._updates = 0
+        self._loaded = False
+        self._conn = None
+        self._lock = threading.RLock()
+
+    def _ensure_loaded(self) -> None:
+        """Load the matrix from disk on first use."""
+        if self._loaded:
+            return
+
+        with self._lock:
+            if self._loaded:
+                return
+
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS memory_tags (
+                        memory_id TEXT NOT NULL,
+                        tag_id INTEGER NOT NULL,
+                        PRIMARY KEY (memory_id, tag_id)
+                    )
+                    """
+                )
+                self._conn.commit()
+
+                memory_tags: Dict[str, Set[int]] = {}
+                for memory_id, tag_id in self._conn.execute("SELECT memory_id, tag_id FROM memory_tags"):
+                    memory_tags.setdefault(memory_id, set()).add(tag_id)
+                for memory_id, tag_ids in memory_tags.items():
+                    self._add_pairs(memory_id, tag_ids)
+                if memory_tags:
+                    logger.info(f"Loaded tag co-occurrence for {len(self._memory_tags)} memories")
+            except Exception as e:
+                logger.error(f"Error loading tag co-occurrence: {str(e)}")
+                raise
+
+            self._loaded = True
+
+    def _add_pairs(self, memory_id: str, tag_ids: Set[int]) -> Set[int]:
+        """Add new tag IDs to a memory and count the new pairs. Caller must hold the lock."""
+        existing = self._memory_tags.setdefault(memory_id, set())
+        new_ids = tag_ids - existing
+
+        for tag_id in new_ids:
+            self._tag_counts[tag_id] += 1
+            row = self._pairs.setdefault(tag_id, Counter())
+            for other_id in existing:
+                row[other_id] += 1
+                self._pairs.setdefault(other_id, Counter())[tag_id] += 1
+            existing.add(tag_id)
+
+        return new_ids
+
+    def _remove_pairs(self, memory_id: str) -> None:
+        """Remove a memory and uncount all of its pairs. Caller must hold the lock."""
+        tag_ids = self._memory_tags.pop(memory_id, set())
+
+        for tag_id in tag_ids:
+            self._tag_counts[tag_id] -= 1
+            if self._tag_counts[tag_id] <= 0:
+                del self._tag_counts[tag_id]
+
+            row = self._pairs.get(tag_id)
+            if row is None:
+                continue
+            for other_id in tag_ids:
+                if other_id == tag_id:
+                    continue
+                row[other_id] -= 1
+                if row[other_id] <= 0:
+                    del row[other_id]
+            if not row:
+                del self._pairs[tag_id]
+
+    def _after_update(self) -> None:
+        """Count an update and commit if the autosave interval is reached. Caller must hold the lock."""
+        self._updates += 1
+        if self.autosave_every and self._updates % self.autosave_every == 0:
+            self.save()
+
+    def add_memory_tags(self, memory_id: str, tags: List[Dict[str, Any]]) -> None:
+        """
+        Record tags written for a memory.
+
+        Args:
+            memory_id: The unique identifier of the memory
+            tags: List of tag dictionaries with 'type' and 'value'
+        """
+        self._ensure_loaded()
+        tag_ids = set(self.tag_dictionary.encode(tags))
+
+        with self._lock:
+            new_ids = self._add_pairs(memory_id, tag_ids)
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO memory_tags (memory_id, tag_id) VALUES (?, ?)",
+                [(memory_id, tag_id) for tag_id in new_ids]
+            )
+            self._after_update()
+
+    def remove_memory(self, memory_id: str) -> None:
+        """
+        Forget all tags of a memory.
+
+        Args:
+            memory_id: The unique identifier of the memory
+        """
+        self._ensure_loaded()
+
+        with self._lock:
+            if memory_id in self._memory_tags:
+                self._remove_pairs(memory_id)
+                self._conn.execute("DELETE FROM memory_tags WHERE memory_id = ?", (memory_id,))
+                self._after_update()
+
+    def rebuild(self, tag_storage: Any, batch_size: int = 1000) -> int:
+        """
+        Rebuild the matrix from scratch by scanning Layer 2 once.
+
+        Args:
+            tag_storage: TagStorage instance to scan
+            batch_size: Number of tag points scrolled per request
+
+        Returns:
+            Number of memories indexed
+        """
+        memory_tags: Dict[str, Set[int]] = {}
+        offset = None
+
+        while True:
+            points, offset = tag_storage.client.scroll(
+                collection_name=tag_storage.collection_name,
+                limit=batch_size,
+                offset=offset
+            )
+
+            for point in points:
+                memory_id = point.payload.get("memory_id")
+                if not memory_id:
+                    continue
+                tag_id = point.payload.get("tag_key")
+                if tag_id is None or tag_id < MIN_TAG_KEY:
+                    tag_type, tag_value = tag_storage._payload_tag(point.payload)
+                    tag_id = self.tag_dictionary.intern(tag_type, tag_value)
+                memory_tags.setdefault(memory_id, set()).add(tag_id)
+
+            if not offset:
+                break
+
+        self._ensure_loaded()
+
+        with self._lock:
+            self._memory_tags = {}
+            self._tag_counts = Counter()
+            self._pairs = {}
+            for memory_id, tag_ids in memory_tags.items():
+                self._add_pairs(memory_id, tag_ids)
+
+            self._conn.execute("DELETE FROM memory_tags")
+            self._conn.executemany(
+                "INSERT INTO memory_tags (memory_id, tag_id) VALUES (?, ?)",
+                [(memory_id, tag_id) for memory_id, tag_ids in memory_tags.items() for tag_id in tag_ids]
+            )
+            self.save()
+
+        logger.info(f"Rebuilt tag co-occurrence for {len(memory_tags)} memories")
+        return len(memory_tags)
+
+    def count(self, tag_type: str, tag_value: str) -> int:
+        """
+        Get the number of memories with a tag.
+
+        Args:
+            tag_type: The type of tag
+            tag_value: The value of tag
+
+        Returns:
+            Number of memories
+        """
+        self._ensure_loaded()
+        tag_id = self.tag_dictionary.lookup(tag_type, tag_value)
+        if tag_id is None:
+            return 0
+        return self._tag_counts.get(tag_id, 0)
+
+    def related(
+        self,
+        tags: List[Dict[str, Any]],
+        k: int = 10,
+        tag_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the tags that most often co-occur with a set of tags.
+
+        Args:
+            tags: List of tag dictionaries with 'type' and 'value'
+            k: Maximum number of related tags to return
+            tag_type: Only return related tags of this type (optional)
+
+        Returns:
+            List of tag dictionaries with 'type', 'value', 'count' and 'score'
+            (share of the query tags' memories that also have the tag)
+        """
+        self._ensure_loaded()
+
+        query_ids = set()
+        for tag in tags:
+            tag_id = self.tag_dictionary.lookup(tag.get("type", "general"), tag.get("value", ""))
+            if tag_id is not None:
+                query_ids.add(tag_id)
+
+        if not query_ids:
+            return []
+
+        with self._lock:
+            totals: Counter = Counter()
+            for tag_id in query_ids:
+                totals.update(self._pairs.get(tag_id, {}))
+            base = sum(self._tag_counts.get(tag_id, 0) for tag_id in query_ids)
+
+        related = []
+        for tag_id, count in totals.most_common():
+            if tag_id in query_ids:
+                continue
+            tag = self.tag_dictionary.resolve(tag_id)
+            if tag_type and tag["type"] != tag_type:
+                continue
+            tag["count"] = count
+            tag["score"] = count / base if base else 0.0
+            related.append(tag)
+            if len(related) >= k:
+                break
+
+        return related
+
+    def facet_counts(self, results: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+        """
+        Count tag values across a set of search results.
+
+        Uses the tags already present on the results and, for results that
+        carry no tags, the tags recorded for their memory ID. Tags are only
+        looked up, never interned, so reading does not grow the dictionary.
+
+        Args:
+            results: Search results with 'memory_id' and optional 'tags'
+
+        Returns:
+            Dictionary of tag type to {tag value: number of results}
+        """
+        self._ensure_loaded()
+        counts: Counter = Counter()
+
+        for result in results:
+            tags = result.get("tags")
+            if tags:
+                pairs = {(tag.get("type", "general"), tag.get("value", "")) for tag in tags}
+            else:
+                with self._lock:
+                    tag_ids = set(self._memory_tags.get(result.get("memory_id"), ()))
+                pairs = set()
+                for tag_id in tag_ids:
+                    tag = self.tag_dictionary.resolve(tag_id)
+                    pairs.add((tag["type"], tag["value"]))
+            counts.update(pairs)
+
+        facets: Dict[str, Dict[str, int]] = {}
+        for (tag_type, tag_value), count in counts.most_common():
+            facets.setdefault(tag_type, {})[tag_value] = count
+
+        return facets
+
+    def save(self) -> None:
+        """Commit pending changes to disk."""
+        with self._lock:
+            try:
+                if self._conn is not None:
+                    self._conn.commit()
+                logger.debug(f"Saved tag co-occurrence for {len(self._memory_tags)} memories")
+            except Exception as e:
+                logger.error(f"Error saving tag co-occurrence: {str(e)}")
+
+        self.tag_dictionary.save()
+
+# Create a singleton instance
+tag_cooccurrence = TagCooccurrence()
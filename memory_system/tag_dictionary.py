@@ -0,0 +1,290 @@
+"""
+Tag Dictionary
+
+This module interns (type, value) tag pairs to integer IDs so that payload
+filters, set operations and caches can work on integers. Strings are
+resolved back only at the API boundary.
+
+IDs are derived from a hash of the pair, so every process assigns the same
+ID to the same tag without coordinating; the dictionary file only serves
+reverse lookups and can be rebuilt from stored tag payloads.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from memory_system.config import config
+
+logger = logging.getLogger("MemorySystem.TagDictionary")
+
+# Hashed IDs start here; smaller IDs were assigned densely by earlier versions
+MIN_TAG_KEY = 2 ** 32
+
+def tag_key(tag_type: str, tag_value: str) -> int:
+    """
+    Get the integer ID of a tag pair.
+
+    Args:
+        tag_type: The type of tag
+        tag_value: The value of tag
+
+    Returns:
+        Integer tag ID in [MIN_TAG_KEY, 2**63), fitting a signed 64-bit payload
+    """
+    digest = hashlib.blake2b(f"{tag_type}\0{tag_value}".encode(), digest_size=8).digest()
+    return MIN_TAG_KEY + int.from_bytes(digest, "big") % (2 ** 63 - MIN_TAG_KEY)
+
+class TagDictionary:
+    """
+    Bidirectional mapping between (type, value) tag pairs and integer tag IDs.
+
+    IDs come from tag_key, so they are the same in every process and stay
+    valid even if the dictionary file is lost; the dictionary records which
+    pairs have been seen so IDs can be resolved back to strings.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize the Tag Dictionary.
+
+        Args:
+            path: Path of the JSON file the dictionary is persisted to (optional, read from config)
+        """
+        self.path = path or config.get("tag_dictionary.path", "memory_data/tag_dictionary.json")
+
+        self._pairs: Dict[int, Tuple[str, str]] = {}
+        self._order: List[Tuple[str, str]] = []
+        self._positions: Dict[Tuple[str, str], int] = {}
+        self._ids: Dict[Tuple[str, str], int] = {}
+        self._ids_by_type: Dict[str, List[int]] = {}
+        self._ids_by_value: Dict[str, List[int]] = {}
+        self._loaded = False
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    def _ensure_loaded(self) -> None:
+        """Load the dictionary from disk on first use."""
+        if self._loaded:
+            return
+
+        with self._lock:
+            if self._loaded:
+                return
+
+            try:
+                for tag_type, tag_value in self._read_file():
+                    self._add(tag_type, tag_value)
+                if self._pairs:
+                    logger.info(f"Loaded {len(self._pairs)} tags from {self.path}")
+            except Exception as e:
+                logger.error(f"Error loading tag dictionary: {str(e)}")
+                raise
+
+            self._loaded = True
+
+    def _read_file(self) -> List[Tuple[str, str]]:
+        """Read the pairs stored in the dictionary file."""
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return [(tag_type, tag_value) for tag_type, tag_value in data.get("tags", [])]
+
+    def _add(self, tag_type: str, tag_value: str) -> int:
+        """Record a new pair and index it. Caller must hold the lock."""
+        tag_id = tag_key(tag_type, tag_value)
+        self._pairs[tag_id] = (tag_type, tag_value)
+        self._positions[(tag_type, tag_value)] = len(self._order)
+        self._order.append((tag_type, tag_value))
+        self._ids[(tag_type, tag_value)] = tag_id
+        self._ids_by_type.setdefault(tag_type, []).append(tag_id)
+        self._ids_by_value.setdefault(tag_value, []).append(tag_id)
+        return tag_id
+
+    def intern(self, tag_type: str, tag_value: str) -> int:
+        """
+        Get the ID of a tag pair, assigning a new one if needed.
+
+        Args:
+            tag_type: The type of tag
+            tag_value: The value of tag
+
+        Returns:
+            Integer tag ID
+        """
+        self._ensure_loaded()
+        key = (tag_type, tag_value)
+
+        tag_id = self._ids.get(key)
+        if tag_id is not None:
+            return tag_id
+
+        with self._lock:
+            tag_id = self._ids.get(key)
+            if tag_id is None:
+                tag_id = self._add(tag_type, tag_value)
+                self._dirty = True
+            return tag_id
+
+    def lookup(self, tag_type: str, tag_value: str) -> Optional[int]:
+        """
+        Get the ID of a tag pair without recording it.
+
+        Args:
+            tag_type: The type of tag
+            tag_value: The value of tag
+
+        Returns:
+            Integer tag ID or None if the pair has never been interned
+        """
+        self._ensure_loaded()
+        return self._ids.get((tag_type, tag_value))
+
+    def legacy_id(self, tag_type: str, tag_value: str) -> Optional[int]:
+        """
+        Get the dense ID earlier versions assigned to a tag pair.
+
+        Args:
+            tag_type: The type of tag
+            tag_value: The value of tag
+
+        Returns:
+            The pair's position in the dictionary file, or None if it is not in it
+        """
+        self._ensure_loaded()
+        position = self._positions.get((tag_type, tag_value))
+        return position if position is not None and position < MIN_TAG_KEY else None
+
+    def keys(self, tags: Iterable[Dict[str, Any]]) -> List[int]:
+        """
+        Get the IDs of a list of tag dictionaries without recording them.
+
+        For read paths: the IDs match those interned by writers, but the
+        dictionary is left unchanged.
+
+        Args:
+            tags: Tag dictionaries with 'type' and 'value'
+
+        Returns:
+            List of integer tag IDs, in the same order
+        """
+        return [tag_key(tag.get("type", "general"), tag.get("value", "")) for tag in tags]
+
+    def ids_for_type(self, tag_type: str) -> List[int]:
+        """
+        Get the IDs of all interned pairs with a given tag type.
+
+        Args:
+            tag_type: The type of tag
+
+        Returns:
+            List of integer tag IDs
+        """
+        self._ensure_loaded()
+        return list(self._ids_by_type.get(tag_type, []))
+
+    def ids_for_value(self, tag_value: str) -> List[int]:
+        """
+        Get the IDs of all interned pairs with a given tag value.
+
+        Args:
+            tag_value: The value of tag
+
+        Returns:
+            List of integer tag IDs
+        """
+        self._ensure_loaded()
+        return list(self._ids_by_value.get(tag_value, []))
+
+    def resolve(self, tag_id: int) -> Dict[str, str]:
+        """
+        Resolve a tag ID back to its tag dictionary.
+
+        IDs below MIN_TAG_KEY were assigned densely, in file order, by
+        earlier versions; they are resolved by position so points that have
+        not been backfilled yet still resolve.
+
+        Args:
+            tag_id: Integer tag ID
+
+        Returns:
+            Tag dictionary with 'type' and 'value'
+
+        Raises:
+            KeyError: If the ID is unknown
+        """
+        self._ensure_loaded()
+        if 0 <= tag_id < min(MIN_TAG_KEY, len(self._order)):
+            tag_type, tag_value = self._order[tag_id]
+        elif tag_id in self._pairs:
+            tag_type, tag_value = self._pairs[tag_id]
+        else:
+            raise KeyError(f"Unknown tag ID: {tag_id}")
+
+        return {"type": tag_type, "value": tag_value}
+
+    def encode(self, tags: Iterable[Dict[str, Any]]) -> List[int]:
+        """
+        Intern a list of tag dictionaries.
+
+        Args:
+            tags: Tag dictionaries with 'type' and 'value'
+
+        Returns:
+            List of integer tag IDs, in the same order
+        """
+        return [self.intern(tag.get("type", "general"), tag.get("value", "")) for tag in tags]
+
+    def decode(self, tag_ids: Iterable[int]) -> List[Dict[str, str]]:
+        """
+        Resolve a list of tag IDs.
+
+        Args:
+            tag_ids: Integer tag IDs
+
+        Returns:
+            List of tag dictionaries with 'type' and 'value'
+        """
+        return [self.resolve(tag_id) for tag_id in tag_ids]
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._pairs)
+
+    def save(self) -> None:
+        """
+        Persist the dictionary to disk if it has changed.
+
+        Pairs written by other processes since the file was loaded are
+        merged in first, so concurrent writers add to the file rather than
+        overwrite each other.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+
+                for tag_type, tag_value in self._read_file():
+                    if (tag_type, tag_value) not in self._ids:
+                        self._add(tag_type, tag_value)
+
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"tags": self._order}, f)
+                os.replace(tmp_path, self.path)
+
+                self._dirty = False
+                logger.info(f"Saved {len(self._pairs)} tags to {self.path}")
+            except Exception as e:
+                logger.error(f"Error saving tag dictionary: {str(e)}")
+
+# Create a singleton instance
+tag_dictionary = TagDictionary()
@@ -0,0 +1,258 @@
+"""
+Tag Embedding Index
+
+This module implements a small in-memory embedding index over the distinct
+tag values stored in Layer 2. It lets tag queries expand to semantically
+close values (e.g. "medical" -> "healthcare", "clinic") before hitting storage.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from memory_system.config import config
+from memory_system.embeddings import Embedder
+
+logger = logging.getLogger("MemorySystem.TagIndex")
+
+class TagEmbeddingIndex:
+    """
+    Embedding index over distinct tag values.
+
+    Each distinct tag value is embedded once. New values registered after the
+    initial build are embedded lazily, in a single batch, on the next query.
+    """
+
+    def __init__(
+        self,
+        tag_storage: Any,
+        embedder: Optional[Embedder] = None,
+        threshold: Optional[float] = None,
+        max_expansions: Optional[int] = None
+    ):
+        """
+        Initialize the Tag Embedding Index.
+
+        Args:
+            tag_storage: TagStorage instance used to read the distinct tag values
+            embedder: Embedder instance (optional)
+            threshold: Minimum cosine similarity for an expansion (optional, read from config)
+            max_expansions: Maximum number of values a query expands to (optional, read from config)
+        """
+        self.tag_storage = tag_storage
+        self.embedder = embedder or Embedder()
+        self.threshold = threshold if threshold is not None else config.get("tag_index.threshold", 0.6)
+        self.max_expansions = max_expansions or config.get("tag_index.max_expansions", 10)
+
+        self._values: List[str] = []
+        self._value_rows: Dict[str, int] = {}
+        self._value_types: Dict[str, set] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._pending: Dict[str, set] = {}
+        self._cache: Dict[Tuple[Optional[str], str, float], List[str]] = {}
+        self._lock = threading.RLock()
+
+    def build(self) -> int:
+        """
+        (Re)build the index from the distinct tag values in Layer 2.
+
+        Returns:
+            Number of distinct tag values indexed
+        """
+        tags = self.tag_storage.get_all_tags()
+
+        with self._lock:
+            self._values = []
+            self._value_rows = {}
+            self._value_types = {}
+            self._matrix = None
+            self._pending = {}
+            self._cache.clear()
+
+        self.register(tags)
+        self._flush_pending()
+
+        logger.info(f"Built tag embedding index with {len(self._values)} distinct values")
+        return len(self._values)
+
+    def register(self, tags: List[Dict[str, Any]]) -> None:
+        """
+        Register tag values written after the index was built.
+
+        The values are embedded on the next query, together with any other
+        pending values.
+
+        Args:
+            tags: List of tag dictionaries with 'type' and 'value'
+        """
+        with self._lock:
+            for tag in tags:
+                value = tag.get("value")
+                if not value:
+                    continue
+                tag_type = tag.get("type", "general")
+
+                if value in self._value_rows:
+                    if tag_type not in self._value_types[value]:
+                        self._value_types[value].add(tag_type)
+                        self._cache.clear()
+                else:
+                    self._pending.setdefault(value, set()).add(tag_type)
+
+    def _flush_pending(self) -> None:
+        """Embed all pending tag values in one batch and append them to the index."""
+        with self._lock:
+            if not self._pending:
+                return
+
+            new_values = list(self._pending.keys())
+            vectors = self.embedder.embed(new_values)
+
+            start = len(self._values)
+            for i, value in enumerate(new_values):
+                self._value_rows[value] = start + i
+                self._value_types[value] = self._pending[value]
+            self._values.extend(new_values)
+
+            if self._matrix is None:
+                self._matrix = vectors
+            else:
+                self._matrix = np.vstack([self._matrix, vectors])
+
+            self._pending = {}
+            self._cache.clear()
+
+    def similar_values(
+        self,
+        tag_value: str,
+        tag_type: Optional[str] = None,
+        threshold: Optional[float] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Find indexed tag values semantically close to a query value.
+
+        Args:
+            tag_value: The tag value to look up
+            tag_type: Restrict matches to values used with this tag type (optional)
+            threshold: Minimum cosine similarity (optional, defaults to the index threshold)
+
+        Returns:
+            List of (value, similarity) tuples, most similar first
+        """
+        threshold = self.threshold if threshold is None else threshold
+        self._flush_pending()
+
+        with self._lock:
+            if self._matrix is None or not self._values:
+                return []
+
+            row = self._value_rows.get(tag_value)
+            query = self._matrix[row] if row is not None else self.embedder.embed_one(tag_value)
+
+            scores = self._matrix @ query
+            order = np.argsort(-scores)
+
+            matches = []
+            for idx in order:
+                score = float(scores[idx])
+                if score < threshold:
+                    break
+                value = self._values[idx]
+                if tag_type and tag_type not in self._value_types.get(value, ()):
+                    continue
+                matches.append((value, score))
+                if len(matches) >= self.max_expansions:
+                    break
+
+        return matches
+
+    def similar_to_vectors(
+        self,
+        vectors: np.ndarray,
+        threshold: Optional[float] = None,
+        limit: Optional[int] = None
+    ) -> List[List[Tuple[str, List[str], float]]]:
+        """
+        Find the indexed tag values closest to each of many query vectors.
+
+        One matrix product scores every query against every value, so this is
+        the batched counterpart of similar_values for arbitrary embeddings
+        (e.g. whole documents).
+
+        Args:
+            vectors: L2-normalized query vectors, one per row
+            threshold: Minimum cosine similarity (optional, defaults to the index threshold)
+            limit: Maximum number of values per query (optional, defaults to max_expansions)
+
+        Returns:
+            For each query, a list of (value, tag types, similarity), most similar first
+        """
+        threshold = self.threshold if threshold is None else threshold
+        limit = limit or self.max_expansions
+        self._flush_pending()
+
+        with self._lock:
+            if self._matrix is None or not self._values or len(vectors) == 0:
+                return [[] for _ in range(len(vectors))]
+
+            scores = np.asarray(vectors, dtype=np.float32) @ self._matrix.T
+            top = np.argsort(-scores, axis=1)[:, :limit]
+
+            results = []
+            for row, indices in enumerate(top):
+                matches = []
+                for idx in indices:
+                    score = float(scores[row, idx])
+                    if score < threshold:
+                        break
+                    value = self._values[idx]
+                    matches.append((value, sorted(self._value_types.get(value, ())), score))
+                results.append(matches)
+
+        return results
+
+    def expand(
+        self,
+        tag_value: str,
+        tag_type: Optional[str] = None,
+        threshold: Optional[float] = None
+    ) -> List[str]:
+        """
+        Expand a tag value to the set of semantically close stored values.
+
+        The original value is always included. Expansions are cached until
+        the index changes.
+
+        Args:
+            tag_value: The tag value to expand
+            tag_type: Restrict expansions to values used with this tag type (optional)
+            threshold: Minimum cosine similarity (optional, defaults to the index threshold)
+
+        Returns:
+            List of tag values to query for, starting with the original value
+        """
+        threshold = self.threshold if threshold is None else threshold
+        self._flush_pending()
+
+        key = (tag_type, tag_value, threshold)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None:
+            return list(cached)
+
+        try:
+            values = [tag_value]
+            for value, _ in self.similar_values(tag_value, tag_type, threshold):
+                if value != tag_value:
+                    values.append(value)
+        except Exception as e:
+            logger.error(f"Error expanding tag value '{tag_value}': {str(e)}")
+            return [tag_value]
+
+        with self._lock:
+            self._cache[key] = values
+
+        logger.info(f"Expanded tag value '{tag_value}' to {len(values)} values")
+        return list(values)
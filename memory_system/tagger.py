@@ -0,0 +1,197 @@
+"""
+Local Tagger
+
+This module suggests tags for documents without an LLM call. Most tagging
+is classification against the existing tag vocabulary, so suggestions come
+from two local signals:
+
+- nearest-neighbor voting over already tagged memories in Layer 1, and
+- embedding similarity between the document and the distinct tag values
+  in Layer 2.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from memory_system.config import config
+from memory_system.embeddings import Embedder
+from memory_system.summary_cache import content_hash
+
+logger = logging.getLogger("MemorySystem.Tagger")
+
+class LocalTagger:
+    """
+    Batched tag suggester over the existing tag vocabulary.
+
+    Each candidate (type, value) gets a neighbor vote (similarity-weighted
+    share of the k nearest tagged memories carrying it) and a value
+    similarity (cosine between the document and the tag value). The score
+    is a weighted blend of the two; the top score is the confidence used to
+    decide whether an LLM call is still needed.
+    """
+
+    def __init__(
+        self,
+        exact_storage: Any,
+        tag_storage: Any,
+        tag_index: Optional[Any] = None,
+        embedder: Optional[Embedder] = None,
+        neighbors: Optional[int] = None,
+        max_tags: Optional[int] = None,
+        min_score: Optional[float] = None,
+        min_confidence: Optional[float] = None,
+        neighbor_weight: Optional[float] = None
+    ):
+        """
+        Initialize the Local Tagger.
+
+        Args:
+            exact_storage: ExactStorage instance holding the memory vectors
+            tag_storage: TagStorage instance holding the memory tags
+            tag_index: TagEmbeddingIndex over distinct tag values (optional, defaults to tag_storage.tag_index)
+            embedder: Embedder instance (optional, defaults to the tag index embedder)
+            neighbors: Number of nearest memories that vote (optional, read from config)
+            max_tags: Maximum number of suggested tags (optional, read from config)
+            min_score: Minimum score of a suggested tag (optional, read from config)
+            min_confidence: Top score below which suggestions are low confidence (optional, read from config)
+            neighbor_weight: Weight of the neighbor vote against value similarity (optional, read from config)
+        """
+        self.exact_storage = exact_storage
+        self.tag_storage = tag_storage
+        self.tag_index = tag_index if tag_index is not None else getattr(tag_storage, "tag_index", None)
+        self.embedder = embedder or (self.tag_index.embedder if self.tag_index is not None else Embedder())
+
+        self.neighbors = neighbors or config.get("tagger.neighbors", 10)
+        self.max_tags = max_tags or config.get("tagger.max_tags", 8)
+        self.min_score = min_score if min_score is not None else config.get("tagger.min_score", 0.2)
+        self.min_confidence = min_confidence if min_confidence is not None else config.get("tagger.min_confidence", 0.5)
+        self.neighbor_weight = neighbor_weight if neighbor_weight is not None else config.get("tagger.neighbor_weight", 0.7)
+        self.value_threshold = config.get("tagger.value_threshold", 0.4)
+
+    def is_confident(self, tags: List[Dict[str, Any]]) -> bool:
+        """
+        Check whether suggested tags are confident enough to skip the LLM.
+
+        Args:
+            tags: Suggested tags, highest score first
+
+        Returns:
+            True if the top score reaches min_confidence
+        """
+        return bool(tags) and tags[0]["score"] >= self.min_confidence
+
+    def _neighbor_votes(
+        self,
+        vectors: np.ndarray,
+        contents: List[str]
+    ) -> List[Dict[Tuple[str, str], float]]:
+        """
+        Vote tags from the nearest tagged memories of each document.
+
+        Args:
+            vectors: Document embeddings, one per row
+            contents: The documents, used to skip exact copies already stored
+
+        Returns:
+            For each document, a mapping of (type, value) to its vote in [0, 1]
+        """
+        neighbor_lists = self.exact_storage.search_similar_batch(
+            vectors.tolist(),
+            limit=self.neighbors + 1,
+            with_payload=["memory_id", "content_hash"]
+        )
+
+        memory_ids = {memory["memory_id"] for neighbors in neighbor_lists for memory in neighbors}
+        tags_by_memory = self.tag_storage.get_tags_bulk(list(memory_ids)) if memory_ids else {}
+
+        votes = []
+        for content, neighbors in zip(contents, neighbor_lists):
+            # A stored copy of the document itself would just echo its own tags
+            own_hash = content_hash(content)
+            neighbors = [m for m in neighbors if m.get("content_hash") != own_hash][:self.neighbors]
+
+            tally: Dict[Tuple[str, str], float] = {}
+            total = 0.0
+            for memory in neighbors:
+                tags = tags_by_memory.get(memory["memory_id"])
+                if not tags:
+                    continue
+                weight = max(memory["score"], 0.0)
+                total += weight
+                for tag in {(tag["type"], tag["value"]) for tag in tags}:
+                    tally[tag] = tally.get(tag, 0.0) + weight
+
+            votes.append({tag: vote / total for tag, vote in tally.items()} if total else {})
+
+        return votes
+
+    def suggest_tags_batch(
+        self,
+        contents: List[str],
+        embeddings: Optional[List[List[float]]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Suggest tags for many documents.
+
+        Args:
+            contents: The documents to tag
+            embeddings: Precomputed document embeddings (optional, embedded in one batch otherwise)
+
+        Returns:
+            For each document, a list of {type, value, score} tags, highest score first
+        """
+        if not contents:
+            return []
+
+        if embeddings is not None:
+            vectors = np.asarray(embeddings, dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            vectors = vectors / norms
+        else:
+            vectors = self.embedder.embed(contents)
+
+        try:
+            votes = self._neighbor_votes(vectors, contents)
+        except Exception as e:
+            logger.error(f"Error voting tags from neighbors: {str(e)}")
+            votes = [{} for _ in contents]
+
+        value_matches = [[] for _ in contents]
+        if self.tag_index is not None:
+            value_matches = self.tag_index.similar_to_vectors(vectors, self.value_threshold)
+
+        results = []
+        for doc_votes, matches in zip(votes, value_matches):
+            similarity: Dict[Tuple[str, str], float] = {}
+            for value, tag_types, score in matches:
+                for tag_type in tag_types:
+                    similarity[(tag_type, value)] = score
+
+            scored = []
+            for tag in set(doc_votes) | set(similarity):
+                score = self.neighbor_weight * doc_votes.get(tag, 0.0) + (1 - self.neighbor_weight) * similarity.get(tag, 0.0)
+                if score >= self.min_score:
+                    scored.append({"type": tag[0], "value": tag[1], "score": round(score, 4)})
+
+            scored.sort(key=lambda tag: (-tag["score"], tag["type"], tag["value"]))
+            results.append(scored[:self.max_tags])
+
+        logger.info(f"Suggested tags locally for {len(contents)} documents")
+        return results
+
+    def suggest_tags(self, content: str, embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """
+        Suggest tags for a document.
+
+        Args:
+            content: The document to tag
+            embedding: Precomputed document embedding (optional)
+
+        Returns:
+            List of {type, value, score} tags, highest score first
+        """
+        embeddings = [embedding] if embedding is not None else None
+        return self.suggest_tags_batch([content], embeddings)[0]
@@ -0,0 +1,139 @@
+"""
+Tokens
+
+This module counts tokens locally and splits long text into token-bounded
+chunks. It uses tiktoken when it is installed and falls back to a
+characters-per-token estimate otherwise.
+"""
+
+import logging
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger("MemorySystem.Tokens")
+
+# Average characters per token used when tiktoken is not installed
+CHARS_PER_TOKEN = 4
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    tiktoken = None
+    TIKTOKEN_AVAILABLE = False
+    logger.info("tiktoken not installed, token counts will be estimated")
+
+@lru_cache(maxsize=16)
+def _get_encoding(model: Optional[str]) -> Any:
+    """Get the tiktoken encoding for a model, defaulting to cl100k_base."""
+    if model:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            pass
+    return tiktoken.get_encoding("cl100k_base")
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Count the tokens in a text.
+
+    Args:
+        text: The text to count
+        model: Model whose tokenizer to use (optional)
+
+    Returns:
+        Number of tokens (estimated when tiktoken is not installed)
+    """
+    if not text:
+        return 0
+    if TIKTOKEN_AVAILABLE:
+        return len(_get_encoding(model).encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def truncate_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """
+    Truncate a text to at most max_tokens tokens.
+
+    Args:
+        text: The text to truncate
+        max_tokens: Maximum number of tokens to keep
+        model: Model whose tokenizer to use (optional)
+
+    Returns:
+        The leading part of the text that fits in max_tokens
+    """
+    if max_tokens <= 0:
+        return ""
+    if TIKTOKEN_AVAILABLE:
+        encoding = _get_encoding(model)
+        tokens = encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+    return text[:max_tokens * CHARS_PER_TOKEN]
+
+def _hard_split(line: str, max_tokens: int, model: Optional[str]) -> List[str]:
+    """Cut a line into consecutive pieces of at most max_tokens tokens."""
+    if TIKTOKEN_AVAILABLE:
+        encoding = _get_encoding(model)
+        tokens = encoding.encode(line, disallowed_special=())
+        return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+    size = max_tokens * CHARS_PER_TOKEN
+    return [line[i:i + size] for i in range(0, len(line), size)]
+
+def _split_units(text: str, max_tokens: int, model: Optional[str]) -> List[Tuple[str, str]]:
+    """
+    Split text into paragraphs, then lines, then hard cuts, each within max_tokens.
+
+    Each unit is paired with the separator that joins it to the unit before
+    it, so packing the units back together keeps the original line breaks.
+    """
+    units = []
+    for paragraph in text.split("\n\n"):
+        if count_tokens(paragraph, model) <= max_tokens:
+            units.append((paragraph, "\n\n"))
+            continue
+
+        separator = "\n\n"
+        for line in paragraph.split("\n"):
+            pieces = _hard_split(line, max_tokens, model) if count_tokens(line, model) > max_tokens else [line]
+            for piece in pieces:
+                units.append((piece, separator))
+                separator = ""
+            separator = "\n"
+
+    return units
+
+def split_into_chunks(text: str, max_tokens: int, model: Optional[str] = None) -> List[str]:
+    """
+    Split text into consecutive chunks of at most max_tokens tokens.
+
+    Paragraphs are packed greedily from the start of the text and only split
+    when a single paragraph is too long. Appending text to a document
+    therefore leaves its earlier chunks unchanged.
+
+    Args:
+        text: The text to split
+        max_tokens: Maximum tokens per chunk
+        model: Model whose tokenizer to use (optional)
+
+    Returns:
+        List of chunks
+    """
+    chunks = []
+    current = ""
+    current_tokens = 0
+
+    for unit, separator in _split_units(text, max_tokens, model):
+        # Separator tokens are small; count them so chunks stay within budget
+        unit_tokens = count_tokens(unit, model) + 1
+
+        if current_tokens and current_tokens + unit_tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = "", 0
+
+        current = current + separator + unit if current_tokens else unit
+        current_tokens += unit_tokens
+
+    if current_tokens:
+        chunks.append(current)
+
+    return chunks
@@ -0,0 +1,11 @@
+"""
+Test configuration shared by the memory system tests.
+"""
+
+import sys
+from pathlib import Path
+
+# Make the memory_system package importable when pytest runs from any directory
+project_root = Path(__file__).resolve().parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
@@ -0,0 +1,146 @@
+"""
+Tests for memory clustering: when clusters are emitted to Layer 4.
+"""
+
+import numpy as np
+import pytest
+
+from memory_system.clustering import MemoryClusterer
+
+class FakeExactStorage:
+    """Layer 1 stand-in that streams stored vectors in batches."""
+
+    def __init__(self):
+        self.vectors = {}
+
+    def iter_vectors(self, batch_size, memory_ids=None):
+        ids = [memory_id for memory_id in (memory_ids or list(self.vectors)) if memory_id in self.vectors]
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            yield chunk, np.array([self.vectors[memory_id] for memory_id in chunk], dtype=np.float32)
+
+class FakeQueue:
+    """Enrichment queue stand-in that records jobs, or rejects them when full."""
+
+    def __init__(self, accept=True):
+        self.accept = accept
+        self.jobs = []
+
+    def enqueue_meta_commentary(self, group_id, memory_ids, commentary_type="connections", priority=0.0):
+        if self.accept:
+            self.jobs.append((group_id, list(memory_ids), commentary_type))
+        return self.accept
+
+def near(axis, jitter):
+    vector = np.zeros(4, dtype=np.float32)
+    vector[axis] = 1.0
+    vector[(axis + 1) % 4] = jitter
+    return vector
+
+@pytest.fixture
+def storage():
+    store = FakeExactStorage()
+    for i in range(4):
+        store.vectors[f"a{i}"] = near(0, 0.01 * i)
+        store.vectors[f"b{i}"] = near(2, 0.01 * i)
+    return store
+
+@pytest.fixture
+def clusterer(storage, tmp_path):
+    c = MemoryClusterer(
+        storage,
+        n_clusters=2,
+        batch_size=16,
+        path=str(tmp_path / "clusters"),
+        min_cluster_size=3,
+        change_threshold=0.25,
+        max_group_size=10,
+    )
+    c.fit()
+    return c
+
+def emitted_members(groups):
+    return sorted(sorted(group["memory_ids"]) for group in groups)
+
+def test_new_clusters_are_emitted_once(clusterer):
+    groups = clusterer.emit_changed()
+    assert emitted_members(groups) == [["a0", "a1", "a2", "a3"], ["b0", "b1", "b2", "b3"]]
+    assert clusterer.emit_changed() == []
+
+def test_clusters_below_min_size_are_not_emitted(storage, tmp_path):
+    del storage.vectors["b2"], storage.vectors["b3"]
+    c = MemoryClusterer(storage, n_clusters=2, batch_size=16, path=str(tmp_path / "clusters"), min_cluster_size=3)
+    c.fit()
+
+    assert emitted_members(c.emit_changed()) == [["a0", "a1", "a2", "a3"]]
+
+def test_small_changes_stay_below_the_threshold(clusterer, storage):
+    clusterer.emit_changed()
+
+    # One new member out of five is a 20% change, under the 25% threshold
+    storage.vectors["a4"] = near(0, 0.05)
+    clusterer.update(["a4"])
+    assert clusterer.emit_changed() == []
+
+    # A second one makes it 2 of 6, which is re-emitted
+    storage.vectors["a5"] = near(0, 0.06)
+    clusterer.update(["a5"])
+    groups = clusterer.emit_changed()
+    assert emitted_members(groups) == [["a0", "a1", "a2", "a3", "a4", "a5"]]
+
+def test_removed_members_count_as_changes(clusterer):
+    clusterer.emit_changed()
+
+    # One of four members gone is a 25% change
+    clusterer.remove("b0")
+    assert emitted_members(clusterer.emit_changed()) == [["b1", "b2", "b3"]]
+
+    # Below min_cluster_size the cluster is no longer emitted
+    clusterer.remove("b1")
+    assert clusterer.emit_changed() == []
+
+def test_groups_are_capped_closest_to_the_centroid_first(clusterer):
+    clusterer.max_group_size = 2
+    groups = {group["cluster_id"]: group for group in clusterer.emit_changed()}
+
+    for cluster_id, group in groups.items():
+        assert group["size"] == 4
+        assert group["memory_ids"] == clusterer.members(cluster_id)[:2]
+
+def test_queued_groups_are_marked_emitted(clusterer):
+    queue = FakeQueue()
+    clusterer.emit_changed(enrichment_queue=queue, commentary_type="patterns")
+
+    assert sorted(job[0] for job in queue.jobs) == ["cluster_0", "cluster_1"]
+    assert all(job[2] == "patterns" for job in queue.jobs)
+    assert clusterer.emit_changed(enrichment_queue=queue) == []
+
+def test_rejected_groups_are_retried(clusterer):
+    assert clusterer.emit_changed(enrichment_queue=FakeQueue(accept=False)) == []
+    assert clusterer.emitted == {}
+
+    queue = FakeQueue()
+    assert len(clusterer.emit_changed(enrichment_queue=queue)) == 2
+    assert len(queue.jobs) == 2
+
+def test_failing_handler_leaves_cluster_pending(clusterer):
+    def handler(group_id, memory_ids):
+        raise RuntimeError("layer 4 unavailable")
+
+    assert clusterer.emit_changed(handler=handler) == []
+    assert len(clusterer.emit_changed()) == 2
+
+def test_refit_emits_every_cluster_again(clusterer):
+    clusterer.emit_changed()
+    clusterer.fit()
+
+    assert clusterer.emitted == {}
+    assert len(clusterer.emit_changed()) == 2
+
+def test_emitted_state_survives_a_restart(clusterer, storage, tmp_path):
+    clusterer.emit_changed()
+
+    restarted = MemoryClusterer(
+        storage, n_clusters=2, batch_size=16, path=str(tmp_path / "clusters"), min_cluster_size=3
+    )
+    assert restarted.emit_changed() == []
@@ -0,0 +1,140 @@
+"""
+Tests for versioned meta commentaries: the store itself, and how Layer 4
+decides between incremental revisions and full regeneration as a group
+drifts.
+"""
+
+import pytest
+
+from memory_system.commentary_store import CommentaryStore
+from memory_system.layer4 import MetaCommentaryGenerator
+from memory_system.metering import Meter
+from memory_system.provider_router import Provider, ProviderRouter
+from memory_system.summary_cache import SummaryCache
+
+class FakeAnthropic(Provider):
+    """Provider stand-in that answers revisions and full commentaries differently."""
+
+    name = "anthropic"
+    default_model = "claude-3-haiku-20240307"
+
+    def __init__(self):
+        super().__init__(api_key="test-key", max_retries=0)
+        self.prompts = []
+
+    def _send(self, messages, temperature, max_tokens):
+        prompt = messages[-1]["content"]
+        self.prompts.append(prompt)
+        text = "revised analysis" if prompt.startswith("Below is an existing analysis") else "full analysis"
+        return {"text": text, "usage": {"input_tokens": 10, "output_tokens": 5}}
+
+@pytest.fixture
+def store(tmp_path):
+    s = CommentaryStore(path=str(tmp_path / "commentaries.sqlite"), max_versions=3)
+    yield s
+    s.close()
+
+@pytest.fixture
+def provider():
+    return FakeAnthropic()
+
+@pytest.fixture
+def generator(tmp_path, store, provider):
+    g = MetaCommentaryGenerator(
+        api_key="test-key",
+        cache=SummaryCache(str(tmp_path / "cache.sqlite")),
+        store=store,
+        router=ProviderRouter([provider], hedge=False),
+        meter=Meter(str(tmp_path / "metering.sqlite")),
+    )
+    g.drift_threshold = 0.3
+    g.hierarchical = False
+    return g
+
+def memories(*ids, changed=()):
+    return [
+        {"memory_id": memory_id, "content": f"Memory {memory_id} {'updated' if memory_id in changed else 'original'} content."}
+        for memory_id in ids
+    ]
+
+def commentary(text, commentary_type="connections"):
+    return {"commentary_type": commentary_type, "commentary_text": text}
+
+def test_versions_are_numbered_per_group_and_type(store):
+    members = {"m1": {"hash": "h1", "excerpt": "one"}}
+    assert store.save("g1", commentary("a"), members, "full", 0.0) == 1
+    assert store.save("g1", commentary("b"), members, "incremental", 0.1) == 2
+    assert store.save("g1", commentary("c", "patterns"), members, "full", 0.0) == 1
+    assert store.save("g2", commentary("d"), members, "full", 0.0) == 1
+
+    latest = store.latest("g1", "connections")
+    assert latest["version"] == 2
+    assert latest["commentary"]["commentary_text"] == "b"
+    assert latest["members"] == members
+    assert (latest["update_mode"], latest["drift"]) == ("incremental", 0.1)
+
+def test_history_keeps_only_max_versions(store):
+    for i in range(5):
+        store.save("g1", commentary(f"v{i + 1}"), {}, "full", 0.0)
+
+    assert [entry["version"] for entry in store.history("g1", "connections")] == [3, 4, 5]
+
+def test_delete_removes_every_type(store):
+    store.save("g1", commentary("a"), {}, "full", 0.0)
+    store.save("g1", commentary("b", "patterns"), {}, "full", 0.0)
+
+    assert store.delete("g1")
+    assert store.latest("g1", "connections") is None
+    assert store.history("g1", "patterns") == []
+
+def test_missing_group_has_no_latest(store):
+    assert store.latest("nope", "connections") is None
+
+def test_first_update_is_a_full_generation(generator, provider):
+    result = generator.update_meta_commentary("g1", memories("a", "b", "c", "d", "e"))
+
+    assert result["update_mode"] == "full"
+    assert result["version"] == 1
+    assert result["drift"] == 0.0
+    assert len(provider.prompts) == 1
+
+def test_unchanged_group_reuses_the_stored_version(generator, provider):
+    generator.update_meta_commentary("g1", memories("a", "b", "c", "d", "e"))
+    result = generator.update_meta_commentary("g1", memories("e", "d", "c", "b", "a"))
+
+    assert result["version"] == 1
+    assert result["commentary_text"] == "full analysis"
+    assert len(provider.prompts) == 1
+
+def test_small_changes_are_revised_incrementally(generator, provider):
+    generator.update_meta_commentary("g1", memories("a", "b", "c", "d", "e"))
+    result = generator.update_meta_commentary("g1", memories("a", "b", "c", "d", "e", "f"))
+
+    assert result["update_mode"] == "incremental"
+    assert result["drift"] == pytest.approx(0.2)
+    assert result["version"] == 2
+    assert result["base_version"] == 1
+    assert result["commentary_text"] == "revised analysis"
+    # Only the delta is sent
+    assert "Memory f" in provider.prompts[-1]
+    assert "Memory a:" not in provider.prompts[-1]
+
+def test_changed_content_counts_as_drift(generator):
+    generator.update_meta_commentary("g1", memories("a", "b", "c", "d", "e"))
+    result = generator.update_meta_commentary("g1", memories("a", "b", "c", "d", "e", changed=("a",)))
+
+    assert result["update_mode"] == "incremental"
+    assert result["drift"] == pytest.approx(0.2)
+
+def test_drift_accumulates_until_a_full_regeneration(generator, store):
+    generator.update_meta_commentary("g1", memories("a", "b", "c", "d", "e"))
+    generator.update_meta_commentary("g1", memories("a", "b", "c", "d", "e", "f"))
+
+    # 0.2 so far, plus one change in six members goes past 0.3
+    result = generator.update_meta_commentary("g1", memories("a", "b", "c", "d", "e", "f", "g"))
+    assert result["update_mode"] == "full"
+    assert result["drift"] == 0.0
+    assert result["version"] == 3
+
+    modes = [(entry["update_mode"], round(entry["drift"], 4)) for entry in store.history("g1", "connections")]
+    assert modes == [("full", 0.0), ("incremental", 0.2), ("full", 0.0)]
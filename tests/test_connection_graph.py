@@ -0,0 +1,108 @@
+"""
+Tests for the connection graph: the in-memory overlay over the CSR arrays,
+compaction to a new version, and reloading from disk.
+"""
+
+import json
+import os
+
+import pytest
+
+from memory_system.connection_graph import COMMENTARY, CONNECTION, MANIFEST, ConnectionGraph
+
+@pytest.fixture
+def graph(tmp_path):
+    # A high threshold keeps every edge in the overlay until compact() is called
+    return ConnectionGraph(path=str(tmp_path / "graph"), compact_threshold=10**6, commentary_weight=0.5)
+
+def neighbor_scores(graph, node_id, edge_types=None):
+    return {neighbor: round(score, 4) for neighbor, _, score in graph.neighbors(node_id, edge_types)}
+
+def test_overlay_edges_are_undirected_and_replace_scores(graph):
+    graph.add_edges([("a", "b", CONNECTION, 0.4), ("a", "c", CONNECTION, 0.9)])
+    graph.add_edges([("b", "a", CONNECTION, 0.6)])
+
+    assert neighbor_scores(graph, "a") == {"b": 0.6, "c": 0.9}
+    assert neighbor_scores(graph, "b") == {"a": 0.6}
+    assert [neighbor for neighbor, _, _ in graph.neighbors("a")] == ["c", "b"]
+    assert graph.stats()["stored_edges"] == 0
+
+def test_self_loops_and_empty_ids_are_ignored(graph):
+    assert graph.add_edges([("a", "a", CONNECTION, 1.0), ("a", "", CONNECTION, 1.0)]) == 0
+    assert graph.neighbors("a") == []
+
+def test_overlay_changes_apply_on_top_of_compacted_arrays(graph):
+    graph.add_edges([("a", "b", CONNECTION, 0.4), ("a", "c", CONNECTION, 0.9)])
+    graph.compact()
+
+    graph.add_edges([("a", "b", CONNECTION, 0.7), ("a", "d", CONNECTION, 0.2)])
+    graph.remove_node("c")
+
+    assert neighbor_scores(graph, "a") == {"b": 0.7, "d": 0.2}
+    assert graph.neighbors("c") == []
+    assert graph.stats()["stored_edges"] == 4
+
+def test_compact_round_trip(graph, tmp_path):
+    graph.add_edges([("a", "b", CONNECTION, 0.4), ("b", "c", CONNECTION, 0.8)])
+    graph.add_commentary("group_connections", ["a", "c"])
+    graph.compact()
+    graph.remove_node("b")
+    graph.compact()
+
+    reloaded = ConnectionGraph(path=str(tmp_path / "graph"))
+    assert reloaded.stats()["pending_edges"] == 0
+    assert neighbor_scores(reloaded, "a") == neighbor_scores(graph, "a") == {"commentary:group_connections": 0.5}
+    assert reloaded.commentaries_for("c") == ["group_connections"]
+    assert reloaded.neighbors("b") == []
+
+def test_uncompacted_edges_are_replayed_from_the_log(graph, tmp_path):
+    graph.add_edges([("a", "b", CONNECTION, 0.4)])
+    graph.compact()
+    graph.add_edges([("a", "c", CONNECTION, 0.3)])
+    graph.remove_node("b")
+
+    reloaded = ConnectionGraph(path=str(tmp_path / "graph"))
+    assert neighbor_scores(reloaded, "a") == {"c": 0.3}
+
+def test_compact_swaps_versions_through_the_manifest(graph, tmp_path):
+    path = tmp_path / "graph"
+    graph.add_edges([("a", "b", CONNECTION, 0.4)])
+    graph.compact()
+    graph.add_edges([("a", "c", CONNECTION, 0.3)])
+    graph.compact()
+
+    with open(path / MANIFEST, "r", encoding="utf-8") as f:
+        assert json.load(f) == {"version": 2}
+    # Only the current version is kept
+    assert sorted(name for name in os.listdir(path) if name.startswith("v")) == ["v000002"]
+
+def test_commentary_membership_is_replaced(graph):
+    graph.add_commentary("g_connections", ["a", "b", "c"])
+    graph.add_commentary("g_connections", ["a", "d"])
+
+    assert graph.commentaries_for("b") == []
+    assert graph.commentaries_for("d") == ["g_connections"]
+    assert neighbor_scores(graph, "a", [COMMENTARY]) == {"commentary:g_connections": 0.5}
+
+def test_k_hop_keeps_the_hops_of_the_best_path(graph):
+    # A weak direct edge and a stronger two-hop path to the same node
+    graph.add_edges([
+        ("a", "b", CONNECTION, 0.1),
+        ("a", "c", CONNECTION, 0.9),
+        ("c", "b", CONNECTION, 0.9),
+    ])
+
+    reachable = graph.k_hop("a", k=2)
+    assert reachable["c"] == (1, pytest.approx(0.9))
+    assert reachable["b"] == (2, pytest.approx(0.81))
+
+    # With one hop only the direct edge is reachable
+    assert graph.k_hop("a", k=1)["b"] == (1, pytest.approx(0.1))
+
+def test_related_memories_skip_commentary_nodes(graph):
+    graph.add_commentary("g_connections", ["a", "b"])
+    graph.add_edges([("a", "c", CONNECTION, 0.3)])
+
+    related = graph.related_memories("a")
+    assert [r["memory_id"] for r in related] == ["c", "b"]
+    assert related[1] == {"memory_id": "b", "score": 0.25, "hops": 2}
@@ -0,0 +1,126 @@
+"""
+Tests for the durable enrichment queue: deduplication, priority order,
+retries and recovery of interrupted jobs.
+"""
+
+import pytest
+
+from memory_system import enrichment_queue
+from memory_system.enrichment_queue import META_COMMENT, SUMMARIZE, EnrichmentQueue, job_priority
+
+@pytest.fixture
+def queue(tmp_path):
+    q = EnrichmentQueue(path=str(tmp_path / "queue.sqlite"), max_attempts=2)
+    yield q
+    q.close()
+
+def pending_jobs(queue):
+    return queue._conn.execute(
+        "SELECT job_type, target, payload, priority FROM jobs WHERE status = 'pending' ORDER BY id"
+    ).fetchall()
+
+def test_enqueue_deduplicates_pending_jobs_per_target(queue):
+    assert queue.enqueue(SUMMARIZE, "m1", {"memory_id": "m1", "summary_types": ["general"]}, priority=0.2)
+    assert queue.enqueue(SUMMARIZE, "m1", {"memory_id": "m1", "summary_types": ["brief"]}, priority=0.5)
+    assert queue.enqueue(SUMMARIZE, "m1", {"memory_id": "m1", "summary_types": ["key_points"]}, priority=0.1)
+
+    jobs = pending_jobs(queue)
+    assert len(jobs) == 1
+    # The latest payload wins, the highest priority is kept
+    assert '"key_points"' in jobs[0][2]
+    assert jobs[0][3] == pytest.approx(0.5)
+
+def test_same_target_of_different_job_types_is_not_deduplicated(queue):
+    queue.enqueue(SUMMARIZE, "g1")
+    queue.enqueue(META_COMMENT, "g1")
+
+    assert len(pending_jobs(queue)) == 2
+
+def test_jobs_run_in_priority_order(queue):
+    processed = []
+    queue.register_handler(SUMMARIZE, lambda payload: processed.append(payload["memory_id"]))
+
+    for memory_id, priority in [("low", 0.1), ("high", 0.9), ("mid", 0.5)]:
+        queue.enqueue(SUMMARIZE, memory_id, {"memory_id": memory_id}, priority)
+
+    while queue.run_once():
+        pass
+
+    assert processed == ["high", "mid", "low"]
+    assert queue.metrics()["completed_total"] == 3
+
+def test_recent_and_frequent_memories_get_higher_priority():
+    assert job_priority("2000-01-01T00:00:00") < job_priority()
+    assert job_priority(access_count=10) > job_priority(access_count=0)
+
+def test_full_queue_rejects_new_targets_but_updates_pending_ones(tmp_path):
+    queue = EnrichmentQueue(path=str(tmp_path / "queue.sqlite"), max_depth=1)
+    try:
+        assert queue.enqueue(SUMMARIZE, "m1")
+        assert not queue.enqueue(SUMMARIZE, "m2")
+        assert queue.enqueue(SUMMARIZE, "m1", priority=1.0)
+    finally:
+        queue.close()
+
+def test_failed_jobs_are_retried_then_marked_failed(queue, monkeypatch):
+    monkeypatch.setattr(enrichment_queue, "backoff_delay", lambda *args: 0.0)
+    calls = []
+
+    def handler(payload):
+        calls.append(payload["memory_id"])
+        raise RuntimeError("provider down")
+
+    queue.register_handler(SUMMARIZE, handler)
+    queue.enqueue(SUMMARIZE, "m1", {"memory_id": "m1"})
+
+    assert queue.run_once()
+    status, attempts, error = queue._conn.execute("SELECT status, attempts, last_error FROM jobs").fetchone()
+    assert (status, attempts, error) == ("pending", 1, "provider down")
+
+    assert queue.run_once()
+    assert not queue.run_once()
+    assert calls == ["m1", "m1"]
+
+    metrics = queue.metrics()
+    assert metrics["failed"] == 1
+    assert metrics["failed_total"] == 1
+    assert metrics["pending"] == 0
+
+def test_retry_is_superseded_by_a_newer_pending_job(queue, monkeypatch):
+    monkeypatch.setattr(enrichment_queue, "backoff_delay", lambda *args: 0.0)
+
+    def handler(payload):
+        # The memory changes while its job is running
+        queue.enqueue(SUMMARIZE, "m1", {"memory_id": "m1", "version": 2})
+        raise RuntimeError("provider down")
+
+    queue.register_handler(SUMMARIZE, handler)
+    queue.enqueue(SUMMARIZE, "m1", {"memory_id": "m1", "version": 1})
+    queue.run_once()
+
+    jobs = pending_jobs(queue)
+    assert len(jobs) == 1
+    assert '"version": 2' in jobs[0][2]
+
+def test_interrupted_jobs_are_recovered_on_startup(tmp_path):
+    path = str(tmp_path / "queue.sqlite")
+    crashed = EnrichmentQueue(path=path)
+    crashed.register_handler(SUMMARIZE, lambda payload: None)
+    crashed.enqueue(SUMMARIZE, "m1", {"memory_id": "m1"})
+    crashed.enqueue(SUMMARIZE, "m2", {"memory_id": "m2"})
+
+    # Claimed but never finished, as if the process died mid-job
+    crashed._claim()
+    crashed._claim()
+    # m2 was re-enqueued while running; only the newer job survives
+    crashed.enqueue(SUMMARIZE, "m2", {"memory_id": "m2", "version": 2})
+    crashed._conn.close()
+
+    restarted = EnrichmentQueue(path=path)
+    try:
+        jobs = pending_jobs(restarted)
+        assert [target for _, target, _, _ in jobs] == ["m1", "m2"]
+        assert '"version": 2' in jobs[1][2]
+        assert restarted.metrics()["running"] == 0
+    finally:
+        restarted.close()
@@ -0,0 +1,132 @@
+"""
+Tests for LLM call metering: batching and flushing records to SQLite, and
+the usage and cost report.
+"""
+
+import time
+
+import pytest
+
+from memory_system.metering import Meter
+
+@pytest.fixture
+def meter(tmp_path):
+    # No timer or size-triggered flushes unless a test asks for them
+    m = Meter(path=str(tmp_path / "metering.sqlite"), flush_interval=0, flush_size=1000)
+    yield m
+    m.close()
+
+def stored_calls(meter):
+    with meter._lock:
+        return meter._connect().execute("SELECT COUNT(*) FROM calls").fetchone()[0]
+
+def test_records_wait_for_a_flush(meter):
+    meter.record("layer3", "summary", model="gpt-4o", input_tokens=100, output_tokens=20)
+
+    assert stored_calls(meter) == 0
+    assert meter.flush() == 1
+    assert stored_calls(meter) == 1
+    assert meter.flush() == 0
+
+def test_flush_size_triggers_a_write(tmp_path):
+    meter = Meter(path=str(tmp_path / "metering.sqlite"), flush_interval=0, flush_size=3)
+    try:
+        for _ in range(3):
+            meter.record("layer3", "summary", model="gpt-4o")
+        assert stored_calls(meter) == 3
+    finally:
+        meter.close()
+
+def test_background_timer_flushes_pending_records(tmp_path):
+    meter = Meter(path=str(tmp_path / "metering.sqlite"), flush_interval=0.05, flush_size=1000)
+    try:
+        meter.record("layer4", "commentary", model="claude-3-haiku-20240307")
+
+        deadline = time.time() + 5
+        while stored_calls(meter) == 0 and time.time() < deadline:
+            time.sleep(0.02)
+        assert stored_calls(meter) == 1
+    finally:
+        meter.close()
+
+    assert not meter._flusher.is_alive()
+
+def test_failed_flush_keeps_records(tmp_path):
+    # A directory cannot be opened as a database
+    meter = Meter(path=str(tmp_path), flush_interval=0, flush_size=1000)
+    meter.record("layer3", "summary", model="gpt-4o")
+
+    assert meter.flush() == 0
+    assert len(meter._pending) == 1
+
+    # Nothing left for the exit-time flush to fail on
+    meter._pending.clear()
+
+def test_costs_use_exact_then_prefix_prices(meter):
+    assert meter.estimate_cost("gpt-4o", 1_000_000, 1_000_000) == pytest.approx(12.5)
+    # Dated versions match the longest configured prefix
+    assert meter.estimate_cost("gpt-4o-mini-2024-07-18", 1_000_000, 0) == pytest.approx(0.15)
+    assert meter.estimate_cost("unknown-model", 1000, 1000) == 0.0
+
+def test_cache_hits_and_errors_cost_nothing(meter):
+    hit = meter.record("layer3", "summary", model="gpt-4o", input_tokens=500, cache_hit=True)
+    error = meter.record("layer3", "summary", model="gpt-4o", input_tokens=500, error=True)
+
+    assert hit["cost"] == 0.0
+    assert error["cost"] == 0.0
+
+def test_record_response_reads_routed_responses(meter):
+    entry = meter.record_response("layer4", "relationship", {
+        "text": "analysis",
+        "usage": {"input_tokens": 200, "output_tokens": 50},
+        "provider": "openai",
+        "model": "gpt-4o-mini",
+        "latency": 1.5,
+        "retries": 2,
+        "hedged": True,
+    })
+
+    assert (entry["provider"], entry["model"], entry["retries"], entry["hedged"]) == ("openai", "gpt-4o-mini", 2, True)
+    assert entry["latency"] == 1.5
+    assert entry["cost"] == pytest.approx((200 * 0.15 + 50 * 0.60) / 1_000_000)
+
+def test_report_flushes_and_groups_calls(meter):
+    meter.record("layer3", "summary", provider="openai", model="gpt-4o", input_tokens=1000, output_tokens=100, latency=1.0)
+    meter.record("layer3", "summary", provider="openai", model="gpt-4o", input_tokens=1000, output_tokens=100, latency=3.0)
+    meter.record("layer3", "summary", provider="openai", model="gpt-4o", cache_hit=True)
+    meter.record("layer4", "commentary", provider="anthropic", model="claude-3-haiku-20240307",
+                 input_tokens=2000, output_tokens=500, retries=1, hedged=True)
+
+    report = meter.report(group_by=["layer", "method"])
+    rows = {(row["layer"], row["method"]): row for row in report["rows"]}
+
+    summary = rows[("layer3", "summary")]
+    assert (summary["calls"], summary["cache_hits"]) == (2, 1)
+    assert summary["input_tokens"] == 2000
+    # Cache hits do not count towards latency
+    assert summary["avg_latency"] == pytest.approx(2.0)
+    assert summary["max_latency"] == pytest.approx(3.0)
+
+    commentary = rows[("layer4", "commentary")]
+    assert (commentary["retries"], commentary["hedged"]) == (1, 1)
+
+    totals = report["totals"]
+    assert totals["calls"] == 3
+    assert totals["input_tokens"] == 4000
+    assert totals["cost"] == pytest.approx(summary["cost"] + commentary["cost"])
+    # Most expensive group first
+    assert report["rows"][0]["cost"] >= report["rows"][1]["cost"]
+
+def test_report_ignores_unknown_columns_and_filters_by_time(meter):
+    meter.record("layer3", "summary", model="gpt-4o", input_tokens=10)
+
+    report = meter.report(group_by=["model", "drop table calls"])
+    assert [set(row) & {"model", "layer"} for row in report["rows"]] == [{"model"}]
+
+    assert meter.report(since=time.time() + 60)["totals"]["calls"] == 0
+
+def test_recent_returns_newest_first(meter):
+    for method in ("a", "b", "c"):
+        meter.record("layer3", method)
+
+    assert [entry["method"] for entry in meter.recent(2)] == ["c", "b"]